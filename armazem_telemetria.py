@@ -0,0 +1,237 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from telemetria_lote import OPERACOES
+from tempo import FUSO_SERVICO, formatar_data, para_datetime
+
+# Campos procurados, em ordem, para indexar o registro no tempo
+CAMPOS_DATA = ('dataInicioEvento', 'dataEvento', 'dataPosicao', 'dataHora', 'data')
+
+UM_SEGUNDO = timedelta(seconds=1)
+
+
+def _data_registro(registro, campos, padrao):
+    """Retorna a data do registro como texto 'YYYY-MM-DD HH:MM:SS' no horário do serviço"""
+    for campo in campos:
+        valor = registro.get(campo) if isinstance(registro, dict) else None
+        if isinstance(valor, datetime):
+            return formatar_data(valor, FUSO_SERVICO)
+        if isinstance(valor, str) and valor:
+            # Texto com deslocamento ('...-03:00', '...Z') vai para o mesmo horário dos datetime
+            try:
+                return formatar_data(para_datetime(valor, FUSO_SERVICO))
+            except ValueError:
+                return valor[:19].replace('T', ' ')
+    return padrao
+
+
+class ArmazemTelemetria:
+    def __init__(self, api, caminho='telemetria.db', campos_data=CAMPOS_DATA, margem=timedelta(hours=1),
+                 limite_registros=1000):
+        """
+        Armazenamento local e incremental de telemetria em SQLite
+
+        Cada consulta registra as janelas (veículo, período) já sincronizadas;
+        as próximas consultas só chamam o serviço para as lacunas e leem o
+        restante do disco.
+
+        Args:
+            api (SascarAPI): API da conta
+            caminho (str): Arquivo SQLite
+            campos_data (tuple): Campos usados para posicionar o registro no tempo
+            margem (timedelta): Períodos mais recentes que agora - margem são
+                buscados, mas não marcados como sincronizados
+            limite_registros (int): Quantidade de registros que indica resposta
+                truncada (o teto do servidor); nesse caso só o trecho até o
+                último registro recebido é marcado e o restante é buscado de novo
+        """
+        self.api = api
+        self.caminho = caminho
+        self.campos_data = campos_data
+        self.margem = margem
+        self.limite_registros = limite_registros
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS telemetria (
+                operacao TEXT NOT NULL,
+                id_veiculo INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                registro BLOB NOT NULL,
+                UNIQUE (operacao, id_veiculo, chave)
+            );
+            CREATE INDEX IF NOT EXISTS idx_telemetria_periodo
+                ON telemetria (operacao, id_veiculo, data);
+            CREATE TABLE IF NOT EXISTS intervalos (
+                operacao TEXT NOT NULL,
+                id_veiculo INTEGER NOT NULL,
+                inicio TEXT NOT NULL,
+                fim TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_intervalos_periodo
+                ON intervalos (operacao, id_veiculo, inicio);
+        """)
+
+    def fechar(self):
+        """Fecha a conexão com o banco"""
+        self._conexao.close()
+
+    def intervalos(self, operacao, id_veiculo):
+        """
+        Lista as janelas já sincronizadas de um veículo
+
+        Returns:
+            list: Tuplas (inicio, fim) de datetime, ordenadas e sem sobreposição
+        """
+        with self._lock:
+            linhas = self._conexao.execute(
+                'SELECT inicio, fim FROM intervalos WHERE operacao = ? AND id_veiculo = ? ORDER BY inicio',
+                (operacao, id_veiculo),
+            ).fetchall()
+        return [(para_datetime(inicio), para_datetime(fim)) for inicio, fim in linhas]
+
+    def lacunas(self, operacao, id_veiculo, inicio, fim):
+        """
+        Calcula os trechos do período que ainda não foram sincronizados
+
+        Returns:
+            list: Tuplas (inicio, fim) de datetime a buscar no serviço
+        """
+        faltando = []
+        atual = inicio
+        for sinc_inicio, sinc_fim in self.intervalos(operacao, id_veiculo):
+            if sinc_fim < atual:
+                continue
+            if sinc_inicio > fim:
+                break
+            if sinc_inicio > atual:
+                faltando.append((atual, sinc_inicio - UM_SEGUNDO))
+            atual = max(atual, sinc_fim + UM_SEGUNDO)
+            if atual > fim:
+                break
+        if atual <= fim:
+            faltando.append((atual, fim))
+        return faltando
+
+    def _marcar_sincronizado(self, operacao, id_veiculo, inicio, fim):
+        """Registra a janela e funde as janelas adjacentes ou sobrepostas"""
+        janelas = self.intervalos(operacao, id_veiculo) + [(inicio, fim)]
+        janelas.sort()
+        fundidas = []
+        for janela_inicio, janela_fim in janelas:
+            if fundidas and janela_inicio <= fundidas[-1][1] + UM_SEGUNDO:
+                fundidas[-1][1] = max(fundidas[-1][1], janela_fim)
+            else:
+                fundidas.append([janela_inicio, janela_fim])
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                'DELETE FROM intervalos WHERE operacao = ? AND id_veiculo = ?',
+                (operacao, id_veiculo),
+            )
+            self._conexao.executemany(
+                'INSERT INTO intervalos (operacao, id_veiculo, inicio, fim) VALUES (?, ?, ?, ?)',
+                [
+                    (operacao, id_veiculo, formatar_data(janela_inicio), formatar_data(janela_fim))
+                    for janela_inicio, janela_fim in fundidas
+                ],
+            )
+
+    def _guardar(self, operacao, id_veiculo, registros, padrao):
+        """Insere os registros ignorando os já existentes"""
+        linhas = []
+        for registro in registros:
+            blob = pickle.dumps(registro, protocol=pickle.HIGHEST_PROTOCOL)
+            linhas.append((
+                operacao,
+                id_veiculo,
+                _data_registro(registro, self.campos_data, padrao),
+                hashlib.sha1(blob).hexdigest(),
+                blob,
+            ))
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                'INSERT OR IGNORE INTO telemetria (operacao, id_veiculo, data, chave, registro) '
+                'VALUES (?, ?, ?, ?, ?)',
+                linhas,
+            )
+
+    def sincronizar(self, id_veiculo, data_inicio, data_final, operacao='evento'):
+        """
+        Busca no serviço apenas as lacunas do período e guarda em disco
+
+        Args:
+            id_veiculo (int): ID do veículo
+            data_inicio (datetime | str): Início do período
+            data_final (datetime | str): Fim do período (datas com fuso horário vão
+                para o horário do serviço)
+            operacao (str): 'evento', 'data_chegada' ou 'delta'
+
+        Returns:
+            int: Quantidade de chamadas feitas ao serviço
+        """
+        if operacao not in OPERACOES:
+            raise ValueError(f"Operação inválida: {operacao}")
+        metodo = getattr(self.api, OPERACOES[operacao])
+        inicio = para_datetime(data_inicio, FUSO_SERVICO)
+        fim = para_datetime(data_final, FUSO_SERVICO)
+        agora = para_datetime(datetime.now(timezone.utc), FUSO_SERVICO)
+        limite = (agora - self.margem).replace(microsecond=0)
+
+        chamadas = 0
+        for lacuna_inicio, lacuna_fim in self.lacunas(operacao, id_veiculo, inicio, fim):
+            atual = lacuna_inicio
+            while atual <= lacuna_fim:
+                resposta = metodo(
+                    id_veiculo,
+                    formatar_data(atual),
+                    formatar_data(lacuna_fim),
+                )
+                chamadas += 1
+                registros = self.api.process_response(resposta)
+                self._guardar(operacao, id_veiculo, registros, formatar_data(atual))
+                sincronizado_ate = lacuna_fim
+                proximo = None
+                if registros and len(registros) >= self.limite_registros:
+                    # Resposta no teto do servidor: só é certo o que vem antes do último registro
+                    ultimo = para_datetime(max(
+                        _data_registro(registro, self.campos_data, formatar_data(atual)) for registro in registros
+                    ))
+                    if ultimo < lacuna_fim:
+                        # Sem avanço (tudo no mesmo segundo), segue a partir do segundo seguinte
+                        proximo = ultimo if ultimo > atual else atual + UM_SEGUNDO
+                        sincronizado_ate = proximo - UM_SEGUNDO
+                if atual <= limite:
+                    self._marcar_sincronizado(operacao, id_veiculo, atual, min(sincronizado_ate, limite))
+                if proximo is None:
+                    break
+                atual = proximo
+        return chamadas
+
+    def consultar(self, id_veiculo, data_inicio, data_final, operacao='evento'):
+        """
+        Retorna a telemetria do período, buscando no serviço só o que falta
+
+        Args:
+            id_veiculo (int): ID do veículo
+            data_inicio (datetime | str): Início do período
+            data_final (datetime | str): Fim do período
+            operacao (str): 'evento', 'data_chegada' ou 'delta'
+
+        Returns:
+            list: Registros do período em ordem de data
+        """
+        self.sincronizar(id_veiculo, data_inicio, data_final, operacao)
+        inicio = formatar_data(para_datetime(data_inicio, FUSO_SERVICO))
+        fim = formatar_data(para_datetime(data_final, FUSO_SERVICO))
+        with self._lock:
+            linhas = self._conexao.execute(
+                'SELECT registro FROM telemetria '
+                'WHERE operacao = ? AND id_veiculo = ? AND data BETWEEN ? AND ? ORDER BY data',
+                (operacao, id_veiculo, inicio, fim),
+            ).fetchall()
+        return [pickle.loads(blob) for blob, in linhas]
@@ -0,0 +1,126 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from excecoes import classificar, converter_erro
+
+
+def dividir_range(id_inicio, id_final, tamanho_shard):
+    """
+    Divide um range de IDs em shards contíguos
+
+    Args:
+        id_inicio (int): Primeiro ID
+        id_final (int): Último ID (inclusivo)
+        tamanho_shard (int): Quantidade de IDs por shard
+
+    Returns:
+        list: Tuplas (inicio, fim) em ordem crescente
+    """
+    shards = []
+    inicio = id_inicio
+    while inicio <= id_final:
+        fim = min(inicio + tamanho_shard - 1, id_final)
+        shards.append((inicio, fim))
+        inicio = fim + 1
+    return shards
+
+
+def _com_tentativas(funcao, tentativas, espera):
+    """Executa a função repetindo os erros retentáveis, com espera exponencial"""
+    for tentativa in range(tentativas):
+        try:
+            return funcao()
+        except Exception as e:
+            if tentativa == tentativas - 1 or not classificar(e).retentavel:
+                raise
+            time.sleep(espera * 2 ** tentativa)
+
+
+def buscar_shard(api, inicio, fim, quantidade=3000, motorista=False, tentativas=3, espera=1):
+    """
+    Busca todas as posições de um shard, paginando pelo maior idPacote recebido
+
+    Args:
+        api (SascarAPI): API da conta
+        inicio (int): Primeiro ID do shard
+        fim (int): Último ID do shard (inclusivo)
+        quantidade (int): Registros por chamada (máximo do serviço: 3000)
+        motorista (bool): Se True, inclui informações do motorista
+        tentativas (int): Tentativas por chamada antes de desistir do shard (só
+            erros retentáveis; com api.resiliencia as novas tentativas ficam a
+            cargo dela)
+        espera (float): Espera inicial, em segundos, entre tentativas
+
+    Returns:
+        list: Registros do shard ordenados por idPacote
+    """
+    if getattr(api, 'resiliencia', None) is not None:
+        tentativas = 1  # sem multiplicar as tentativas da resiliência da conta
+    registros = []
+    atual = inicio
+    while atual <= fim:
+        lote = _com_tentativas(
+            lambda: api.obterPacotePosicaoMotoristaPorRangeJSON(
+                atual, fim, quantidade=quantidade, motorista=motorista
+            ),
+            tentativas,
+            espera,
+        )
+        registros.extend(lote)
+        if len(lote) < quantidade:
+            break
+        atual = max(registro['idPacote'] for registro in lote) + 1
+    registros.sort(key=lambda registro: registro['idPacote'])
+    return registros
+
+
+def backfill_range(api, id_inicio, id_final, tamanho_shard=30000, max_workers=4, quantidade=3000,
+                   motorista=False, tentativas=3, espera=1):
+    """
+    Busca um range grande de IDs de pacotes em paralelo
+
+    O range é dividido em shards buscados por um pool de threads limitado. Os
+    registros são gerados em ordem de idPacote assim que o shard seguinte fica
+    pronto; no máximo 2 * max_workers shards ficam em memória.
+
+    Args:
+        api (SascarAPI): API da conta
+        id_inicio (int): ID do primeiro pacote
+        id_final (int): ID do último pacote (inclusivo)
+        tamanho_shard (int): Quantidade de IDs por shard
+        max_workers (int): Chamadas simultâneas ao serviço
+        quantidade (int): Registros por chamada (máximo do serviço: 3000)
+        motorista (bool): Se True, inclui informações do motorista
+        tentativas (int): Tentativas por chamada antes de desistir do shard
+            (ver buscar_shard)
+        espera (float): Espera inicial, em segundos, entre tentativas
+
+    Yields:
+        dict: Registros de posição em ordem de idPacote
+    """
+    shards = deque(dividir_range(id_inicio, id_final, tamanho_shard))
+    pendentes = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def agendar():
+            while shards and len(pendentes) < max_workers * 2:
+                inicio, fim = shards.popleft()
+                futuro = executor.submit(
+                    buscar_shard, api, inicio, fim, quantidade, motorista, tentativas, espera
+                )
+                pendentes.append((inicio, fim, futuro))
+
+        agendar()
+        try:
+            while pendentes:
+                inicio, fim, futuro = pendentes.popleft()
+                try:
+                    registros = futuro.result()
+                except Exception as e:
+                    raise converter_erro(e, f"Erro ao obter shard {inicio}-{fim}") from e
+                agendar()
+                yield from registros
+        finally:
+            for _, _, futuro in pendentes:
+                futuro.cancel()
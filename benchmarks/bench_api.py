@@ -0,0 +1,193 @@
+"""
+Benchmark offline da SascarAPI contra o servidor SOAP local (servidor_mock.py)
+
+Mede, para cada tamanho de pacote, as etapas:
+    fetch       requisição HTTP e leitura do corpo da resposta
+    parse       leitura do XML pelo zeep (process_reply)
+    convert     conversão em dicionários (process_response)
+    stream      leitura incremental em dicionários (streaming.iterar_registros)
+    colunar     leitura direta em DataFrame (colunar.ler_colunas)
+    export      gravação em JSON Lines (exportacao.exportar)
+
+e informa vazão (registros/s), percentis de latência e pico de memória
+(tracemalloc). Com --saida os resultados são gravados em JSON; com
+--referencia a execução falha se alguma etapa ficar mais lenta que a
+referência além da tolerância, para uso em CI.
+
+Uso:
+    python benchmarks/bench_api.py --tamanhos 1,100,1000,3000 --repeticoes 20
+    python benchmarks/bench_api.py --saida atual.json --referencia base.json --tolerancia 0.25
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRETORIO))
+
+from colunar import ler_colunas
+from exportacao import exportar
+from sascar import SascarAPI
+from servidor_mock import ServidorMock
+from streaming import abrir_resposta, esquema_do_retorno, iterar_registros, tipos_do_retorno
+
+OPERACAO = 'obterPacotePosicaoPorRange'
+ETAPAS = ('fetch', 'parse', 'convert', 'stream', 'colunar', 'export')
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear"""
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def pico_memoria(funcao):
+    """Executa a função uma vez e retorna o pico de memória alocada em bytes"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir(funcao, repeticoes, registros):
+    """
+    Mede uma etapa
+
+    Returns:
+        dict: Vazão, percentis (ms) e pico de memória (KiB)
+    """
+    funcao()  # aquecimento (caches do esquema, conexões)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    mediana = percentil(tempos, 50)
+    return {
+        'registros_por_s': registros / mediana if mediana else 0.0,
+        'p50_ms': mediana * 1000,
+        'p95_ms': percentil(tempos, 95) * 1000,
+        'p99_ms': percentil(tempos, 99) * 1000,
+        'pico_kib': pico_memoria(funcao) / 1024,
+    }
+
+
+def buscar_bytes(api, params):
+    """Executa a operação e retorna o corpo bruto da resposta"""
+    with abrir_resposta(api.client, OPERACAO, params) as response:
+        return response.raw.read()
+
+
+def executar(tamanhos, repeticoes, latencia, diretorio):
+    """
+    Executa o benchmark para cada tamanho de pacote
+
+    Returns:
+        dict: {tamanho: {etapa: medidas}}
+    """
+    resultados = {}
+    with ServidorMock(registros=max(tamanhos), latencia=latencia) as servidor:
+        api = SascarAPI('benchmark', 'benchmark', wsdl=servidor.wsdl_url, cache_wsdl=False, reutilizar_cliente=False)
+        binding = api.client.service._binding
+        operacao = binding.get(OPERACAO)
+        tipos = tipos_do_retorno(api.client, OPERACAO)
+        esquema = esquema_do_retorno(api.client, OPERACAO)
+        destino = os.path.join(diretorio, 'posicoes.jsonl')
+
+        for tamanho in tamanhos:
+            params = dict(usuario=api.username, senha=api.password, idInicio=1, idFinal=tamanho, quantidade=tamanho)
+            conteudo = buscar_bytes(api, params)
+            resposta = SimpleNamespace(status_code=200, content=conteudo, headers={'Content-Type': 'text/xml'})
+            objetos = binding.process_reply(api.client, operacao, resposta)
+            dicionarios = api.process_response(objetos)
+            if len(dicionarios) != tamanho:
+                raise Exception(f"Erro no benchmark: esperados {tamanho} registros, recebidos {len(dicionarios)}")
+
+            etapas = {
+                'fetch': lambda: buscar_bytes(api, params),
+                'parse': lambda: binding.process_reply(api.client, operacao, resposta),
+                'convert': lambda: api.process_response(objetos),
+                'stream': lambda: sum(1 for _ in iterar_registros(conteudo, tipos)),
+                'colunar': lambda: ler_colunas(conteudo, esquema),
+                'export': lambda: exportar(dicionarios, destino, 'jsonl'),
+            }
+            resultados[tamanho] = {
+                etapa: dict(medir(funcao, repeticoes, tamanho), bytes_resposta=len(conteudo))
+                for etapa, funcao in etapas.items()
+            }
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'registros':>9} {'etapa':<8} {'reg/s':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'pico KiB':>10}")
+    for tamanho, etapas in resultados.items():
+        for etapa, medidas in etapas.items():
+            print(
+                f"{tamanho:>9} {etapa:<8} {medidas['registros_por_s']:>12.0f} {medidas['p50_ms']:>9.2f} "
+                f"{medidas['p95_ms']:>9.2f} {medidas['p99_ms']:>9.2f} {medidas['pico_kib']:>10.0f}"
+            )
+
+
+def comparar(resultados, referencia, tolerancia):
+    """
+    Compara a vazão com uma execução de referência
+
+    Returns:
+        list: Descrição das etapas que regrediram além da tolerância
+    """
+    regressoes = []
+    for tamanho, etapas in resultados.items():
+        for etapa, medidas in etapas.items():
+            base = referencia.get(str(tamanho), {}).get(etapa)
+            if not base or not base['registros_por_s']:
+                continue
+            variacao = medidas['registros_por_s'] / base['registros_por_s'] - 1
+            if variacao < -tolerancia:
+                regressoes.append(f"{tamanho} registros / {etapa}: {variacao:+.0%} de vazão")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline da SascarAPI')
+    parser.add_argument('--tamanhos', default='1,100,1000,3000', help='Registros por pacote, separados por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--latencia', type=float, default=0.0, help='Latência simulada do servidor em segundos')
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    parser.add_argument('--referencia', help='Resultados anteriores (JSON) para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Perda de vazão aceita (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    tamanhos = [int(tamanho) for tamanho in args.tamanhos.split(',')]
+    with tempfile.TemporaryDirectory() as diretorio:
+        resultados = executar(tamanhos, args.repeticoes, args.latencia, diretorio)
+    imprimir(resultados)
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({str(tamanho): etapas for tamanho, etapas in resultados.items()}, f, indent=2)
+
+    if args.referencia:
+        with open(args.referencia) as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO: {regressao}")
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
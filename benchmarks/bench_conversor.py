@@ -0,0 +1,81 @@
+"""
+Compara a conversão reflexiva (SascarAPI.zeep_to_dict) com os conversores
+gerados a partir do esquema (conversor.converter_lista)
+
+Uso:
+    python benchmarks/bench_conversor.py [quantidade] [repeticoes]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zeep import xsd
+
+from conversor import converter_lista
+from sascar import SascarAPI
+
+PacotePosicao = xsd.ComplexType(xsd.Sequence([
+    xsd.Element('idPacote', xsd.Long()),
+    xsd.Element('idVeiculo', xsd.Int()),
+    xsd.Element('dataPosicao', xsd.DateTime()),
+    xsd.Element('dataPacote', xsd.DateTime()),
+    xsd.Element('latitude', xsd.Double()),
+    xsd.Element('longitude', xsd.Double()),
+    xsd.Element('direcao', xsd.Int()),
+    xsd.Element('velocidade', xsd.Int()),
+    xsd.Element('ignicao', xsd.Int()),
+    xsd.Element('odometro', xsd.Int()),
+    xsd.Element('horimetro', xsd.Int()),
+    xsd.Element('tensao', xsd.Double()),
+    xsd.Element('satelite', xsd.Int()),
+    xsd.Element('gps', xsd.Int()),
+    xsd.Element('uf', xsd.String()),
+    xsd.Element('cidade', xsd.String()),
+    xsd.Element('rua', xsd.String()),
+    xsd.Element('pontoReferencia', xsd.String()),
+]))
+
+
+def gerar_pacote(quantidade):
+    """Gera uma lista de posições sintéticas como as devolvidas pelo zeep"""
+    inicio = datetime(2025, 5, 20)
+    return [
+        PacotePosicao(
+            idPacote=100000 + i, idVeiculo=i % 500,
+            dataPosicao=inicio + timedelta(seconds=i), dataPacote=inicio + timedelta(seconds=i + 5),
+            latitude=-15.6 + i * 1e-5, longitude=-56.1 - i * 1e-5, direcao=i % 360,
+            velocidade=i % 120, ignicao=1, odometro=i * 10, horimetro=i, tensao=12.6,
+            satelite=8, gps=1, uf='MT', cidade='Cuiabá', rua='Av. Fernando Corrêa',
+            pontoReferencia='',
+        )
+        for i in range(quantidade)
+    ]
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    api = SascarAPI.__new__(SascarAPI)
+    pacote = gerar_pacote(quantidade)
+
+    reflexivo = timeit.timeit(
+        lambda: [api.zeep_to_dict(item) if hasattr(item, '__dict__') else item for item in pacote],
+        number=repeticoes,
+    ) / repeticoes
+    gerado = timeit.timeit(
+        lambda: converter_lista(pacote, alternativo=api.zeep_to_dict),
+        number=repeticoes,
+    ) / repeticoes
+
+    print(f"Registros por pacote: {quantidade}")
+    print(f"zeep_to_dict (reflexivo): {reflexivo * 1000:.2f} ms")
+    print(f"converter_lista (esquema): {gerado * 1000:.2f} ms")
+    print(f"Ganho: {reflexivo / gerado:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
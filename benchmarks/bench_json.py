@@ -0,0 +1,114 @@
+"""
+Compara o caminho SOAP com as variantes JSON das operações (json_rapido)
+
+Para cada tamanho de pacote mede, sobre a resposta já baixada:
+    soap        leitura do XML pelo zeep e conversão em dicionários
+    stream      leitura incremental do XML (streaming.iterar_registros)
+    json        envelope da variante JSON + decodificação + normalização
+    orjson      só a decodificação do texto JSON com orjson (se instalado)
+    stdlib      só a decodificação do texto JSON com o módulo json
+    normalizar  só a normalização dos objetos decodificados
+
+e informa o tamanho das duas respostas em bytes. Os registros do caminho JSON
+são conferidos contra os do SOAP antes da medição.
+
+Uso:
+    python benchmarks/bench_json.py --tamanhos 100,1000,3000 --repeticoes 20
+"""
+import argparse
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRETORIO))
+
+from bench_api import medir
+from json_rapido import OPERACOES_JSON, carregar_json, normalizador_para, orjson
+from sascar import SascarAPI
+from servidor_mock import ServidorMock
+from streaming import abrir_resposta, iterar_registros, tipos_do_retorno
+
+OPERACAO = 'obterPacotePosicaoPorRange'
+
+
+def buscar_bytes(api, operacao, params):
+    """Executa a operação e retorna o corpo bruto da resposta"""
+    with abrir_resposta(api.client, operacao, params) as response:
+        return response.raw.read()
+
+
+def processar(api, operacao, conteudo):
+    """Lê o envelope SOAP com o zeep"""
+    binding = api.client.service._binding
+    resposta = SimpleNamespace(status_code=200, content=conteudo, headers={'Content-Type': 'text/xml'})
+    return binding.process_reply(api.client, binding.get(operacao), resposta)
+
+
+def executar(tamanhos, repeticoes):
+    """
+    Returns:
+        dict: {tamanho: {etapa: medidas}}
+    """
+    resultados = {}
+    with ServidorMock(registros=max(tamanhos)) as servidor:
+        api = SascarAPI('benchmark', 'benchmark', wsdl=servidor.wsdl_url, cache_wsdl=False, reutilizar_cliente=False)
+        variante = OPERACOES_JSON[OPERACAO]
+        tipos = tipos_do_retorno(api.client, OPERACAO)
+        normalizar = normalizador_para(api.client, OPERACAO)
+
+        for tamanho in tamanhos:
+            params = dict(usuario=api.username, senha=api.password, idInicio=1, idFinal=tamanho, quantidade=tamanho)
+            xml = buscar_bytes(api, OPERACAO, params)
+            envelope_json = buscar_bytes(api, variante, params)
+            texto = processar(api, variante, envelope_json)
+            dados = carregar_json(texto)
+
+            soap = api.process_response(processar(api, OPERACAO, xml))
+            if normalizar(dados) != soap:
+                raise Exception(f"Erro no benchmark: registros JSON diferentes do SOAP ({tamanho} registros)")
+
+            etapas = {
+                'soap': lambda: api.process_response(processar(api, OPERACAO, xml)),
+                'stream': lambda: sum(1 for _ in iterar_registros(xml, tipos)),
+                'json': lambda: normalizar(carregar_json(processar(api, variante, envelope_json))),
+                'stdlib': lambda: json.loads(texto),
+                'normalizar': lambda: normalizar(dados),
+            }
+            if orjson is not None:
+                etapas['orjson'] = lambda: orjson.loads(texto)
+            resultados[tamanho] = {
+                etapa: dict(medir(funcao, repeticoes, tamanho),
+                            bytes_resposta=len(envelope_json if etapa not in ('soap', 'stream') else xml))
+                for etapa, funcao in etapas.items()
+            }
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'registros':>9} {'etapa':<10} {'reg/s':>12} {'p50 ms':>9} {'p95 ms':>9} {'pico KiB':>10} {'bytes':>10}")
+    for tamanho, etapas in resultados.items():
+        for etapa, medidas in etapas.items():
+            print(
+                f"{tamanho:>9} {etapa:<10} {medidas['registros_por_s']:>12.0f} {medidas['p50_ms']:>9.2f} "
+                f"{medidas['p95_ms']:>9.2f} {medidas['pico_kib']:>10.0f} {medidas['bytes_resposta']:>10}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SOAP x variantes JSON')
+    parser.add_argument('--tamanhos', default='100,1000,3000', help='Registros por pacote, separados por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    resultados = executar([int(tamanho) for tamanho in args.tamanhos.split(',')], args.repeticoes)
+    imprimir(resultados)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({str(tamanho): etapas for tamanho, etapas in resultados.items()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Compara a memória ocupada por posição nos dicionários de process_response,
+nos registros com __slots__ (registros.Posicao) e no lote em array
+estruturado (registros.LoteRegistros)
+
+Uso:
+    python benchmarks/bench_registros.py [quantidade]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_conversor import gerar_pacote
+from conversor import converter_lista
+from registros import LoteRegistros, Posicao, converter_registros
+
+
+def medir(construir):
+    """Retorna (objeto, bytes alocados) retidos após construir o objeto"""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objeto = construir()
+    gc.collect()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objeto, depois - antes
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    pacote = gerar_pacote(quantidade)
+
+    dicionarios, memoria_dict = medir(lambda: converter_lista(pacote))
+    registros, memoria_slots = medir(lambda: converter_registros(pacote, Posicao))
+    lote, memoria_lote = medir(lambda: LoteRegistros.de_registros(Posicao, pacote))
+
+    assert len(dicionarios) == len(registros) == len(lote) == quantidade
+    print(f"Registros: {quantidade}")
+    print(f"dict (process_response):  {memoria_dict / quantidade:8.1f} bytes/registro")
+    print(f"Posicao (__slots__):      {memoria_slots / quantidade:8.1f} bytes/registro"
+          f"  ({memoria_dict / memoria_slots:.1f}x menor)")
+    print(f"LoteRegistros (NumPy):    {memoria_lote / quantidade:8.1f} bytes/registro"
+          f"  ({memoria_dict / memoria_lote:.1f}x menor)")
+
+
+if __name__ == '__main__':
+    main()
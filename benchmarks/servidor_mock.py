@@ -0,0 +1,296 @@
+"""
+Servidor SOAP local que imita o SasIntegraWSService para os benchmarks
+
+As respostas são geradas a partir dos tipos declarados no WSDL incluído em
+benchmarks/wsdl, com a quantidade de registros e a latência configuráveis.
+
+Uso:
+    python benchmarks/servidor_mock.py --porta 8088 --registros 3000 --latencia 0.05
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lxml import etree
+
+WSDL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wsdl', 'SasIntegraWSService.wsdl')
+
+NS_SOAP = 'http://schemas.xmlsoap.org/soap/envelope/'
+NS_XS = 'http://www.w3.org/2001/XMLSchema'
+NS_WSDL = 'http://schemas.xmlsoap.org/wsdl/'
+NS_SOAP_WSDL = 'http://schemas.xmlsoap.org/wsdl/soap/'
+
+# Senha que faz o servidor responder com soap:Fault
+SENHA_INVALIDA = 'senha-invalida'
+
+
+def carregar_esquema(caminho=WSDL_PATH):
+    """
+    Lê do WSDL os campos de cada tipo de retorno
+
+    Args:
+        caminho (str): Caminho do WSDL
+
+    Returns:
+        tuple: (namespace, {operacao: (tipo_retorno, multiplo)}, {tipo: [(campo, tipo_xs)]})
+    """
+    arvore = etree.parse(caminho)
+    esquema = arvore.find(f'.//{{{NS_XS}}}schema')
+    namespace = esquema.get('targetNamespace')
+
+    tipos = {}
+    for complexo in esquema.iterfind(f'{{{NS_XS}}}complexType'):
+        campos = []
+        for elemento in complexo.iterfind(f'.//{{{NS_XS}}}element'):
+            campos.append((elemento.get('name'), elemento.get('type').split(':')[1], elemento.get('maxOccurs')))
+        tipos[complexo.get('name')] = campos
+
+    operacoes = {}
+    for nome, campos in tipos.items():
+        if nome.endswith('Response'):
+            _, tipo, multiplo = campos[0]
+            operacoes[nome[:-len('Response')]] = (tipo, multiplo == 'unbounded')
+    return namespace, operacoes, tipos
+
+
+class GeradorRespostas:
+    def __init__(self, caminho_wsdl=WSDL_PATH, registros=100, semente=42):
+        """
+        Gera respostas sintéticas para as operações do WSDL
+
+        Args:
+            caminho_wsdl (str): WSDL de onde os tipos são lidos
+            registros (int): Registros por resposta quando a operação não
+                recebe 'quantidade'
+            semente (int): Semente do gerador aleatório
+        """
+        self.namespace, self.operacoes, self.tipos = carregar_esquema(caminho_wsdl)
+        self.registros = registros
+        self.semente = semente
+        self._proximo_id = 1
+        self._lock = threading.Lock()
+
+    def _valor(self, campo, tipo_xs, indice, aleatorio, id_base):
+        """Gera o valor de um campo conforme o tipo XSD"""
+        if campo == 'idPacote':
+            return str(id_base + indice)
+        if campo == 'idVeiculo':
+            return str(1000 + indice % 500)
+        if campo == 'placa':
+            return f'ABC{(indice % 500):04d}'
+        if tipo_xs == 'dateTime':
+            data = datetime(2025, 5, 20) + timedelta(seconds=indice * 30)
+            return data.strftime('%Y-%m-%dT%H:%M:%S-03:00')
+        if tipo_xs in ('int', 'long'):
+            return str(aleatorio.randint(0, 1000))
+        if tipo_xs == 'double':
+            if campo == 'latitude':
+                return f'{-15.6 + aleatorio.uniform(-2, 2):.6f}'
+            if campo == 'longitude':
+                return f'{-56.1 + aleatorio.uniform(-2, 2):.6f}'
+            return f'{aleatorio.uniform(0, 100):.2f}'
+        return f'{campo} {indice}'
+
+    def registros_de(self, tipo, quantidade, id_base=1):
+        """
+        Gera registros de um tipo como listas de (campo, texto)
+
+        Args:
+            tipo (str): Nome do tipo complexo
+            quantidade (int): Quantidade de registros
+            id_base (int): Primeiro idPacote gerado
+
+        Returns:
+            list: Registros
+        """
+        aleatorio = random.Random(self.semente)
+        campos = self.tipos[tipo]
+        return [
+            [(campo, self._valor(campo, tipo_xs, indice, aleatorio, id_base)) for campo, tipo_xs, _ in campos]
+            for indice in range(quantidade)
+        ]
+
+    def _quantidade(self, params):
+        quantidade = int(params.get('quantidade') or 0)
+        return quantidade if quantidade > 0 else self.registros
+
+    def _registros_operacao(self, operacao, params, tipo):
+        """Escolhe quantidade e IDs conforme os parâmetros da operação"""
+        quantidade = self._quantidade(params)
+        if 'idInicio' in params:
+            inicio = int(params['idInicio'])
+            fim = int(params.get('idFinal') or inicio)
+            quantidade = max(0, min(quantidade, fim - inicio + 1))
+            return self.registros_de(tipo, quantidade, inicio)
+        if operacao.startswith('obterPacotePosicoes'):
+            with self._lock:
+                id_base = self._proximo_id
+                self._proximo_id += quantidade
+            return self.registros_de(tipo, quantidade, id_base)
+        return self.registros_de(tipo, quantidade)
+
+    def responder(self, corpo):
+        """
+        Monta a resposta SOAP de uma requisição
+
+        Args:
+            corpo (bytes): Envelope recebido
+
+        Returns:
+            tuple: (status HTTP, bytes da resposta)
+        """
+        envelope = etree.fromstring(corpo)
+        requisicao = envelope.find(f'{{{NS_SOAP}}}Body')[0]
+        operacao = etree.QName(requisicao).localname
+        params = {etree.QName(filho).localname: filho.text for filho in requisicao}
+
+        if operacao not in self.operacoes:
+            return 500, self.fault('soap:Client', f'Operação desconhecida: {operacao}')
+        if params.get('senha') == SENHA_INVALIDA:
+            return 500, self.fault('soap:Server', 'Usuário ou senha inválidos')
+
+        tipo, _ = self.operacoes[operacao]
+        if tipo == 'string':
+            if operacao.endswith(('Json', 'JSON')):
+                tipo_json = operacao.replace('JSON', '').replace('Json', '')
+                tipo_json, _ = self.operacoes[tipo_json]
+                registros = self._registros_operacao(operacao, params, tipo_json)
+                texto = json.dumps([dict(registro) for registro in registros])
+            else:
+                texto = 'OK'
+            return 200, self.envelope(operacao, [texto], simples=True)
+
+        registros = self._registros_operacao(operacao, params, tipo)
+        return 200, self.envelope(operacao, registros)
+
+    def envelope(self, operacao, registros, simples=False):
+        """Serializa os registros no envelope de resposta"""
+        partes = [
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<S:Envelope xmlns:S="{NS_SOAP}"><S:Body>'
+            f'<ns2:{operacao}Response xmlns:ns2="{self.namespace}">'
+        ]
+        for registro in registros:
+            if simples:
+                partes.append(f'<return>{_escapar(registro)}</return>')
+                continue
+            partes.append('<return>')
+            for campo, texto in registro:
+                partes.append(f'<{campo}>{_escapar(texto)}</{campo}>')
+            partes.append('</return>')
+        partes.append(f'</ns2:{operacao}Response></S:Body></S:Envelope>')
+        return ''.join(partes).encode('utf-8')
+
+    def fault(self, codigo, mensagem):
+        """Serializa um soap:Fault"""
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<S:Envelope xmlns:S="{NS_SOAP}"><S:Body><S:Fault>'
+            f'<faultcode>{codigo}</faultcode><faultstring>{_escapar(mensagem)}</faultstring>'
+            f'</S:Fault></S:Body></S:Envelope>'
+        ).encode('utf-8')
+
+
+def _escapar(texto):
+    return texto.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _criar_handler(gerador, wsdl, latencia):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Cabeçalhos e corpo saem em escritas separadas; sem isso o atraso de
+        # ACK do cliente soma ~40 ms a cada resposta pequena
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _enviar(self, status, conteudo, tipo='text/xml; charset=utf-8'):
+            self.send_response(status)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(conteudo)))
+            self.end_headers()
+            self.wfile.write(conteudo)
+
+        def do_GET(self):
+            self._enviar(200, wsdl)
+
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if latencia:
+                time.sleep(latencia)
+            status, conteudo = gerador.responder(corpo)
+            self._enviar(status, conteudo)
+
+    return Handler
+
+
+class ServidorMock:
+    def __init__(self, porta=0, registros=100, latencia=0.0, caminho_wsdl=WSDL_PATH):
+        """
+        Servidor HTTP local com o WSDL e as respostas sintéticas
+
+        Args:
+            porta (int): Porta local (0 escolhe uma livre)
+            registros (int): Registros por resposta quando a operação não
+                recebe 'quantidade'
+            latencia (float): Atraso, em segundos, antes de cada resposta
+            caminho_wsdl (str): WSDL servido e usado para gerar as respostas
+        """
+        self.gerador = GeradorRespostas(caminho_wsdl, registros)
+        self.latencia = latencia
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), None)
+        self._servidor.daemon_threads = True
+        self.porta = self._servidor.server_address[1]
+        with open(caminho_wsdl, 'rb') as f:
+            wsdl = f.read()
+        endereco = f'http://127.0.0.1:{self.porta}/SasIntegra/SasIntegraWSService'.encode()
+        wsdl = wsdl.replace(b'https://sasintegra.sascar.com.br/SasIntegra/SasIntegraWSService', endereco)
+        self._servidor.RequestHandlerClass = _criar_handler(self.gerador, wsdl, latencia)
+        self._thread = None
+
+    @property
+    def wsdl_url(self):
+        """URL do WSDL servido (com o endereço apontando para este servidor)"""
+        return f'http://127.0.0.1:{self.porta}/SasIntegra/SasIntegraWSService?wsdl'
+
+    def iniciar(self):
+        """Inicia o servidor em uma thread de fundo"""
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        """Encerra o servidor"""
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor SOAP local que imita o SasIntegraWSService')
+    parser.add_argument('--porta', type=int, default=8088)
+    parser.add_argument('--registros', type=int, default=100)
+    parser.add_argument('--latencia', type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorMock(args.porta, args.registros, args.latencia)
+    print(f'WSDL: {servidor.wsdl_url}')
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == '__main__':
+    main()
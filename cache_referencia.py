@@ -0,0 +1,220 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# Validade padrão (em segundos) de cada operação de referência
+TTL_PADRAO = {
+    'veiculos': 60 * 60,
+    'clientes': 6 * 60 * 60,
+    'grupo_atuadores': 24 * 60 * 60,
+}
+
+_AUSENTE = object()
+
+
+class CacheTTL:
+    def __init__(self, maxsize=128, ttl=300, arquivo=None):
+        """
+        Cache LRU limitado em tamanho, com validade por entrada
+
+        Args:
+            maxsize (int): Máximo de entradas (as menos usadas saem primeiro)
+            ttl (float): Validade padrão das entradas em segundos
+            arquivo (str, optional): Arquivo onde o cache é persistido
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.arquivo = arquivo
+        self._dados = OrderedDict()
+        self._lock = threading.RLock()
+        if arquivo:
+            self.carregar()
+
+    def get(self, chave, padrao=None):
+        """Retorna o valor da chave se ainda estiver válido"""
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return padrao
+            expira_em, valor = item
+            if expira_em < time.time():
+                del self._dados[chave]
+                return padrao
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        """Guarda o valor, descartando a entrada menos usada se necessário"""
+        with self._lock:
+            self._dados[chave] = (time.time() + (self.ttl if ttl is None else ttl), valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+            if self.arquivo:
+                self.salvar()
+
+    def invalidar(self, chave=None):
+        """Remove uma chave, ou todo o cache se nenhuma for informada"""
+        with self._lock:
+            if chave is None:
+                self._dados.clear()
+            else:
+                self._dados.pop(chave, None)
+            if self.arquivo:
+                self.salvar()
+
+    def chaves(self):
+        """Lista as chaves guardadas (inclusive as já expiradas)"""
+        with self._lock:
+            return list(self._dados)
+
+    def __contains__(self, chave):
+        return self.get(chave, _AUSENTE) is not _AUSENTE
+
+    def __len__(self):
+        return len(self._dados)
+
+    def salvar(self):
+        """Grava o cache no arquivo (escrita atômica)"""
+        with self._lock:
+            temporario = self.arquivo + '.tmp'
+            with open(temporario, 'wb') as f:
+                pickle.dump(dict(self._dados), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, self.arquivo)
+
+    def carregar(self):
+        """Carrega do arquivo as entradas ainda válidas"""
+        try:
+            with open(self.arquivo, 'rb') as f:
+                dados = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return
+        agora = time.time()
+        with self._lock:
+            for chave, (expira_em, valor) in dados.items():
+                if expira_em >= agora:
+                    self._dados[chave] = (expira_em, valor)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+
+def normalizar_placa(placa):
+    """Normaliza a placa para busca (maiúsculas, sem espaços ou hífen)"""
+    return str(placa).upper().replace('-', '').replace(' ', '')
+
+
+class ReferenciaSascar:
+    def __init__(self, api, ttls=None, maxsize=128, arquivo=None):
+        """
+        Cache dos dados de referência que mudam pouco (veículos, clientes e atuadores)
+
+        As chaves incluem o usuário da conta, então várias contas podem usar o
+        mesmo arquivo. Buscas simultâneas da mesma chave ausente fazem uma só
+        chamada ao serviço; as demais esperam e usam o resultado dela.
+
+        Args:
+            api (SascarAPI): API da conta
+            ttls (dict, optional): Validade em segundos por operação
+                ('veiculos', 'clientes', 'grupo_atuadores')
+            maxsize (int): Máximo de respostas guardadas
+            arquivo (str, optional): Arquivo para persistir o cache em disco
+        """
+        self.api = api
+        self.ttls = dict(TTL_PADRAO, **(ttls or {}))
+        self.cache = CacheTTL(maxsize=maxsize, arquivo=arquivo)
+        self._indices = None
+        self._lock = threading.Lock()
+        # Chave em busca no serviço -> trava que as demais buscas dela esperam
+        self._buscas = {}
+        self._buscas_lock = threading.Lock()
+
+    def _obter(self, operacao, parametros, buscar):
+        """Retorna a resposta guardada ou busca (uma vez por chave) e guarda uma nova"""
+        chave = (operacao, self.api.username) + parametros
+        valor = self.cache.get(chave, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+        with self._buscas_lock:
+            trava = self._buscas.setdefault(chave, threading.Lock())
+        with trava:
+            valor = self.cache.get(chave, _AUSENTE)
+            if valor is not _AUSENTE:
+                return valor  # buscado por quem segurava a trava
+            try:
+                valor = buscar()
+                self.cache.set(chave, valor, ttl=self.ttls.get(operacao))
+            finally:
+                with self._buscas_lock:
+                    if self._buscas.get(chave) is trava:
+                        del self._buscas[chave]
+        return valor
+
+    def veiculos(self):
+        """
+        Lista de veículos (SascarAPI.obterVeiculos) guardada em cache
+
+        Returns:
+            list: Lista de dicionários com informações dos veículos
+        """
+        return self._obter('veiculos', (), self.api.obterVeiculos)
+
+    def clientes(self, quantidade=1, id_cliente=0):
+        """
+        Clientes (SascarAPI.obterClientes) guardados em cache por parâmetros
+
+        Returns:
+            list: Lista de dicionários com informações dos clientes
+        """
+        return self._obter(
+            'clientes',
+            (quantidade, id_cliente),
+            lambda: self.api.obterClientes(quantidade=quantidade, id_cliente=id_cliente),
+        )
+
+    def grupo_atuadores(self):
+        """
+        Sensores, atuadores e eventos (SascarAPI.obter_grupo_atuadores) em cache
+
+        Returns:
+            list: Lista de dicionários com informações dos atuadores
+        """
+        return self._obter('grupo_atuadores', (), self.api.obter_grupo_atuadores)
+
+    def _indexar(self):
+        """Retorna os índices por idVeiculo e placa, refeitos quando a lista expira"""
+        veiculos = self.veiculos()
+        with self._lock:
+            if self._indices is None or self._indices[0] is not veiculos:
+                por_id = {}
+                por_placa = {}
+                for veiculo in veiculos:
+                    if veiculo.get('idVeiculo') is not None:
+                        por_id[veiculo['idVeiculo']] = veiculo
+                    if veiculo.get('placa'):
+                        por_placa[normalizar_placa(veiculo['placa'])] = veiculo
+                self._indices = (veiculos, por_id, por_placa)
+            return self._indices
+
+    def veiculo_por_id(self, id_veiculo):
+        """Retorna o veículo com o idVeiculo informado (None se não existir)"""
+        return self._indexar()[1].get(id_veiculo)
+
+    def veiculo_por_placa(self, placa):
+        """Retorna o veículo com a placa informada (None se não existir)"""
+        return self._indexar()[2].get(normalizar_placa(placa))
+
+    def invalidar(self, operacao=None):
+        """
+        Descarta as respostas guardadas desta conta
+
+        Args:
+            operacao (str, optional): 'veiculos', 'clientes' ou 'grupo_atuadores';
+                se omitido, descarta tudo
+        """
+        for chave in self.cache.chaves():
+            if chave[1:2] == (self.api.username,) and (operacao is None or chave[0] == operacao):
+                self.cache.invalidar(chave)
+        with self._lock:
+            self._indices = None
@@ -0,0 +1,221 @@
+import math
+import warnings
+from array import array
+
+import numpy as np
+import pandas as pd
+from zeep.xsd.types.builtins import Boolean, Date, DateTime, Decimal, Double, Float, Integer
+
+from streaming import XSI_NIL, iterar_elementos
+from tempo import FUSO_SERVICO, para_datetime64
+
+FORMATOS = ('dataframe', 'arrow')
+
+INTEIRO = 'inteiro'
+REAL = 'real'
+DATA = 'data'
+BOOLEANO = 'booleano'
+TEXTO = 'texto'
+
+
+def tipo_coluna(xsd_type):
+    """
+    Escolhe o tipo da coluna a partir do tipo XSD do campo
+
+    Args:
+        xsd_type (zeep.xsd.Type): Tipo do campo no esquema
+
+    Returns:
+        str: INTEIRO, REAL, DATA, BOOLEANO ou TEXTO
+    """
+    if isinstance(xsd_type, Integer):
+        return INTEIRO
+    if isinstance(xsd_type, (Double, Float, Decimal)):
+        return REAL
+    if isinstance(xsd_type, (DateTime, Date)):
+        return DATA
+    if isinstance(xsd_type, Boolean):
+        return BOOLEANO
+    return TEXTO
+
+
+class Coluna:
+    """Valores de um campo guardados já no tipo final (array compacto quando possível)"""
+
+    __slots__ = ('nome', 'tipo', 'valores', 'nulos')
+
+    def __init__(self, nome, tipo):
+        self.nome = nome
+        self.tipo = tipo
+        self.nulos = None
+        if tipo == INTEIRO:
+            self.valores = array('q')
+            self.nulos = bytearray()
+        elif tipo == REAL:
+            self.valores = array('d')
+        elif tipo == BOOLEANO:
+            self.valores = array('b')
+            self.nulos = bytearray()
+        else:
+            self.valores = []
+
+    def adicionar_texto(self, texto):
+        """Acrescenta o valor lido do XML (None para nulo)"""
+        tipo = self.tipo
+        if texto is None:
+            self.adicionar_nulo()
+        elif tipo == INTEIRO:
+            self.valores.append(int(texto))
+            self.nulos.append(0)
+        elif tipo == REAL:
+            self.valores.append(float(texto))
+        elif tipo == BOOLEANO:
+            self.valores.append(texto in ('true', '1'))
+            self.nulos.append(0)
+        else:
+            self.valores.append(texto)
+
+    def adicionar_valor(self, valor):
+        """Acrescenta um valor Python já convertido (None para nulo)"""
+        if valor is None:
+            self.adicionar_nulo()
+        elif self.tipo in (INTEIRO, BOOLEANO):
+            self.valores.append(int(valor))
+            self.nulos.append(0)
+        elif self.tipo == REAL:
+            self.valores.append(float(valor))
+        else:
+            self.valores.append(valor)
+
+    def adicionar_nulo(self):
+        if self.tipo == REAL:
+            self.valores.append(math.nan)
+        elif self.nulos is not None:
+            self.valores.append(0)
+            self.nulos.append(1)
+        else:
+            self.valores.append(None)
+
+    def __len__(self):
+        return len(self.valores)
+
+    def para_serie(self):
+        """Converte a coluna em pandas.Series tipada"""
+        if self.tipo == INTEIRO:
+            dados = np.frombuffer(self.valores, dtype=np.int64) if len(self.valores) else np.empty(0, np.int64)
+            if any(self.nulos):
+                mascara = np.frombuffer(bytes(self.nulos), dtype=np.bool_)
+                return pd.Series(pd.arrays.IntegerArray(dados.copy(), mascara.copy()), name=self.nome)
+            return pd.Series(dados, name=self.nome, copy=False)
+        if self.tipo == REAL:
+            dados = np.frombuffer(self.valores, dtype=np.float64) if len(self.valores) else np.empty(0, np.float64)
+            return pd.Series(dados, name=self.nome, copy=False)
+        if self.tipo == BOOLEANO:
+            dados = np.frombuffer(self.valores, dtype=np.int8).astype(np.bool_)
+            if any(self.nulos):
+                mascara = np.frombuffer(bytes(self.nulos), dtype=np.bool_)
+                return pd.Series(pd.arrays.BooleanArray(dados, mascara.copy()), name=self.nome)
+            return pd.Series(dados, name=self.nome)
+        if self.tipo == DATA:
+            # Conversão vetorizada para o horário local do serviço, como nos demais caminhos
+            return pd.Series(para_datetime64(self.valores, FUSO_SERVICO), name=self.nome)
+        return pd.Series(self.valores, name=self.nome, dtype=object)
+
+
+class TabelaColunar:
+    def __init__(self, esquema):
+        """
+        Acumula registros diretamente em colunas tipadas
+
+        Args:
+            esquema (dict): Tipo XSD de cada campo (ver streaming.esquema_do_retorno);
+                campos complexos aninhados são ignorados, com um aviso
+        """
+        self.colunas = {
+            nome: Coluna(nome, tipo_coluna(tipo))
+            for nome, tipo in esquema.items()
+            if not isinstance(tipo, dict)
+        }
+        ignorados = [nome for nome, tipo in esquema.items() if isinstance(tipo, dict)]
+        if ignorados:
+            warnings.warn(
+                f"Campos complexos fora do formato colunar: {', '.join(ignorados)} (use formato=None para lê-los)",
+                stacklevel=2,
+            )
+        self.total = 0
+
+    def _completar(self):
+        """Preenche com nulo as colunas ausentes no último registro"""
+        self.total += 1
+        for coluna in self.colunas.values():
+            if len(coluna) < self.total:
+                coluna.adicionar_nulo()
+
+    def adicionar_elemento(self, elem):
+        """Acrescenta um registro lido do XML, sem criar dicionário intermediário"""
+        colunas = self.colunas
+        for filho in elem:
+            tag = filho.tag
+            if not isinstance(tag, str):
+                continue
+            coluna = colunas.get(tag.rpartition('}')[2])
+            if coluna is None or len(coluna) > self.total:
+                continue
+            if filho.get(XSI_NIL) in ('true', '1'):
+                coluna.adicionar_nulo()
+            else:
+                coluna.adicionar_texto(filho.text)
+        self._completar()
+
+    def adicionar_registro(self, registro):
+        """Acrescenta um registro já convertido em dicionário"""
+        for nome, coluna in self.colunas.items():
+            valor = registro.get(nome)
+            if coluna.tipo == DATA and valor is not None and not isinstance(valor, str):
+                valor = valor.isoformat()
+            coluna.adicionar_valor(valor)
+        self.total += 1
+
+    def para_dataframe(self):
+        """
+        Returns:
+            pandas.DataFrame: Colunas tipadas (int64, float64 e datetime64 no
+                horário local do serviço, sem fuso)
+        """
+        return pd.DataFrame({nome: coluna.para_serie() for nome, coluna in self.colunas.items()})
+
+    def para_arrow(self):
+        """
+        Returns:
+            pyarrow.Table: Tabela Arrow com as mesmas colunas
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Formato 'arrow' requer o pacote pyarrow (pip install pyarrow)") from e
+        return pa.Table.from_pandas(self.para_dataframe(), preserve_index=False)
+
+    def resultado(self, formato):
+        """Retorna a tabela no formato pedido ('dataframe' ou 'arrow')"""
+        if formato == 'arrow':
+            return self.para_arrow()
+        return self.para_dataframe()
+
+
+def ler_colunas(fonte, esquema, formato='dataframe', tag='return'):
+    """
+    Lê a resposta SOAP de forma incremental preenchendo colunas tipadas
+
+    Args:
+        fonte (bytes | file): Resposta SOAP em bytes ou objeto de arquivo
+        esquema (dict): Tipo XSD de cada campo (ver streaming.esquema_do_retorno)
+        formato (str): 'dataframe' ou 'arrow'
+        tag (str): Nome local do elemento de cada registro
+
+    Returns:
+        pandas.DataFrame | pyarrow.Table: Registros em colunas
+    """
+    tabela = TabelaColunar(esquema)
+    for elem in iterar_elementos(fonte, tag):
+        tabela.adicionar_elemento(elem)
+    return tabela.resultado(formato)
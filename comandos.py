@@ -0,0 +1,275 @@
+import heapq
+import math
+import threading
+import time
+import unicodedata
+from functools import partial
+from concurrent.futures import CancelledError, Future, InvalidStateError, ThreadPoolExecutor, wait
+
+from excecoes import ErroTempoEsgotado, classificar
+
+# Status que encerram o acompanhamento de um comando (sem acento, maiúsculas)
+ESTADOS_FINAIS = frozenset({
+    'EXECUTADO', 'CONCLUIDO', 'SUCESSO', 'CANCELADO', 'EXPIRADO', 'ERRO', 'FALHA',
+    'REJEITADO', 'RECUSADO', 'NAO EXECUTADO', 'NAO ENVIADO', 'TIMEOUT',
+})
+
+
+def normalizar_status(status):
+    """Remove acentos e espaços extras e converte para maiúsculas"""
+    texto = unicodedata.normalize('NFKD', str(status or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.replace('_', ' ').upper().split())
+
+
+class _Acompanhamento:
+    __slots__ = ('ticket', 'ticket_sascar', 'futuro', 'intervalo', 'proxima', 'prazo', 'consultas', 'ultimo')
+
+    def __init__(self, ticket, ticket_sascar, intervalo, prazo):
+        self.ticket = ticket
+        self.ticket_sascar = ticket_sascar
+        self.futuro = Future()
+        self.intervalo = intervalo
+        self.proxima = 0.0
+        self.prazo = prazo
+        self.consultas = 0
+        self.ultimo = None
+
+
+class RastreadorComandos:
+    def __init__(self, api, max_workers=8, intervalo_inicial=2, intervalo_maximo=60, fator=2,
+                 prazo=600, resolucao=0.5, estados_finais=ESTADOS_FINAIS):
+        """
+        Acompanha o status de muitos comandos com consultas agrupadas
+
+        Um único agendador consulta, a cada rodada, todos os tickets cuja
+        próxima consulta venceu, em paralelo (max_workers chamadas); cada ticket
+        é reagendado assim que a sua consulta termina, sem esperar as demais
+        da rodada. Cada
+        ticket tem seu próprio intervalo, que começa em intervalo_inicial e é
+        multiplicado por fator a cada consulta sem estado final, até
+        intervalo_maximo. Os horários são arredondados para múltiplos de
+        resolucao, para que tickets com vencimentos próximos saiam na mesma
+        rodada.
+
+        Args:
+            api (SascarAPI): API da conta
+            max_workers (int): Consultas simultâneas por rodada
+            intervalo_inicial (float): Segundos até a primeira nova consulta
+            intervalo_maximo (float): Teto do intervalo entre consultas
+            fator (float): Multiplicador do intervalo a cada consulta
+            prazo (float, optional): Segundos até desistir do ticket (None: sem prazo)
+            resolucao (float): Granularidade do agendamento em segundos
+            estados_finais (set): Status (normalizados) que encerram o acompanhamento
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.intervalo_inicial = intervalo_inicial
+        self.intervalo_maximo = intervalo_maximo
+        self.fator = fator
+        self.prazo = prazo
+        self.resolucao = resolucao
+        self.estados_finais = frozenset(normalizar_status(estado) for estado in estados_finais)
+        self.consultas = 0
+        self._acompanhamentos = {}
+        self._agenda = []
+        self._condicao = threading.Condition()
+        self._executor = None
+        self._agendador = None
+        self._parar = False
+
+    def final(self, status):
+        """True se o status encerra o acompanhamento"""
+        return normalizar_status(status) in self.estados_finais
+
+    def _arredondar(self, instante):
+        if not self.resolucao:
+            return instante
+        return math.ceil(instante / self.resolucao) * self.resolucao
+
+    def acompanhar(self, ticket, ticket_sascar=False, callback=None):
+        """
+        Passa a acompanhar um ticket
+
+        Pedidos repetidos do mesmo ticket compartilham a mesma consulta e o
+        mesmo Future.
+
+        Args:
+            ticket (int): Ticket do comando
+            ticket_sascar (bool): Se True, é o ticket interno da Sascar
+            callback (callable, optional): Chamado com o Future ao terminar
+
+        Returns:
+            Future: Resolvido com o registro de status final (dict) ou com o
+                erro da consulta / ErroTempoEsgotado ao passar do prazo
+        """
+        chave = (ticket, bool(ticket_sascar))
+        with self._condicao:
+            if self._parar:
+                raise RuntimeError("Rastreador de comandos encerrado")
+            acompanhamento = self._acompanhamentos.get(chave)
+            if acompanhamento is None:
+                agora = time.monotonic()
+                prazo = agora + self.prazo if self.prazo else None
+                acompanhamento = _Acompanhamento(ticket, bool(ticket_sascar), self.intervalo_inicial, prazo)
+                acompanhamento.proxima = self._arredondar(agora)
+                self._acompanhamentos[chave] = acompanhamento
+                heapq.heappush(self._agenda, (acompanhamento.proxima, chave))
+                self._iniciar()
+                self._condicao.notify()
+        if callback is not None:
+            acompanhamento.futuro.add_done_callback(callback)
+        return acompanhamento.futuro
+
+    def acompanhar_varios(self, tickets, ticket_sascar=False, callback=None):
+        """
+        Returns:
+            dict: {ticket: Future}
+        """
+        return {ticket: self.acompanhar(ticket, ticket_sascar, callback) for ticket in tickets}
+
+    def aguardar(self, tickets=None, timeout=None):
+        """
+        Espera os tickets terminarem (padrão: todos os acompanhados agora)
+
+        Args:
+            tickets (iterable, optional): Tickets (ticket_sascar=False) ou tuplas
+                (ticket, ticket_sascar)
+            timeout (float, optional): Segundos de espera
+
+        Returns:
+            dict: {(ticket, ticket_sascar): registro de status final ou exceção}
+                (CancelledError para os cancelados por cancelar() ou parar())
+        """
+        with self._condicao:
+            if tickets is None:
+                futuros = {chave: a.futuro for chave, a in self._acompanhamentos.items()}
+            else:
+                futuros = {}
+                for ticket in tickets:
+                    chave = (ticket[0], bool(ticket[1])) if isinstance(ticket, tuple) else (ticket, False)
+                    acompanhamento = self._acompanhamentos.get(chave)
+                    if acompanhamento is not None:
+                        futuros[chave] = acompanhamento.futuro
+        wait(list(futuros.values()), timeout=timeout)
+        resultados = {}
+        for ticket, futuro in futuros.items():
+            if futuro.cancelled():
+                resultados[ticket] = CancelledError(f"Acompanhamento do comando {ticket[0]} cancelado")
+            elif futuro.done():
+                resultados[ticket] = futuro.exception() or futuro.result()
+        return resultados
+
+    def cancelar(self, ticket, ticket_sascar=False):
+        """Para de acompanhar o ticket (o Future é cancelado)"""
+        with self._condicao:
+            acompanhamento = self._acompanhamentos.pop((ticket, bool(ticket_sascar)), None)
+        if acompanhamento is not None:
+            acompanhamento.futuro.cancel()
+
+    def pendentes(self):
+        """Quantidade de tickets ainda sem estado final"""
+        with self._condicao:
+            return len(self._acompanhamentos)
+
+    def _iniciar(self):
+        if self._agendador is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sascar-comandos')
+            self._agendador = threading.Thread(target=self._executar, name='sascar-comandos-agenda', daemon=True)
+            self._agendador.start()
+
+    def _vencidos(self):
+        """Espera a próxima rodada e retira da agenda os tickets vencidos"""
+        with self._condicao:
+            while not self._parar:
+                agora = time.monotonic()
+                while self._agenda and self._acompanhamentos.get(self._agenda[0][1]) is None:
+                    heapq.heappop(self._agenda)
+                if self._agenda and self._agenda[0][0] <= agora:
+                    vencidos = []
+                    while self._agenda and self._agenda[0][0] <= agora:
+                        _, chave = heapq.heappop(self._agenda)
+                        acompanhamento = self._acompanhamentos.get(chave)
+                        if acompanhamento is not None:
+                            vencidos.append(acompanhamento)
+                    return vencidos
+                self._condicao.wait(self._agenda[0][0] - agora if self._agenda else None)
+            return None
+
+    def _consultar(self, acompanhamento):
+        registros = self.api.obterStatusComando(acompanhamento.ticket, ticket_sascar=acompanhamento.ticket_sascar)
+        return list(registros or [])
+
+    def _processar(self, acompanhamento, futuro_consulta):
+        """Resolve o ticket ou o reagenda com o intervalo dobrado"""
+        chave = (acompanhamento.ticket, acompanhamento.ticket_sascar)
+        acompanhamento.consultas += 1
+        erro = futuro_consulta.exception()
+        if erro is None:
+            registros = futuro_consulta.result()
+            if registros:
+                acompanhamento.ultimo = registros[-1]
+                if self.final(acompanhamento.ultimo.get('status')):
+                    self._concluir(chave, acompanhamento, resultado=acompanhamento.ultimo)
+                    return
+        elif not classificar(erro).retentavel:
+            self._concluir(chave, acompanhamento, erro=erro)
+            return
+
+        agora = time.monotonic()
+        if acompanhamento.prazo is not None and agora >= acompanhamento.prazo:
+            self._concluir(chave, acompanhamento, erro=ErroTempoEsgotado(
+                f"Comando {acompanhamento.ticket} sem status final após {self.prazo}s "
+                f"(último: {acompanhamento.ultimo.get('status') if acompanhamento.ultimo else 'nenhum'})"
+            ))
+            return
+        with self._condicao:
+            if self._acompanhamentos.get(chave) is not acompanhamento:
+                return
+            acompanhamento.proxima = self._arredondar(agora + acompanhamento.intervalo)
+            acompanhamento.intervalo = min(acompanhamento.intervalo * self.fator, self.intervalo_maximo)
+            heapq.heappush(self._agenda, (acompanhamento.proxima, chave))
+            self._condicao.notify()
+
+    def _concluir(self, chave, acompanhamento, resultado=None, erro=None):
+        with self._condicao:
+            if self._acompanhamentos.get(chave) is acompanhamento:
+                del self._acompanhamentos[chave]
+        try:
+            if erro is not None:
+                acompanhamento.futuro.set_exception(erro)
+            else:
+                acompanhamento.futuro.set_result(resultado)
+        except InvalidStateError:
+            pass  # cancelado enquanto a consulta estava em andamento
+
+    def _executar(self):
+        while True:
+            vencidos = self._vencidos()
+            if vencidos is None:
+                return
+            self.consultas += len(vencidos)
+            for acompanhamento in vencidos:
+                # Uma consulta lenta não segura as demais: cada uma é processada ao terminar
+                futuro_consulta = self._executor.submit(self._consultar, acompanhamento)
+                futuro_consulta.add_done_callback(partial(self._processar, acompanhamento))
+
+    def parar(self):
+        """Encerra o agendador; os tickets pendentes são cancelados"""
+        with self._condicao:
+            self._parar = True
+            pendentes = list(self._acompanhamentos.values())
+            self._acompanhamentos.clear()
+            self._condicao.notify_all()
+        for acompanhamento in pendentes:
+            acompanhamento.futuro.cancel()
+        if self._agendador is not None:
+            self._agendador.join()
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.parar()
+        return False
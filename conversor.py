@@ -0,0 +1,149 @@
+import threading
+
+from zeep.xsd import AnySimpleType, ComplexType
+from zeep.xsd.valueobjects import CompoundValue
+
+# Conversores já gerados, indexados pela classe de valor do zeep
+_conversores = {}
+_conversores_lock = threading.Lock()
+
+# Acesso direto ao atributo, sem passar pelo __getattribute__ do CompoundValue
+_valores = object.__getattribute__
+
+
+def _campos_compostos(xsd_type):
+    """
+    Lista os campos de um tipo complexo que podem conter objetos Zeep
+
+    Args:
+        xsd_type (zeep.xsd.ComplexType): Tipo do esquema
+
+    Returns:
+        list: Nomes dos campos que precisam de conversão
+    """
+    campos = []
+    for nome, elemento in xsd_type.elements:
+        tipo = getattr(elemento, 'type', None)
+        # Tipos simples nunca geram objetos Zeep; complexos e xsd:anyType podem
+        if tipo is None or not isinstance(tipo, AnySimpleType):
+            campos.append(nome)
+    return campos
+
+
+def _converter_valor(valor):
+    """Converte um valor que pode ser objeto Zeep, lista ou valor simples"""
+    if isinstance(valor, CompoundValue):
+        return conversor_para(type(valor))(valor)
+    if isinstance(valor, list):
+        return [_converter_valor(item) for item in valor]
+    return valor
+
+
+def _converter_plano(obj):
+    """Conversor dos tipos que só possuem campos simples"""
+    return dict(_valores(obj, '__values__'))
+
+
+def _criar_conversor(xsd_type):
+    """
+    Gera o conversor de um tipo complexo a partir do esquema do WSDL
+
+    Args:
+        xsd_type (zeep.xsd.ComplexType): Tipo do esquema (None se desconhecido)
+
+    Returns:
+        function: Função que converte um objeto do tipo para dicionário
+    """
+    if xsd_type is None:
+        # Objeto sem esquema (ex.: recriado via pickle): verifica todos os campos
+        def converter(obj):
+            return {nome: _converter_valor(valor) for nome, valor in _valores(obj, '__values__').items()}
+        return converter
+
+    compostos = _campos_compostos(xsd_type)
+    if not compostos:
+        return _converter_plano
+
+    def converter(obj):
+        registro = dict(_valores(obj, '__values__'))
+        for nome in compostos:
+            valor = registro.get(nome)
+            if valor is not None:
+                registro[nome] = _converter_valor(valor)
+        return registro
+    return converter
+
+
+def conversor_para(classe):
+    """
+    Retorna o conversor (gerado uma única vez) da classe de valor do zeep
+
+    Args:
+        classe (type): Classe do objeto retornado pelo zeep
+
+    Returns:
+        function: Função que converte o objeto para dicionário
+    """
+    conversor = _conversores.get(classe)
+    if conversor is None:
+        with _conversores_lock:
+            conversor = _conversores.get(classe)
+            if conversor is None:
+                conversor = _criar_conversor(getattr(classe, '_xsd_type', None))
+                _conversores[classe] = conversor
+    return conversor
+
+
+def preparar_conversores(client):
+    """
+    Gera antecipadamente os conversores de todos os tipos do WSDL
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+
+    Returns:
+        int: Quantidade de conversores gerados
+    """
+    total = 0
+    for xsd_type in client.wsdl.types.types:
+        if isinstance(xsd_type, ComplexType):
+            conversor_para(xsd_type._value_class)
+            total += 1
+    return total
+
+
+def converter_lista(itens, alternativo=None):
+    """
+    Converte uma lista de objetos Zeep em uma lista de dicionários
+
+    Args:
+        itens (list): Resposta da API
+        alternativo (function, optional): Conversor para objetos que não são
+            valores do zeep mas possuem atributos
+
+    Returns:
+        list: Lista de dicionários
+    """
+    resultado = []
+    append = resultado.append
+    classe_atual = None
+    conversor = None
+    plano = False
+    for item in itens:
+        classe = type(item)
+        if classe is not classe_atual:
+            classe_atual = classe
+            if issubclass(classe, CompoundValue):
+                conversor = conversor_para(classe)
+            elif alternativo is not None and hasattr(item, '__dict__'):
+                conversor = alternativo
+            else:
+                conversor = None
+            plano = conversor is _converter_plano
+        if plano:
+            append(dict(_valores(item, '__values__')))
+        elif conversor is not None:
+            append(conversor(item))
+        else:
+            append(item)
+    return resultado
@@ -0,0 +1,400 @@
+"""
+Daemon de ingestão: threads de rede buscam as respostas SOAP brutas e um
+pool de processos faz a leitura do XML e a conversão dos registros, ligados
+por filas limitadas (quando uma etapa atrasa, as anteriores esperam).
+
+    fonte -> [fila de tarefas] -> threads de I/O -> [fila de conversão]
+          -> processos (XML -> dicts) -> gravação no destino
+
+Uso:
+    python daemon.py posicoes --saida posicoes --formato jsonl --io 4 --processos 4
+    python daemon.py range --inicio 1000000 --fim 2000000 --saida backfill.parquet
+    python daemon.py telemetria --veiculos 1231226,1231227 --data-inicio '2025-05-20 00:00:00' \\
+        --data-final '2025-05-21 00:00:00' --saida telemetria.csv
+    python daemon.py range --inicio 1000000 --fim 2000000 --saida reprocesso.parquet \\
+        --gravacao respostas/ --modo-gravacao reproduzir
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from zeep.exceptions import TransportError
+from zeep.xsd.types import builtins
+
+from excecoes import converter_erro
+from exportacao import ArquivoRotativo, criar_escritor
+from metricas import METRICAS
+from streaming import abrir_resposta, esquema_do_retorno, iterar_elementos, iterar_registros
+from telemetria_lote import OPERACOES
+from tempo import FUSO_SERVICO, janelas_frota
+
+# Tipos XSD nativos por nome qualificado, para reconstruir os conversores nos processos
+_TIPOS_XSD = {cls._default_qname.text: cls for cls in builtins._types if getattr(cls, '_default_qname', None)}
+
+_FIM = object()
+
+# Processos de conversão nascem de um servidor limpo, nunca de um fork do processo
+# com threads de I/O segurando locks (métricas, logging, sqlite)
+_CONTEXTO_PROCESSOS = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def nomes_dos_tipos(esquema):
+    """
+    Troca os tipos XSD do esquema pelos seus nomes qualificados
+
+    Os objetos de tipo do zeep não são serializáveis; os nomes são enviados
+    aos processos de conversão.
+
+    Args:
+        esquema (dict): Ver streaming.esquema_do_retorno
+
+    Returns:
+        dict: Nome qualificado de cada campo (mapas aninhados nos complexos)
+    """
+    return {
+        campo: nomes_dos_tipos(tipo) if isinstance(tipo, dict) else tipo.qname.text
+        for campo, tipo in esquema.items()
+    }
+
+
+def _conversores_por_nome(nomes):
+    conversores = {}
+    for campo, nome in nomes.items():
+        if isinstance(nome, dict):
+            conversores[campo] = _conversores_por_nome(nome)
+        elif nome in _TIPOS_XSD:
+            conversores[campo] = _TIPOS_XSD[nome]().pythonvalue
+    return conversores
+
+
+def converter_resposta(conteudo, nomes):
+    """
+    Lê uma resposta SOAP bruta (executado no pool de processos)
+
+    Args:
+        conteudo (bytes): Corpo da resposta
+        nomes (dict): Tipos dos campos (ver nomes_dos_tipos)
+
+    Returns:
+        list: Registros em dicionários
+    """
+    return list(iterar_registros(conteudo, _conversores_por_nome(nomes)))
+
+
+class FilaPosicoes:
+    def __init__(self, quantidade=3000, motorista=False, com_placa=False, espera_minima=1, espera_maxima=60):
+        """
+        Fonte contínua da fila de posições (obterPacotePosicoes*)
+
+        Enquanto o serviço devolve pacotes cheios as tarefas saem sem pausa;
+        após um pacote incompleto a fonte espera, dobrando a espera enquanto
+        a fila continuar vazia.
+
+        Args:
+            quantidade (int): Registros por pacote
+            motorista (bool): Se True, inclui informações do motorista
+            com_placa (bool): Se True, inclui a placa do veículo
+            espera_minima (float): Espera após um pacote incompleto
+            espera_maxima (float): Espera máxima com a fila vazia
+        """
+        if motorista:
+            self.operacao = 'obterPacotePosicoesMotoristaComPlaca' if com_placa else 'obterPacotePosicoesMotorista'
+        else:
+            self.operacao = 'obterPacotePosicoes'
+        self.quantidade = quantidade
+        self.espera_minima = espera_minima
+        self.espera_maxima = espera_maxima
+        self._espera = 0
+        self._parar = threading.Event()
+
+    def __iter__(self):
+        while not self._parar.is_set():
+            if self._espera:
+                self._parar.wait(self._espera)
+                if self._parar.is_set():
+                    return
+            yield self.operacao, {'quantidade': self.quantidade}
+
+    def concluida(self, tarefa, registros):
+        """Ajusta a espera conforme o tamanho do pacote recebido"""
+        if registros >= self.quantidade:
+            self._espera = 0
+        elif registros:
+            self._espera = self.espera_minima
+        else:
+            self._espera = min(max(self._espera * 2, self.espera_minima), self.espera_maxima)
+
+    def parar(self):
+        self._parar.set()
+
+
+def tarefas_range(id_inicio, id_final, quantidade=3000, motorista=False):
+    """
+    Divide um range de idPacote em tarefas de até quantidade IDs
+
+    Yields:
+        tuple: (operação, parâmetros)
+    """
+    operacao = 'obterPacotePosicaoMotoristaPorRange' if motorista else 'obterPacotePosicaoPorRange'
+    for inicio in range(id_inicio, id_final + 1, quantidade):
+        fim = min(inicio + quantidade - 1, id_final)
+        yield operacao, {'idInicio': inicio, 'idFinal': fim, 'quantidade': quantidade}
+
+
+def tarefas_telemetria(veiculos, data_inicio, data_final, operacao='evento', janela='6h', fuso=FUSO_SERVICO):
+    """
+    Divide o período de cada veículo em janelas de telemetria alinhadas ao relógio
+
+    Args:
+        veiculos (list): IDs dos veículos
+        data_inicio (datetime | str): Início do período
+        data_final (datetime | str): Fim do período
+        operacao (str): 'evento', 'data_chegada' ou 'delta' (ver telemetria_lote.OPERACOES)
+        janela (str | timedelta): Tamanho de cada janela ('h', '6h', 'dia', ...; ver tempo.janelas)
+        fuso (str): Fuso usado no alinhamento das janelas
+
+    Yields:
+        tuple: (operação, parâmetros)
+    """
+    if operacao not in OPERACOES:
+        raise ValueError(f"Operação inválida: {operacao}")
+    consultas = janelas_frota(veiculos, data_inicio, data_final, janela, fuso)
+    for veiculo, inicio, fim in zip(consultas['idVeiculo'].tolist(), consultas['dataInicio'], consultas['dataFinal']):
+        yield OPERACOES[operacao], {'idVeiculo': veiculo, 'dataInicio': inicio, 'dataFinal': fim}
+
+
+class DaemonIngestao:
+    def __init__(self, api, fonte, destino, io_workers=4, processos=None, tamanho_fila=16, ao_erro=None):
+        """
+        Pipeline de ingestão com I/O em threads e conversão em processos
+
+        Args:
+            api (SascarAPI): API da conta (credenciais, cliente, resiliência e
+                limite de concorrência são reaproveitados)
+            fonte (iterable): Tarefas (operação, parâmetros); se tiver
+                concluida(tarefa, registros) e parar(), são chamados pelo daemon
+            destino: Objeto com escrever(registros) (ex.: exportacao.EscritorJSONL)
+                ou função que recebe a lista de registros
+            io_workers (int): Threads buscando respostas em paralelo
+            processos (int, optional): Processos de conversão (padrão: os.cpu_count())
+            tamanho_fila (int): Capacidade de cada fila entre as etapas
+            ao_erro (callable, optional): Recebe (tarefa, erro) das tarefas que
+                falharam; sem ele os erros só são contados
+        """
+        self.api = api
+        self.fonte = fonte
+        self.destino = destino
+        self.io_workers = io_workers
+        self.processos = processos or os.cpu_count()
+        self.tamanho_fila = tamanho_fila
+        self.ao_erro = ao_erro
+        self.tarefas = 0
+        self.registros = 0
+        self.bytes = 0
+        self.erros = 0
+        self._nomes = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+    def _nomes_da_operacao(self, operacao):
+        nomes = self._nomes.get(operacao)
+        if nomes is None:
+            nomes = self._nomes[operacao] = nomes_dos_tipos(esquema_do_retorno(self.api.client, operacao))
+        return nomes
+
+    def _buscar(self, operacao, params):
+        """Executa a requisição e devolve o corpo bruto (Faults e erros HTTP já levantados aqui)"""
+        params = self.api.com_credenciais(params)
+
+        def tentativa():
+            with METRICAS.chamada(operacao), abrir_resposta(self.api.client, operacao, params) as response:
+                conteudo = response.raw.read()
+                if response.status_code >= 400:
+                    for _ in iterar_elementos(conteudo):
+                        pass  # levanta o Fault, se o corpo tiver um
+                    raise converter_erro(
+                        TransportError(f"Status HTTP {response.status_code}", response.status_code, conteudo),
+                        f"Erro HTTP em {operacao}",
+                    )
+                METRICAS.incrementar('bytes_recebidos', operacao, len(conteudo))
+                return conteudo
+
+        return self.api.executar_protegido(operacao, tentativa)
+
+    def _erro(self, tarefa, erro):
+        with self._lock:
+            self.erros += 1
+        if self.ao_erro is not None:
+            self.ao_erro(tarefa, converter_erro(erro, f"Erro na ingestão de {tarefa[0]}"))
+
+    def _alimentar(self, tarefas):
+        try:
+            for tarefa in self.fonte:
+                if self._parar.is_set():
+                    break
+                tarefas.put(tarefa)
+        finally:
+            for _ in range(self.io_workers):
+                tarefas.put(_FIM)
+
+    def _trabalhar_io(self, tarefas, conversoes, pool):
+        while True:
+            tarefa = tarefas.get()
+            if tarefa is _FIM:
+                return
+            if self._parar.is_set():
+                continue
+            operacao, params = tarefa
+            try:
+                conteudo = self._buscar(operacao, params)
+            except Exception as e:
+                self._erro(tarefa, e)
+                self._concluida(tarefa, 0)
+                continue
+            with self._lock:
+                self.bytes += len(conteudo)
+            conversoes.put((tarefa, pool.submit(converter_resposta, conteudo, self._nomes_da_operacao(operacao))))
+
+    def _concluida(self, tarefa, registros):
+        concluida = getattr(self.fonte, 'concluida', None)
+        if concluida is not None:
+            concluida(tarefa, registros)
+
+    def _gravar(self, conversoes):
+        escrever = getattr(self.destino, 'escrever', self.destino)
+        while True:
+            item = conversoes.get()
+            if item is _FIM:
+                return
+            tarefa, futuro = item
+            try:
+                registros = futuro.result()
+            except Exception as e:
+                self._erro(tarefa, e)
+                self._concluida(tarefa, 0)
+                continue
+            if registros:
+                try:
+                    escrever(registros)
+                except Exception as e:
+                    # Disco cheio ou registro inválido: a tarefa conta como erro e a
+                    # fila continua sendo esvaziada para as threads de I/O não travarem
+                    self._erro(tarefa, e)
+                    self._concluida(tarefa, 0)
+                    continue
+            with self._lock:
+                self.tarefas += 1
+                self.registros += len(registros)
+            METRICAS.incrementar('registros', tarefa[0], len(registros))
+            self._concluida(tarefa, len(registros))
+
+    def executar(self):
+        """
+        Processa as tarefas da fonte até ela acabar ou parar() ser chamado
+
+        Returns:
+            dict: Estatísticas da execução
+        """
+        tarefas = queue.Queue(self.tamanho_fila)
+        conversoes = queue.Queue(self.tamanho_fila)
+        inicio = time.monotonic()
+        contexto = multiprocessing.get_context(_CONTEXTO_PROCESSOS)
+        with ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto) as pool:
+            alimentador = threading.Thread(target=self._alimentar, args=(tarefas,), name='sascar-fonte', daemon=True)
+            trabalhadores = [
+                threading.Thread(target=self._trabalhar_io, args=(tarefas, conversoes, pool),
+                                 name=f'sascar-io-{i}', daemon=True)
+                for i in range(self.io_workers)
+            ]
+            gravador = threading.Thread(target=self._gravar, args=(conversoes,), name='sascar-gravacao', daemon=True)
+            gravador.start()
+            for trabalhador in trabalhadores:
+                trabalhador.start()
+            alimentador.start()
+            alimentador.join()
+            for trabalhador in trabalhadores:
+                trabalhador.join()
+            conversoes.put(_FIM)
+            gravador.join()
+        return dict(self.estatisticas(), segundos=time.monotonic() - inicio)
+
+    def parar(self):
+        """Para de buscar novas tarefas; as já baixadas são convertidas e gravadas"""
+        self._parar.set()
+        parar_fonte = getattr(self.fonte, 'parar', None)
+        if parar_fonte is not None:
+            parar_fonte()
+
+    def estatisticas(self):
+        with self._lock:
+            return {'tarefas': self.tarefas, 'registros': self.registros, 'bytes': self.bytes, 'erros': self.erros}
+
+
+def main():
+    from gravacao import CACHE, MODOS, Gravador
+    from sascar import SascarAPI
+
+    parser = argparse.ArgumentParser(description='Daemon de ingestão da Sascar')
+    parser.add_argument('modo', choices=('posicoes', 'range', 'telemetria'))
+    parser.add_argument('--saida', required=True, help='Arquivo, diretório (parquet) ou prefixo (rotação)')
+    parser.add_argument('--formato', help="'csv', 'jsonl', 'parquet' ou 'xlsx' (padrão: pela extensão)")
+    parser.add_argument('--rotacao-mb', type=float, help='Abre um novo arquivo a cada N MiB (modo posicoes)')
+    parser.add_argument('--io', type=int, default=4, help='Threads de rede')
+    parser.add_argument('--processos', type=int, help='Processos de conversão (padrão: núcleos)')
+    parser.add_argument('--fila', type=int, default=16, help='Capacidade das filas entre as etapas')
+    parser.add_argument('--quantidade', type=int, default=3000)
+    parser.add_argument('--motorista', action='store_true')
+    parser.add_argument('--inicio', type=int, help='Primeiro idPacote (modo range)')
+    parser.add_argument('--fim', type=int, help='Último idPacote (modo range)')
+    parser.add_argument('--veiculos', help='IDs separados por vírgula (modo telemetria)')
+    parser.add_argument('--data-inicio', help="'YYYY-MM-DD HH:MM:SS' (modo telemetria)")
+    parser.add_argument('--data-final', help="'YYYY-MM-DD HH:MM:SS' (modo telemetria)")
+    parser.add_argument('--operacao', default='evento', help="'evento', 'data_chegada' ou 'delta'")
+    parser.add_argument('--janela-horas', type=float, default=6)
+    parser.add_argument('--gravacao', help='Diretório onde gravar/reproduzir as respostas do serviço')
+    parser.add_argument('--modo-gravacao', choices=MODOS, default=CACHE)
+    parser.add_argument('--limite-gravacao-mb', type=float, help='Tamanho máximo das gravações em MiB')
+    args = parser.parse_args()
+
+    if args.modo == 'posicoes':
+        fonte = FilaPosicoes(args.quantidade, motorista=args.motorista)
+    elif args.modo == 'range':
+        if args.inicio is None or args.fim is None:
+            parser.error('o modo range exige --inicio e --fim')
+        fonte = tarefas_range(args.inicio, args.fim, args.quantidade, args.motorista)
+    else:
+        if not (args.veiculos and args.data_inicio and args.data_final):
+            parser.error('o modo telemetria exige --veiculos, --data-inicio e --data-final')
+        veiculos = [int(veiculo) for veiculo in args.veiculos.split(',')]
+        fonte = tarefas_telemetria(veiculos, args.data_inicio, args.data_final, args.operacao,
+                                   timedelta(hours=args.janela_horas))
+
+    if args.rotacao_mb:
+        destino = ArquivoRotativo(args.saida, args.formato or 'jsonl', max_bytes=int(args.rotacao_mb * 2 ** 20))
+    else:
+        destino = criar_escritor(args.saida, args.formato)
+
+    gravacao = None
+    if args.gravacao:
+        limite = int(args.limite_gravacao_mb * 2 ** 20) if args.limite_gravacao_mb else None
+        gravacao = Gravador(args.gravacao, args.modo_gravacao, limite_bytes=limite)
+    api = SascarAPI(os.getenv('SASCAR_USERNAME'), os.getenv('SASCAR_PASSWORD'), gravacao=gravacao)
+    daemon = DaemonIngestao(api, fonte, destino, io_workers=args.io, processos=args.processos,
+                            tamanho_fila=args.fila, ao_erro=lambda tarefa, erro: print(f"Erro: {erro}"))
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: daemon.parar())
+    with destino:
+        estatisticas = daemon.executar()
+    print(estatisticas)
+    if gravacao is not None:
+        print(gravacao.estatisticas())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+import heapq
+import threading
+from datetime import timedelta
+
+from tempo import FUSO_SERVICO, para_datetime
+
+
+class JanelaIds:
+    def __init__(self, tamanho=2 ** 24):
+        """
+        Conjunto de IDs vistos limitado a uma janela deslizante (bitmap)
+
+        Guarda um bit por ID no intervalo [base, base + tamanho). Quando chega
+        um ID além do fim da janela ela avança, esquecendo os IDs mais antigos;
+        a memória fica fixa em tamanho / 8 bytes (2 MiB no padrão).
+
+        Args:
+            tamanho (int): Quantidade de IDs cobertos pela janela (múltiplo de 8)
+        """
+        self.tamanho = max(8, tamanho - tamanho % 8)
+        self.base = None
+        self._bits = bytearray(self.tamanho // 8)
+
+    def _avancar(self, id_pacote):
+        """Move a janela para que id_pacote caiba no fim (avança ao menos 1/4 da janela)"""
+        nova_base = id_pacote - self.tamanho + 1
+        nova_base = max(nova_base, self.base + self.tamanho // 4)
+        nova_base += -nova_base % 8
+        deslocamento = (nova_base - self.base) // 8
+        if deslocamento >= len(self._bits):
+            self._bits = bytearray(len(self._bits))
+        else:
+            del self._bits[:deslocamento]
+            self._bits.extend(bytes(deslocamento))
+        self.base = nova_base
+
+    def antigo(self, id_pacote):
+        """True se o ID é anterior à janela (não dá mais para saber se foi visto)"""
+        return self.base is not None and id_pacote < self.base
+
+    def marcar(self, id_pacote):
+        """
+        Marca o ID como visto
+
+        Returns:
+            bool: True se o ID já estava marcado (duplicado)
+        """
+        if self.base is None:
+            self.base = id_pacote - id_pacote % 8
+        elif id_pacote >= self.base + self.tamanho:
+            self._avancar(id_pacote)
+        posicao = id_pacote - self.base
+        indice, bit = posicao >> 3, 1 << (posicao & 7)
+        if self._bits[indice] & bit:
+            return True
+        self._bits[indice] |= bit
+        return False
+
+    def __contains__(self, id_pacote):
+        if self.base is None or not self.base <= id_pacote < self.base + self.tamanho:
+            return False
+        posicao = id_pacote - self.base
+        return bool(self._bits[posicao >> 3] & (1 << (posicao & 7)))
+
+
+class Deduplicador:
+    def __init__(self, tamanho_janela=2 ** 24, campo_id='idPacote', descartar_antigos=False):
+        """
+        Remove pacotes repetidos pelo idPacote com memória limitada
+
+        Útil ao combinar a fila (obterPacotePosicoes) com backfills por range
+        ou ao repetir chamadas após timeout. IDs anteriores à janela não podem
+        ser verificados: por padrão são repassados (podem ser repetidos) e
+        contados em 'antigos'; com descartar_antigos=True são descartados e
+        contados também em 'descartados'.
+
+        Args:
+            tamanho_janela (int): Quantidade de IDs lembrados (ver JanelaIds)
+            campo_id (str): Campo com o ID do pacote
+            descartar_antigos (bool): Descartar os IDs anteriores à janela (perde
+                os pacotes atrasados de replays e backfills)
+        """
+        self.janela = JanelaIds(tamanho_janela)
+        self.campo_id = campo_id
+        self.descartar_antigos = descartar_antigos
+        self.recebidos = 0
+        self.duplicados = 0
+        self.antigos = 0
+        self.descartados = 0
+        self._lock = threading.Lock()
+
+    def novo(self, registro):
+        """Retorna True se o registro ainda não foi visto (e o marca como visto)"""
+        id_pacote = registro.get(self.campo_id)
+        with self._lock:
+            self.recebidos += 1
+            if id_pacote is None:
+                return True
+            if self.janela.antigo(id_pacote):
+                self.antigos += 1
+                if self.descartar_antigos:
+                    self.descartados += 1
+                    return False
+                return True
+            if self.janela.marcar(id_pacote):
+                self.duplicados += 1
+                return False
+            return True
+
+    def filtrar(self, registros):
+        """
+        Args:
+            registros (iterable): Registros de posição
+
+        Returns:
+            list: Registros ainda não vistos, na ordem recebida
+        """
+        return [registro for registro in registros if self.novo(registro)]
+
+    def estatisticas(self):
+        return {
+            'recebidos': self.recebidos,
+            'duplicados': self.duplicados,
+            'antigos': self.antigos,
+            'descartados': self.descartados,
+        }
+
+
+def _instante(valor):
+    """Data do evento no horário local do serviço, sem fuso (texto, datetime com ou sem fuso)"""
+    if valor is None or valor == '':
+        return None
+    return para_datetime(valor, FUSO_SERVICO)
+
+
+class Reordenador:
+    def __init__(self, atraso=timedelta(minutes=5), campo_veiculo='idVeiculo', campo_data='dataPosicao',
+                 descartar_atrasados=False, limite_por_veiculo=10000):
+        """
+        Entrega as posições de cada veículo em ordem de dataPosicao
+
+        Cada registro fica retido até que o veículo envie uma posição atraso
+        mais nova que ele; até lá, posições mais antigas que cheguem depois
+        ainda são entregues na ordem certa. Posições que chegam depois de uma
+        mais nova já ter sido entregue são contadas em 'atrasados' e entregues
+        na hora (ou descartadas, com descartar_atrasados=True).
+
+        Args:
+            atraso (timedelta | float): Janela de atraso tolerada (float em segundos)
+            campo_veiculo (str): Campo com o ID do veículo
+            campo_data (str): Campo com a data do evento
+            descartar_atrasados (bool): Descartar as posições que chegam após a janela
+            limite_por_veiculo (int): Máximo de posições retidas por veículo
+        """
+        self.atraso = atraso if isinstance(atraso, timedelta) else timedelta(seconds=atraso)
+        self.campo_veiculo = campo_veiculo
+        self.campo_data = campo_data
+        self.descartar_atrasados = descartar_atrasados
+        self.limite_por_veiculo = limite_por_veiculo
+        self.recebidos = 0
+        self.fora_de_ordem = 0
+        self.atrasados = 0
+        self._pendentes = {}
+        self._mais_recente = {}
+        self._entregue = {}
+        self._sequencia = 0
+        self._lock = threading.Lock()
+
+    def _entregar(self, id_veiculo, fila, limite, saida):
+        while fila and (limite is None or fila[0][0] <= limite):
+            instante, _, registro = heapq.heappop(fila)
+            self._entregue[id_veiculo] = instante
+            saida.append(registro)
+        if not fila:
+            self._pendentes.pop(id_veiculo, None)
+
+    def adicionar(self, registros):
+        """
+        Recebe um lote de posições
+
+        Returns:
+            list: Posições liberadas, em ordem de evento dentro de cada veículo
+        """
+        saida = []
+        with self._lock:
+            for registro in registros:
+                self.recebidos += 1
+                id_veiculo = registro.get(self.campo_veiculo)
+                instante = _instante(registro.get(self.campo_data))
+                if instante is None:
+                    saida.append(registro)
+                    continue
+
+                entregue = self._entregue.get(id_veiculo)
+                if entregue is not None and instante < entregue:
+                    self.atrasados += 1
+                    if not self.descartar_atrasados:
+                        saida.append(registro)
+                    continue
+
+                mais_recente = self._mais_recente.get(id_veiculo)
+                if mais_recente is not None and instante < mais_recente:
+                    self.fora_de_ordem += 1
+                else:
+                    mais_recente = self._mais_recente[id_veiculo] = instante
+
+                fila = self._pendentes.setdefault(id_veiculo, [])
+                self._sequencia += 1
+                heapq.heappush(fila, (instante, self._sequencia, registro))
+                while len(fila) > self.limite_por_veiculo:
+                    instante_saida, _, antigo = heapq.heappop(fila)
+                    self._entregue[id_veiculo] = instante_saida
+                    saida.append(antigo)
+                self._entregar(id_veiculo, fila, mais_recente - self.atraso, saida)
+        return saida
+
+    def descarregar(self):
+        """
+        Libera todas as posições retidas (ex.: ao encerrar)
+
+        Returns:
+            list: Posições pendentes, em ordem de evento dentro de cada veículo
+        """
+        saida = []
+        with self._lock:
+            for id_veiculo, fila in list(self._pendentes.items()):
+                self._entregar(id_veiculo, fila, None, saida)
+        return saida
+
+    def pendentes(self):
+        """Quantidade de posições retidas aguardando a janela de atraso"""
+        with self._lock:
+            return sum(len(fila) for fila in self._pendentes.values())
+
+    def estatisticas(self):
+        return {'recebidos': self.recebidos, 'fora_de_ordem': self.fora_de_ordem, 'atrasados': self.atrasados}
+
+
+def deduplicar_e_ordenar(lotes, deduplicador=None, reordenador=None):
+    """
+    Etapa de pipeline: remove duplicados e reordena por veículo
+
+    Args:
+        lotes (iterable): Lotes de posições (ex.: IngestorPosicoes.lotes())
+        deduplicador (Deduplicador, optional): Padrão: Deduplicador()
+        reordenador (Reordenador, optional): Padrão: Reordenador(); False desliga a reordenação
+
+    Yields:
+        list: Posições novas liberadas a cada lote (as retidas saem ao fim dos lotes)
+    """
+    deduplicador = deduplicador or Deduplicador()
+    if reordenador is None:
+        reordenador = Reordenador()
+    for lote in lotes:
+        novos = deduplicador.filtrar(lote)
+        liberados = reordenador.adicionar(novos) if reordenador else novos
+        if liberados:
+            yield liberados
+    if reordenador:
+        restantes = reordenador.descarregar()
+        if restantes:
+            yield restantes
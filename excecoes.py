@@ -0,0 +1,137 @@
+import asyncio
+import socket
+
+import requests
+from zeep.exceptions import Fault, TransportError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class ErroSascar(Exception):
+    """
+    Base dos erros da integração Sascar
+
+    Attributes:
+        codigo (str): faultcode do SOAP, quando houver
+        retentavel (bool): Se a mesma chamada pode dar certo ao ser repetida
+        conta_falha (bool): Se o erro indica problema no serviço (abre o disjuntor)
+    """
+
+    retentavel = False
+    conta_falha = True
+
+    def __init__(self, mensagem='', codigo=None):
+        super().__init__(mensagem)
+        self.codigo = codigo
+
+
+class ErroServico(ErroSascar):
+    """Fault do serviço sem causa reconhecida"""
+
+
+class ErroLimiteRequisicoes(ErroServico):
+    """O serviço recusou a chamada por excesso de requisições"""
+
+    retentavel = True
+
+
+class ErroTempoEsgotado(ErroSascar):
+    """A chamada passou do tempo limite (no cliente ou no serviço)"""
+
+    retentavel = True
+
+
+class ErroConexao(ErroSascar):
+    """Falha de rede ao falar com o serviço"""
+
+    retentavel = True
+
+
+class ErroAutenticacao(ErroServico):
+    """Usuário ou senha recusados"""
+
+    conta_falha = False
+
+
+class ErroParametros(ErroSascar):
+    """Parâmetros inválidos ou ausentes"""
+
+    conta_falha = False
+
+
+class CircuitoAberto(ErroSascar):
+    """O disjuntor da operação está aberto e a chamada não foi feita"""
+
+    conta_falha = False
+
+
+class RespostaNaoGravada(ErroSascar):
+    """Modo de reprodução sem resposta gravada para a requisição (ver gravacao.py)"""
+
+    conta_falha = False
+
+
+# Trechos do faultstring que identificam cada tipo de erro, na ordem de verificação
+PADROES_FAULT = (
+    (ErroLimiteRequisicoes, ('limite de requisi', 'excesso de requisi', 'requisições excedid',
+                             'aguarde', 'too many', 'throttl', 'rate limit')),
+    (ErroTempoEsgotado, ('timeout', 'tempo esgotado', 'tempo limite', 'timed out')),
+    (ErroAutenticacao, ('senha', 'usuário', 'usuario', 'autentica', 'acesso negado', 'não autorizado')),
+    (ErroParametros, ('parâmetro', 'parametro', 'inválid', 'invalid', 'obrigatóri', 'formato')),
+)
+
+_ERROS_TEMPO = (requests.Timeout, socket.timeout, asyncio.TimeoutError)
+_ERROS_CONEXAO = (requests.ConnectionError, ConnectionError)
+if httpx is not None:
+    _ERROS_TEMPO += (httpx.TimeoutException,)
+    _ERROS_CONEXAO += (httpx.TransportError,)
+
+
+def classificar(erro):
+    """
+    Retorna a classe de ErroSascar correspondente a uma exceção
+
+    Args:
+        erro (Exception): Fault do zeep, erro de rede ou de validação
+
+    Returns:
+        type: Subclasse de ErroSascar
+    """
+    if isinstance(erro, ErroSascar):
+        return type(erro)
+    if isinstance(erro, Fault):
+        texto = f"{erro.message or ''} {erro.code or ''}".lower()
+        for classe, trechos in PADROES_FAULT:
+            if any(trecho in texto for trecho in trechos):
+                return classe
+        return ErroServico
+    if isinstance(erro, _ERROS_TEMPO):
+        return ErroTempoEsgotado
+    if isinstance(erro, _ERROS_CONEXAO):
+        return ErroConexao
+    if isinstance(erro, TransportError):
+        return ErroLimiteRequisicoes if erro.status_code == 429 else ErroServico
+    if isinstance(erro, (ValueError, TypeError)):
+        return ErroParametros
+    return ErroSascar
+
+
+def converter_erro(erro, mensagem=None):
+    """
+    Converte uma exceção no ErroSascar correspondente
+
+    Args:
+        erro (Exception): Exceção original
+        mensagem (str, optional): Prefixo da mensagem (ex.: 'Erro ao obter clientes')
+
+    Returns:
+        ErroSascar: Erro tipado com a mensagem '<prefixo>: <erro original>'
+    """
+    classe = classificar(erro)
+    texto = str(erro)
+    if mensagem:
+        texto = f"{mensagem}: {texto}"
+    return classe(texto, codigo=getattr(erro, 'codigo', None) or getattr(erro, 'code', None))
@@ -0,0 +1,549 @@
+import csv
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from itertools import islice
+
+from colunar import BOOLEANO, DATA, INTEIRO, REAL, tipo_coluna
+from conversor import converter_lista
+from tempo import campos_data, formatar_data, formatar_datas
+
+TAMANHO_LOTE = 10000
+
+
+def em_lotes(registros, tamanho=TAMANHO_LOTE):
+    """
+    Agrupa qualquer iterável de registros em listas de até 'tamanho' itens
+
+    Yields:
+        list: Lote de registros
+    """
+    iterador = iter(registros)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def para_dict(registro):
+    """Aceita dicionário, registro compacto (registros.py) ou objeto do zeep"""
+    if isinstance(registro, dict):
+        return registro
+    if hasattr(registro, 'para_dict'):
+        return registro.para_dict()
+    return converter_lista([registro])[0]
+
+
+def _texto(valor):
+    """Valor como texto para CSV/JSON (datas 'YYYY-MM-DD HH:MM:SS', com o deslocamento se houver fuso)"""
+    return formatar_data(valor, manter_fuso=True)
+
+
+def campos_de(registros):
+    """
+    União dos campos de uma lista de dicionários, na ordem em que aparecem
+
+    Returns:
+        list: Campos, ou None se algum registro não for dicionário
+    """
+    campos = {}
+    for registro in registros:
+        if not isinstance(registro, dict):
+            return None
+        for campo in registro:
+            if campo not in campos:
+                campos[campo] = None
+    return list(campos)
+
+
+class Escritor:
+    """Base dos exportadores: recebem registros aos poucos e gravam em lotes"""
+
+    def __init__(self, caminho, tamanho_lote=TAMANHO_LOTE):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.total = 0
+
+    def _gravar(self, lote):
+        raise NotImplementedError
+
+    def escrever(self, registros):
+        """
+        Grava os registros sem carregá-los todos em memória
+
+        Args:
+            registros (iterable): Dicionários, registros compactos ou objetos do zeep
+
+        Returns:
+            int: Quantidade de registros gravados nesta chamada
+        """
+        gravados = 0
+        for lote in em_lotes(registros, self.tamanho_lote):
+            self._gravar([para_dict(registro) for registro in lote])
+            gravados += len(lote)
+        self.total += gravados
+        return gravados
+
+    def tamanho(self):
+        """Bytes já gravados no destino"""
+        return os.path.getsize(self.caminho) if os.path.exists(self.caminho) else 0
+
+    def fechar(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+class EscritorCSV(Escritor):
+    def __init__(self, caminho, campos=None, anexar=False, tamanho_lote=TAMANHO_LOTE, **opcoes_csv):
+        """
+        Exporta para CSV de forma incremental
+
+        Args:
+            caminho (str): Arquivo de destino
+            campos (list, optional): Colunas (padrão: todos os campos do primeiro
+                lote; um campo novo em lote posterior entra no fim do cabeçalho,
+                com o arquivo reescrito e as linhas anteriores vazias nele; com
+                campos informados, os demais são ignorados)
+            anexar (bool): Se True, acrescenta ao arquivo existente sem repetir o
+                cabeçalho (as colunas partem do cabeçalho dele)
+            tamanho_lote (int): Registros gravados por vez
+            **opcoes_csv: Opções repassadas ao csv.DictWriter (ex.: delimiter=';')
+        """
+        super().__init__(caminho, tamanho_lote)
+        self.campos = list(campos) if campos else None
+        self._campos_informados = bool(campos)
+        self._cabecalho = not (anexar and os.path.exists(caminho) and os.path.getsize(caminho) > 0)
+        self._opcoes = opcoes_csv
+        if not self._cabecalho and self.campos is None:
+            with open(caminho, newline='', encoding='utf-8') as f:
+                self.campos = next(csv.reader(f, **self._formato()), None) or None
+        self._arquivo = open(caminho, 'a' if anexar else 'w', newline='', encoding='utf-8')
+        self._writer = None
+
+    def _formato(self):
+        """Opções de formato do csv (sem as exclusivas do DictWriter)"""
+        return {chave: valor for chave, valor in self._opcoes.items() if chave not in ('restval', 'extrasaction')}
+
+    def _ampliar_cabecalho(self, novos):
+        """Reescreve o arquivo com os novos campos no fim do cabeçalho"""
+        self._arquivo.close()
+        campos = self.campos + novos
+        vazios = [''] * len(novos)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.caminho)), suffix='.tmp')
+        try:
+            with open(self.caminho, newline='', encoding='utf-8') as origem, \
+                    os.fdopen(descritor, 'w', newline='', encoding='utf-8') as destino:
+                leitor = csv.reader(origem, **self._formato())
+                escritor = csv.writer(destino, **self._formato())
+                next(leitor, None)
+                escritor.writerow(campos)
+                escritor.writerows(linha + vazios for linha in leitor)
+            os.replace(temporario, self.caminho)
+        except BaseException:
+            os.remove(temporario)
+            raise
+        finally:
+            self._arquivo = open(self.caminho, 'a', newline='', encoding='utf-8')
+        self.campos = campos
+        self._writer = csv.DictWriter(self._arquivo, self.campos, extrasaction='ignore', **self._opcoes)
+
+    def _gravar(self, lote):
+        if self._writer is None:
+            if self.campos is None:
+                self.campos = campos_de(lote)
+            self._writer = csv.DictWriter(self._arquivo, self.campos, extrasaction='ignore', **self._opcoes)
+            if self._cabecalho:
+                self._writer.writeheader()
+        if not self._campos_informados:
+            novos = [campo for campo in campos_de(lote) if campo not in self._writer.fieldnames]
+            if novos:
+                self._ampliar_cabecalho(novos)
+        # Datas formatadas por coluna, de uma vez para o lote todo
+        datas = {}
+        for campo in campos_data(lote):
+            valores = [registro.get(campo) for registro in lote]
+            if all(valor is None or isinstance(valor, datetime) for valor in valores):
+                datas[campo] = formatar_datas(valores, manter_fuso=True)
+        self._writer.writerows(
+            {
+                chave: datas[chave][indice] if chave in datas else (_texto(valor) if valor is not None else '')
+                for chave, valor in registro.items()
+            }
+            for indice, registro in enumerate(lote)
+        )
+        self._arquivo.flush()
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class EscritorJSONL(Escritor):
+    def __init__(self, caminho, anexar=False, tamanho_lote=TAMANHO_LOTE):
+        """
+        Exporta para JSON Lines (um registro compacto por linha)
+
+        Args:
+            caminho (str): Arquivo de destino
+            anexar (bool): Se True, acrescenta ao arquivo existente
+            tamanho_lote (int): Registros gravados por vez
+        """
+        super().__init__(caminho, tamanho_lote)
+        self._arquivo = open(caminho, 'a' if anexar else 'w', encoding='utf-8')
+
+    def _gravar(self, lote):
+        self._arquivo.write(''.join(
+            json.dumps(registro, ensure_ascii=False, separators=(',', ':'), default=_texto) + '\n'
+            for registro in lote
+        ))
+        self._arquivo.flush()
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class EscritorJSON(Escritor):
+    def __init__(self, caminho, tamanho_lote=TAMANHO_LOTE):
+        """
+        Exporta para um único array JSON, gravado em lotes (um registro
+        compacto por linha)
+
+        Args:
+            caminho (str): Arquivo de destino
+            tamanho_lote (int): Registros gravados por vez
+        """
+        super().__init__(caminho, tamanho_lote)
+        self._arquivo = open(caminho, 'w', encoding='utf-8')
+        self._arquivo.write('[')
+        self._separador = '\n'
+
+    def _gravar(self, lote):
+        self._arquivo.write(self._separador + ',\n'.join(
+            json.dumps(registro, ensure_ascii=False, separators=(',', ':'), default=_texto)
+            for registro in lote
+        ))
+        self._separador = ',\n'
+        self._arquivo.flush()
+
+    def fechar(self):
+        if not self._arquivo.closed:
+            self._arquivo.write('\n]\n')
+            self._arquivo.close()
+
+
+class EscritorParquet(Escritor):
+    def __init__(self, diretorio, particoes=('idVeiculo', 'data'), campo_data='dataPosicao',
+                 tamanho_lote=50000, compressao='snappy', esquema=None, max_pendentes=500000):
+        """
+        Exporta para Parquet particionado no estilo Hive (ex.: idVeiculo=10/data=2025-05-20/)
+
+        Os registros ficam em memória por partição e cada partição vira um
+        arquivo ao juntar tamanho_lote registros (ou ao fechar / passar de
+        max_pendentes no total). Todos os arquivos usam o mesmo esquema Arrow,
+        fixado na primeira gravação, para que o diretório possa ser lido com
+        pandas.read_parquet ou pyarrow.dataset. Requer pyarrow.
+
+        Args:
+            diretorio (str): Diretório raiz do dataset
+            particoes (tuple): Campos de partição; 'data' é o dia de campo_data
+            campo_data (str): Campo de data usado na partição 'data'
+            tamanho_lote (int): Registros por arquivo de cada partição
+            compressao (str): Codec do Parquet
+            esquema (pyarrow.Schema | dict, optional): Esquema das colunas, ou o
+                mapa campo -> tipo XSD de streaming.esquema_do_retorno; sem ele o
+                esquema é inferido dos primeiros registros (colunas só com nulos
+                viram texto)
+            max_pendentes (int): Registros em memória que forçam a gravação de
+                todas as partições
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Exportação em Parquet requer o pacote pyarrow (pip install pyarrow)") from e
+        super().__init__(diretorio, tamanho_lote)
+        self._pa = pa
+        self._pq = pq
+        self.particoes = tuple(particoes)
+        self.campo_data = campo_data
+        self.compressao = compressao
+        self.max_pendentes = max_pendentes
+        self._tipos_wsdl = esquema if isinstance(esquema, dict) else {}
+        self.esquema = esquema if isinstance(esquema, pa.Schema) else None
+        self._pendentes = {}
+        self._quantidade_pendente = 0
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _valor_particao(self, registro, campo):
+        if campo == 'data' and campo not in registro:
+            valor = registro.get(self.campo_data)
+            if isinstance(valor, datetime):
+                return valor.date().isoformat()
+            return str(valor)[:10] if valor else 'sem_data'
+        valor = registro.get(campo)
+        return 'nulo' if valor is None else str(valor).replace('/', '_')
+
+    def _tipo_arrow(self, campo):
+        """Tipo Arrow de uma coluna sem valores, pelo tipo XSD quando conhecido"""
+        pa = self._pa
+        tipo = self._tipos_wsdl.get(campo)
+        if tipo is None or isinstance(tipo, dict):
+            return pa.string()
+        return {
+            INTEIRO: pa.int64(),
+            REAL: pa.float64(),
+            DATA: pa.timestamp('us', tz='UTC'),
+            BOOLEANO: pa.bool_(),
+        }.get(tipo_coluna(tipo), pa.string())
+
+    def _fixar_esquema(self, linhas):
+        """Infere o esquema dos registros pendentes; colunas só com nulos usam _tipo_arrow"""
+        inferido = self._pa.Table.from_pylist(linhas).schema
+        self.esquema = self._pa.schema([
+            self._pa.field(campo.name, self._tipo_arrow(campo.name)) if self._pa.types.is_null(campo.type) else campo
+            for campo in inferido
+        ])
+
+    def _tabela(self, linhas):
+        pa = self._pa
+        novos = [campo for campo in campos_de(linhas) if self.esquema.get_field_index(campo) < 0]
+        if novos:
+            raise ValueError(f"Campos fora do esquema do Parquet: {', '.join(novos)} (informe esquema=)")
+        try:
+            return pa.Table.from_pylist(linhas, schema=self.esquema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Colunas de texto com valores de outro tipo (ex.: inferidas como texto por só terem nulos)
+            textos = [campo.name for campo in self.esquema if pa.types.is_string(campo.type)]
+            linhas = [
+                dict(linha, **{campo: str(linha[campo]) for campo in textos
+                               if linha.get(campo) is not None and not isinstance(linha[campo], str)})
+                for linha in linhas
+            ]
+            return pa.Table.from_pylist(linhas, schema=self.esquema)
+
+    def _gravar_particao(self, chave):
+        linhas = self._pendentes.pop(chave)
+        self._quantidade_pendente -= len(linhas)
+        pasta = os.path.join(self.caminho, *(f"{campo}={valor}" for campo, valor in zip(self.particoes, chave)))
+        os.makedirs(pasta, exist_ok=True)
+        self._pq.write_table(
+            self._tabela(linhas),
+            os.path.join(pasta, f"parte-{uuid.uuid4().hex}.parquet"),
+            compression=self.compressao,
+        )
+
+    def descarregar(self):
+        """Grava todas as partições pendentes"""
+        if self.esquema is None and self._pendentes:
+            self._fixar_esquema([linha for linhas in self._pendentes.values() for linha in linhas])
+        for chave in list(self._pendentes):
+            self._gravar_particao(chave)
+
+    def _gravar(self, lote):
+        for registro in lote:
+            chave = tuple(self._valor_particao(registro, campo) for campo in self.particoes)
+            linha = {campo: valor for campo, valor in registro.items() if campo not in self.particoes}
+            self._pendentes.setdefault(chave, []).append(linha)
+        self._quantidade_pendente += len(lote)
+
+        if self._quantidade_pendente >= self.max_pendentes:
+            self.descarregar()
+            return
+        cheias = [chave for chave, linhas in self._pendentes.items() if len(linhas) >= self.tamanho_lote]
+        if cheias and self.esquema is None:
+            self._fixar_esquema([linha for linhas in self._pendentes.values() for linha in linhas])
+        for chave in cheias:
+            self._gravar_particao(chave)
+
+    def tamanho(self):
+        total = 0
+        for raiz, _, arquivos in os.walk(self.caminho):
+            total += sum(os.path.getsize(os.path.join(raiz, arquivo)) for arquivo in arquivos)
+        return total
+
+    def fechar(self):
+        self.descarregar()
+
+
+class EscritorXLSX(Escritor):
+    def __init__(self, caminho, aba='dados', campos=None, tamanho_lote=TAMANHO_LOTE):
+        """
+        Exporta para Excel em modo de memória constante (cada linha vai direto ao disco)
+
+        Requer xlsxwriter. Uma planilha comporta até 1.048.575 registros.
+
+        Args:
+            caminho (str): Arquivo de destino (.xlsx)
+            aba (str): Nome da planilha
+            campos (list, optional): Colunas (padrão: todos os campos do primeiro lote)
+            tamanho_lote (int): Registros gravados por vez
+        """
+        try:
+            import xlsxwriter
+        except ImportError as e:
+            raise ImportError("Exportação em xlsx requer o pacote xlsxwriter (pip install xlsxwriter)") from e
+        super().__init__(caminho, tamanho_lote)
+        self._workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+        self._planilha = self._workbook.add_worksheet(aba[:31])
+        self._formato_data = self._workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        self.campos = list(campos) if campos else None
+        self._linha = 0
+
+    def _gravar(self, lote):
+        planilha = self._planilha
+        if self.campos is None:
+            self.campos = campos_de(lote)
+        if self._linha == 0:
+            planilha.write_row(0, 0, self.campos)
+            self._linha = 1
+        for registro in lote:
+            for coluna, campo in enumerate(self.campos):
+                valor = registro.get(campo)
+                if valor is None:
+                    continue
+                if isinstance(valor, datetime):
+                    planilha.write_datetime(self._linha, coluna, valor.replace(tzinfo=None), self._formato_data)
+                elif isinstance(valor, str):
+                    # write() transformaria textos como '=...' em fórmulas
+                    planilha.write_string(self._linha, coluna, valor)
+                elif isinstance(valor, bool):
+                    planilha.write_boolean(self._linha, coluna, valor)
+                elif isinstance(valor, (int, float)):
+                    planilha.write_number(self._linha, coluna, valor)
+                else:
+                    planilha.write_string(self._linha, coluna, _texto(valor))
+            self._linha += 1
+
+    def fechar(self):
+        self._workbook.close()
+
+
+ESCRITORES = {
+    'csv': EscritorCSV,
+    'json': EscritorJSON,
+    'jsonl': EscritorJSONL,
+    'parquet': EscritorParquet,
+    'xlsx': EscritorXLSX,
+}
+
+
+def criar_escritor(caminho, formato=None, **opcoes):
+    """
+    Cria o exportador pelo formato ou pela extensão do arquivo
+
+    Args:
+        caminho (str): Arquivo (ou diretório, para parquet) de destino
+        formato (str, optional): 'csv', 'json', 'jsonl', 'parquet' ou 'xlsx'
+        **opcoes: Opções do exportador
+
+    Returns:
+        Escritor: Exportador aberto
+    """
+    if formato is None:
+        formato = os.path.splitext(caminho)[1].lstrip('.').lower() or 'parquet'
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato inválido: {formato}")
+    return ESCRITORES[formato](caminho, **opcoes)
+
+
+def exportar(registros, caminho, formato=None, **opcoes):
+    """
+    Exporta qualquer iterável de registros em lotes, com memória constante
+
+    Args:
+        registros (iterable): Registros (lista, gerador de stream=True, etc.)
+        caminho (str): Arquivo (ou diretório, para parquet) de destino
+        formato (str, optional): 'csv', 'json', 'jsonl', 'parquet' ou 'xlsx'
+        **opcoes: Opções do exportador
+
+    Returns:
+        int: Quantidade de registros exportados
+    """
+    if isinstance(registros, list) and 'campos' not in opcoes and \
+            (formato or os.path.splitext(caminho)[1].lstrip('.').lower()) in ('csv', 'xlsx'):
+        # Lista completa: as colunas são a união dos campos de todos os registros
+        campos = campos_de(registros)
+        if campos:
+            opcoes['campos'] = campos
+    with criar_escritor(caminho, formato, **opcoes) as escritor:
+        return escritor.escrever(registros)
+
+
+class ArquivoRotativo:
+    def __init__(self, prefixo, formato='jsonl', max_bytes=None, max_segundos=None, **opcoes):
+        """
+        Exportador para ingestão contínua que troca de arquivo por tamanho ou tempo
+
+        Os arquivos são nomeados '<prefixo>-AAAAMMDD-HHMMSS-NNNN.<formato>'.
+        A verificação é feita entre lotes, então um arquivo pode passar de
+        max_bytes em até um lote. O xlsx só tem tamanho conhecido ao ser
+        fechado e o Parquet só cresce ao gravar partições; para eles use
+        max_segundos.
+
+        Args:
+            prefixo (str): Caminho e início do nome dos arquivos
+            formato (str): 'csv', 'jsonl', 'parquet' ou 'xlsx'
+            max_bytes (int, optional): Tamanho a partir do qual um novo arquivo é aberto
+            max_segundos (float, optional): Tempo máximo de escrita em um mesmo arquivo
+            **opcoes: Opções do exportador
+        """
+        if formato not in ESCRITORES:
+            raise ValueError(f"Formato inválido: {formato}")
+        self.prefixo = prefixo
+        self.formato = formato
+        self.max_bytes = max_bytes
+        self.max_segundos = max_segundos
+        self.opcoes = opcoes
+        self.arquivos = []
+        self._escritor = None
+        self._aberto_em = None
+
+    def _precisa_rotacionar(self):
+        if self._escritor is None:
+            return True
+        if self.max_bytes is not None and self._escritor.tamanho() >= self.max_bytes:
+            return True
+        if self.max_segundos is not None:
+            return (datetime.now() - self._aberto_em).total_seconds() >= self.max_segundos
+        return False
+
+    def _abrir(self):
+        self.fechar()
+        self._aberto_em = datetime.now()
+        caminho = f"{self.prefixo}-{self._aberto_em:%Y%m%d-%H%M%S}-{len(self.arquivos):04d}.{self.formato}"
+        self._escritor = criar_escritor(caminho, self.formato, **self.opcoes)
+        self.arquivos.append(caminho)
+
+    def escrever(self, registros):
+        """
+        Grava os registros, abrindo um novo arquivo quando necessário
+
+        Returns:
+            int: Quantidade de registros gravados
+        """
+        gravados = 0
+        tamanho_lote = self.opcoes.get('tamanho_lote', TAMANHO_LOTE)
+        for lote in em_lotes(registros, tamanho_lote):
+            if self._precisa_rotacionar():
+                self._abrir()
+            gravados += self._escritor.escrever(lote)
+        return gravados
+
+    def fechar(self):
+        """Fecha o arquivo atual"""
+        if self._escritor is not None:
+            self._escritor.fechar()
+            self._escritor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
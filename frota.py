@@ -0,0 +1,214 @@
+import heapq
+import math
+import threading
+
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU = math.pi * RAIO_TERRA_KM / 180
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distância em km entre dois pontos (fórmula de haversine)"""
+    fi1 = math.radians(lat1)
+    fi2 = math.radians(lat2)
+    d_fi = fi2 - fi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_fi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class EstadoFrota:
+    def __init__(self, tamanho_celula=0.05, campo_veiculo='idVeiculo', campo_data='dataPosicao'):
+        """
+        Última posição de cada veículo com índice espacial em grade
+
+        Cada posição recebida substitui a anterior do veículo apenas se for
+        mais recente (por campo_data e, no empate, por idPacote). A grade
+        divide o mapa em células de tamanho_celula graus, então consultas por
+        área, raio e vizinhos visitam só as células próximas.
+
+        Args:
+            tamanho_celula (float): Lado da célula em graus (0.05 ≈ 5,5 km)
+            campo_veiculo (str): Campo com o ID do veículo
+            campo_data (str): Campo com a data da posição
+        """
+        self.tamanho_celula = tamanho_celula
+        self.campo_veiculo = campo_veiculo
+        self.campo_data = campo_data
+        self._posicoes = {}
+        self._celulas = {}
+        self._lock = threading.RLock()
+
+    def _celula(self, latitude, longitude):
+        return (math.floor(latitude / self.tamanho_celula), math.floor(longitude / self.tamanho_celula))
+
+    def _mais_recente(self, novo, atual):
+        for campo in (self.campo_data, 'idPacote'):
+            valor_novo = novo.get(campo)
+            valor_atual = atual.get(campo)
+            if valor_novo is not None and valor_atual is not None and valor_novo != valor_atual:
+                return valor_novo > valor_atual
+        return True
+
+    def atualizar(self, registro):
+        """
+        Registra uma posição (dicionário ou registro compacto)
+
+        Returns:
+            bool: True se a posição passou a ser a última do veículo
+        """
+        id_veiculo = registro.get(self.campo_veiculo)
+        latitude = registro.get('latitude')
+        longitude = registro.get('longitude')
+        if id_veiculo is None or latitude is None or longitude is None:
+            return False
+        celula = self._celula(latitude, longitude)
+
+        with self._lock:
+            atual = self._posicoes.get(id_veiculo)
+            if atual is not None:
+                if not self._mais_recente(registro, atual[3]):
+                    return False
+                if atual[2] != celula:
+                    veiculos = self._celulas[atual[2]]
+                    veiculos.discard(id_veiculo)
+                    if not veiculos:
+                        del self._celulas[atual[2]]
+            if atual is None or atual[2] != celula:
+                self._celulas.setdefault(celula, set()).add(id_veiculo)
+            self._posicoes[id_veiculo] = (latitude, longitude, celula, registro)
+            return True
+
+    def atualizar_lote(self, registros):
+        """
+        Registra várias posições
+
+        Returns:
+            int: Quantidade de veículos cuja última posição mudou
+        """
+        with self._lock:
+            return sum(1 for registro in registros if self.atualizar(registro))
+
+    def remover(self, id_veiculo):
+        """Descarta o veículo do estado"""
+        with self._lock:
+            atual = self._posicoes.pop(id_veiculo, None)
+            if atual is not None:
+                veiculos = self._celulas[atual[2]]
+                veiculos.discard(id_veiculo)
+                if not veiculos:
+                    del self._celulas[atual[2]]
+
+    def posicao(self, id_veiculo):
+        """Retorna a última posição do veículo (None se desconhecido)"""
+        atual = self._posicoes.get(id_veiculo)
+        return atual[3] if atual is not None else None
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def __contains__(self, id_veiculo):
+        return id_veiculo in self._posicoes
+
+    def veiculos(self):
+        """Lista os IDs dos veículos conhecidos"""
+        with self._lock:
+            return list(self._posicoes)
+
+    def _candidatos(self, lat_min, lon_min, lat_max, lon_max):
+        """IDs dos veículos nas células que cobrem o retângulo"""
+        cx_min, cy_min = self._celula(lat_min, lon_min)
+        cx_max, cy_max = self._celula(lat_max, lon_max)
+        quantidade_celulas = (cx_max - cx_min + 1) * (cy_max - cy_min + 1)
+        if quantidade_celulas > len(self._celulas):
+            # Retângulo grande: mais barato percorrer só as células ocupadas
+            return [
+                id_veiculo
+                for (cx, cy), veiculos in self._celulas.items()
+                if cx_min <= cx <= cx_max and cy_min <= cy <= cy_max
+                for id_veiculo in veiculos
+            ]
+        candidatos = []
+        for cx in range(cx_min, cx_max + 1):
+            for cy in range(cy_min, cy_max + 1):
+                veiculos = self._celulas.get((cx, cy))
+                if veiculos:
+                    candidatos.extend(veiculos)
+        return candidatos
+
+    def na_area(self, lat_min, lon_min, lat_max, lon_max):
+        """
+        Veículos cuja última posição está dentro do retângulo
+
+        Returns:
+            list: Últimas posições dos veículos na área
+        """
+        with self._lock:
+            resultado = []
+            for id_veiculo in self._candidatos(lat_min, lon_min, lat_max, lon_max):
+                latitude, longitude, _, registro = self._posicoes[id_veiculo]
+                if lat_min <= latitude <= lat_max and lon_min <= longitude <= lon_max:
+                    resultado.append(registro)
+            return resultado
+
+    def no_raio(self, latitude, longitude, raio_km):
+        """
+        Veículos a até raio_km do ponto, do mais próximo ao mais distante
+
+        Returns:
+            list: Tuplas (distância em km, última posição)
+        """
+        delta_lat = raio_km / KM_POR_GRAU
+        cos_lat = max(math.cos(math.radians(min(abs(latitude) + delta_lat, 90.0))), 1e-6)
+        delta_lon = min(raio_km / (KM_POR_GRAU * cos_lat), 180.0)
+        with self._lock:
+            resultado = []
+            for id_veiculo in self._candidatos(latitude - delta_lat, longitude - delta_lon,
+                                               latitude + delta_lat, longitude + delta_lon):
+                lat, lon, _, registro = self._posicoes[id_veiculo]
+                distancia = distancia_km(latitude, longitude, lat, lon)
+                if distancia <= raio_km:
+                    resultado.append((distancia, registro))
+        resultado.sort(key=lambda item: item[0])
+        return resultado
+
+    def mais_proximos(self, latitude, longitude, n=10):
+        """
+        Os n veículos mais próximos do ponto
+
+        Procura em anéis de células ao redor do ponto até que nenhuma célula
+        ainda não visitada possa conter um veículo mais próximo.
+
+        Returns:
+            list: Tuplas (distância em km, última posição), da mais próxima à mais distante
+        """
+        with self._lock:
+            if n <= 0 or not self._posicoes:
+                return []
+            cx0, cy0 = self._celula(latitude, longitude)
+            candidatos = []
+            anel = 0
+            while True:
+                if (2 * anel + 1) ** 2 > len(self._celulas) or len(self._posicoes) <= n:
+                    # A busca já cobre mais células que as ocupadas: calcula direto
+                    return heapq.nsmallest(n, (
+                        (distancia_km(latitude, longitude, lat, lon), registro)
+                        for lat, lon, _, registro in self._posicoes.values()
+                    ), key=lambda item: item[0])
+
+                for cx in range(cx0 - anel, cx0 + anel + 1):
+                    for cy in range(cy0 - anel, cy0 + anel + 1):
+                        if max(abs(cx - cx0), abs(cy - cy0)) != anel:
+                            continue
+                        for id_veiculo in self._celulas.get((cx, cy), ()):
+                            lat, lon, _, registro = self._posicoes[id_veiculo]
+                            candidatos.append((distancia_km(latitude, longitude, lat, lon), registro))
+
+                # Qualquer veículo fora dos anéis visitados está a pelo menos
+                # 'anel' células de distância do ponto
+                lat_extrema = min(abs(latitude) + (anel + 1) * self.tamanho_celula, 90.0)
+                limite_km = anel * self.tamanho_celula * KM_POR_GRAU * math.cos(math.radians(lat_extrema))
+                if len(candidatos) >= n:
+                    melhores = heapq.nsmallest(n, candidatos, key=lambda item: item[0])
+                    if melhores[-1][0] <= limite_km:
+                        return melhores
+                anel += 1
@@ -0,0 +1,433 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from io import BytesIO
+
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+from excecoes import RespostaNaoGravada
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GRAVAR = 'gravar'          # sempre vai ao serviço e grava a resposta
+REPRODUZIR = 'reproduzir'  # só lê do disco, sem rede (falta -> RespostaNaoGravada)
+CACHE = 'cache'            # lê do disco e vai ao serviço só no que falta
+MODOS = (GRAVAR, REPRODUZIR, CACHE)
+
+# Parâmetros que não entram na chave da requisição
+PARAMETROS_IGNORADOS = frozenset({'senha'})
+
+# Prefixos das operações que o modo cache sempre leva ao serviço: a fila de
+# posições e o status de comandos mudam a cada chamada, e atualizarSenha altera
+# a conta. Nos modos gravar e reproduzir elas são tratadas como as demais.
+OPERACOES_SEM_CACHE = ('obterPacotePosicoes', 'obterStatusComando', 'atualizarSenha')
+
+_CABECALHOS_DESCARTADOS = frozenset({'content-encoding', 'transfer-encoding', 'content-length'})
+
+
+def chave_requisicao(metodo, url, corpo, ignorar=PARAMETROS_IGNORADOS):
+    """
+    Identifica uma requisição pela operação e pelos parâmetros
+
+    POSTs SOAP usam o elemento da operação dentro do Body, em forma canônica
+    (C14N) e sem os parâmetros ignorados, de modo que a mesma consulta tenha a
+    mesma chave em qualquer endereço do serviço e com qualquer senha. As
+    demais requisições (WSDL, XSDs) usam o método e a URL.
+
+    Args:
+        metodo (str): Método HTTP
+        url (str): URL da requisição
+        corpo (bytes | str, optional): Corpo da requisição
+        ignorar (frozenset): Nomes de parâmetros fora da chave
+
+    Returns:
+        tuple: (chave hexadecimal, nome da operação)
+    """
+    operacao = None
+    if metodo == 'POST' and corpo:
+        try:
+            envelope = etree.fromstring(corpo.encode('utf-8') if isinstance(corpo, str) else corpo)
+        except etree.XMLSyntaxError:
+            envelope = None
+        corpo_soap = None
+        if envelope is not None:
+            corpo_soap = next((filho for filho in envelope if etree.QName(filho).localname == 'Body'), None)
+        if corpo_soap is not None and len(corpo_soap):
+            requisicao = corpo_soap[0]
+            operacao = etree.QName(requisicao).localname
+            for filho in list(requisicao):
+                if etree.QName(filho).localname in ignorar:
+                    requisicao.remove(filho)
+            identidade = b'SOAP\n' + etree.tostring(requisicao, method='c14n')
+        else:
+            identidade = b'POST\n' + url.encode('utf-8') + b'\n' + (corpo if isinstance(corpo, bytes) else corpo.encode('utf-8'))
+    else:
+        identidade = f'{metodo}\n{url}'.encode('utf-8')
+    return hashlib.sha256(identidade).hexdigest(), operacao or metodo
+
+
+def resposta_vazia(conteudo):
+    """
+    True se a resposta SOAP não traz registros (elemento de resposta sem
+    filhos, ou com 'return' vazio, '[]' ou 'null' nas variantes JSON)
+
+    Args:
+        conteudo (bytes): Corpo da resposta
+
+    Returns:
+        bool: False também para conteúdo que não é um envelope SOAP
+    """
+    try:
+        envelope = etree.fromstring(conteudo)
+    except etree.XMLSyntaxError:
+        return False
+    corpo_soap = next((filho for filho in envelope if etree.QName(filho).localname == 'Body'), None)
+    if corpo_soap is None or not len(corpo_soap):
+        return False
+    resposta = corpo_soap[0]
+    if etree.QName(resposta).localname == 'Fault':
+        return False
+    return all(not len(filho) and (filho.text or '').strip() in ('', '[]', 'null') for filho in resposta)
+
+
+class Gravador:
+    def __init__(self, diretorio, modo=CACHE, limite_bytes=None, nivel=6, gravar_erros=False,
+                 sem_cache=OPERACOES_SEM_CACHE):
+        """
+        Armazena respostas HTTP brutas em disco para reproduzi-las sem rede
+
+        O corpo de cada resposta é comprimido (zstd se o pacote zstandard
+        estiver instalado, zlib caso contrário) e guardado num arquivo cujo nome
+        é o SHA-256 do conteúdo, de modo que respostas iguais ocupam o disco uma
+        única vez. Um índice SQLite liga a chave da requisição (ver
+        chave_requisicao) ao conteúdo.
+
+        Chamadas repetidas com a mesma chave são gravadas em sequência e
+        reproduzidas na mesma ordem. No modo reproduzir, terminada a sequência,
+        a última resposta só se repete se for vazia (fila esgotada); senão a
+        chamada levanta RespostaNaoGravada. No modo cache a sequência continua
+        no serviço, e as operações de sem_cache nem são procuradas nem gravadas.
+
+        Args:
+            diretorio (str): Diretório das gravações (criado se não existir)
+            modo (str): 'gravar', 'reproduzir' ou 'cache'
+            limite_bytes (int, optional): Tamanho máximo (comprimido); ao passar,
+                as respostas usadas há mais tempo são descartadas
+            nivel (int): Nível de compressão
+            gravar_erros (bool): Se True, grava também respostas com status >= 300
+            sem_cache (tuple): Prefixos das operações que o modo cache não
+                reaproveita (ver OPERACOES_SEM_CACHE)
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo de gravação inválido: {modo!r} (use {', '.join(MODOS)})")
+        self.diretorio = diretorio
+        self.modo = modo
+        self.limite_bytes = limite_bytes
+        self.nivel = nivel
+        self.gravar_erros = gravar_erros
+        self.sem_cache = tuple(sem_cache)
+        self.gravadas = 0
+        self.reproduzidas = 0
+        self.ausentes = 0
+        self._ocorrencias = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(diretorio, 'objetos'), exist_ok=True)
+        self._conexao = sqlite3.connect(os.path.join(diretorio, 'indice.db'), check_same_thread=False)
+        self._conexao.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT NOT NULL,
+                ocorrencia INTEGER NOT NULL,
+                operacao TEXT,
+                objeto TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                tipo TEXT,
+                gravado REAL NOT NULL,
+                acessado REAL NOT NULL,
+                PRIMARY KEY (chave, ocorrencia)
+            );
+            CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado);
+            CREATE INDEX IF NOT EXISTS idx_respostas_objeto ON respostas (objeto);
+            CREATE TABLE IF NOT EXISTS objetos (
+                hash TEXT PRIMARY KEY,
+                arquivo TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                bytes_originais INTEGER NOT NULL
+            );
+        """)
+        self._conexao.commit()
+
+    def _arquivo(self, nome):
+        return os.path.join(self.diretorio, 'objetos', nome[:2], nome)
+
+    def _comprimir(self, conteudo):
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.nivel).compress(conteudo), '.zst'
+        return zlib.compress(conteudo, self.nivel), '.z'
+
+    def _descomprimir(self, dados, arquivo):
+        if arquivo.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"Gravação {arquivo} exige o pacote zstandard")
+            return zstandard.ZstdDecompressor().decompress(dados)
+        return zlib.decompress(dados)
+
+    def _proxima(self, chave):
+        """Posição, na sequência da chave, da próxima resposta desta sessão"""
+        with self._lock:
+            ocorrencia = self._ocorrencias.get(chave, 0)
+            self._ocorrencias[chave] = ocorrencia + 1
+            return ocorrencia
+
+    def cacheavel(self, operacao):
+        """False para as operações que o modo cache sempre leva ao serviço"""
+        return not (operacao and operacao.startswith(self.sem_cache))
+
+    def buscar(self, chave):
+        """
+        Lê a próxima resposta gravada da chave
+
+        A posição da sequência tem de estar gravada: uma falta não avança a
+        sequência e, no modo cache, a resposta obtida do serviço é gravada
+        nessa posição. Só no modo reproduzir, passada a última gravação, ela se
+        repete, e apenas se for uma resposta vazia (fila esgotada); uma
+        gravação interrompida depois de um pacote cheio não é repetida.
+
+        Returns:
+            tuple: (conteúdo, status, tipo) ou None se não houver gravação
+        """
+        if self.modo == REPRODUZIR:
+            condicao = "r.ocorrencia <= ? ORDER BY r.ocorrencia DESC LIMIT 1"
+        else:
+            condicao = "r.ocorrencia = ?"
+        with self._lock:
+            ocorrencia = self._ocorrencias.get(chave, 0)
+            linha = self._conexao.execute(
+                "SELECT r.ocorrencia, r.status, r.tipo, o.arquivo FROM respostas r "
+                "JOIN objetos o ON o.hash = r.objeto "
+                "WHERE r.chave = ? AND " + condicao,
+                (chave, ocorrencia),
+            ).fetchone()
+            conteudo = None
+            if linha is not None and linha[0] != ocorrencia:
+                # Só reproduzir chega aqui: buraco no meio da sequência ou fim dela
+                posterior = self._conexao.execute(
+                    "SELECT 1 FROM respostas WHERE chave = ? AND ocorrencia > ? LIMIT 1", (chave, ocorrencia)
+                ).fetchone()
+                if posterior is not None:
+                    linha = None
+                else:
+                    conteudo = self._ler(linha[3])
+                    if conteudo is None or not resposta_vazia(conteudo):
+                        linha = None
+            if linha is None:
+                self.ausentes += 1
+                return None
+            gravada, status, tipo, arquivo = linha
+            self._conexao.execute(
+                "UPDATE respostas SET acessado = ? WHERE chave = ? AND ocorrencia = ?",
+                (time.time(), chave, gravada),
+            )
+            self._conexao.commit()
+            self._ocorrencias[chave] = ocorrencia + 1
+            self.reproduzidas += 1
+        if conteudo is None:
+            conteudo = self._ler(arquivo)
+        if conteudo is None:
+            # Objeto apagado por fora: a posição volta a faltar
+            with self._lock:
+                self._ocorrencias[chave] = ocorrencia
+                self.reproduzidas -= 1
+                self.ausentes += 1
+            return None
+        return conteudo, status, tipo
+
+    def _ler(self, arquivo):
+        """Conteúdo original de um objeto (None se o arquivo não existir)"""
+        try:
+            with open(self._arquivo(arquivo), 'rb') as f:
+                return self._descomprimir(f.read(), arquivo)
+        except FileNotFoundError:
+            return None
+
+    def gravar(self, chave, operacao, conteudo, status=200, tipo=None):
+        """
+        Grava a resposta como a próxima da sequência da chave
+
+        Returns:
+            bool: False se a resposta não foi gravada (status de erro)
+        """
+        if status >= 300 and not self.gravar_erros:
+            return False
+        ocorrencia = self._proxima(chave)
+        nome = hashlib.sha256(conteudo).hexdigest()
+        with self._lock:
+            existente = self._conexao.execute("SELECT 1 FROM objetos WHERE hash = ?", (nome,)).fetchone()
+        if existente is None:
+            dados, extensao = self._comprimir(conteudo)
+            arquivo = nome + extensao
+            destino = self._arquivo(arquivo)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+            with os.fdopen(descritor, 'wb') as f:
+                f.write(dados)
+            os.replace(temporario, destino)
+        agora = time.time()
+        with self._lock:
+            if ocorrencia == 0 and self.modo == GRAVAR:
+                # Nova gravação da chave substitui a sequência anterior inteira
+                self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            if existente is None:
+                self._conexao.execute(
+                    "INSERT OR IGNORE INTO objetos (hash, arquivo, bytes, bytes_originais) VALUES (?, ?, ?, ?)",
+                    (nome, arquivo, len(dados), len(conteudo)),
+                )
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave, ocorrencia, operacao, nome, status, tipo, agora, agora),
+            )
+            self._conexao.commit()
+            self.gravadas += 1
+        if self.limite_bytes is not None and existente is None:
+            self.descartar(self.limite_bytes)
+        return True
+
+    def tamanho(self):
+        """Bytes ocupados pelas respostas comprimidas"""
+        with self._lock:
+            return self._conexao.execute("SELECT COALESCE(SUM(bytes), 0) FROM objetos").fetchone()[0]
+
+    def descartar(self, limite_bytes):
+        """
+        Remove as respostas usadas há mais tempo até caber em 90% do limite
+
+        A unidade descartada é a sequência inteira de uma chave, pela última
+        vez em que alguma resposta dela foi usada.
+
+        Returns:
+            int: Bytes liberados
+        """
+        with self._lock:
+            total = self._conexao.execute("SELECT COALESCE(SUM(bytes), 0) FROM objetos").fetchone()[0]
+            if total <= limite_bytes:
+                return 0
+            alvo = int(limite_bytes * 0.9)
+            liberados = 0
+            arquivos = []
+            while total - liberados > alvo:
+                # A sequência de uma chave sai inteira: sem buracos no meio dela
+                antigas = self._conexao.execute(
+                    "SELECT chave FROM respostas GROUP BY chave ORDER BY MAX(acessado) LIMIT 500"
+                ).fetchall()
+                if not antigas:
+                    break
+                for chave, in antigas:
+                    if total - liberados <= alvo:
+                        break
+                    objetos = [objeto for objeto, in self._conexao.execute(
+                        "SELECT DISTINCT objeto FROM respostas WHERE chave = ?", (chave,)
+                    )]
+                    self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                    for objeto in objetos:
+                        if self._conexao.execute("SELECT 1 FROM respostas WHERE objeto = ?", (objeto,)).fetchone():
+                            continue  # conteúdo ainda usado por outra resposta
+                        linha = self._conexao.execute(
+                            "SELECT arquivo, bytes FROM objetos WHERE hash = ?", (objeto,)
+                        ).fetchone()
+                        if linha is not None:
+                            self._conexao.execute("DELETE FROM objetos WHERE hash = ?", (objeto,))
+                            arquivos.append(linha[0])
+                            liberados += linha[1]
+            self._conexao.commit()
+        for arquivo in arquivos:
+            try:
+                os.remove(self._arquivo(arquivo))
+            except FileNotFoundError:
+                pass
+        return liberados
+
+    def limpar(self):
+        """Apaga todas as gravações"""
+        self.descartar(-1)
+        with self._lock:
+            self._ocorrencias.clear()
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Respostas gravadas, reproduzidas e ausentes nesta sessão e
+                tamanho em disco (comprimido e original)
+        """
+        with self._lock:
+            respostas, = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()
+            comprimido, original = self._conexao.execute(
+                "SELECT COALESCE(SUM(bytes), 0), COALESCE(SUM(bytes_originais), 0) FROM objetos"
+            ).fetchone()
+        return {
+            'modo': self.modo,
+            'gravadas': self.gravadas,
+            'reproduzidas': self.reproduzidas,
+            'ausentes': self.ausentes,
+            'respostas': respostas,
+            'bytes': comprimido,
+            'bytes_originais': original,
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+class AdaptadorGravacao(HTTPAdapter):
+    def __init__(self, gravador, **kwargs):
+        """
+        Adaptador do requests que grava e reproduz as respostas de um Gravador
+
+        Fica abaixo da sessão usada pelo transporte do zeep, então vale tanto
+        para as chamadas do cliente quanto para a leitura incremental
+        (streaming.abrir_resposta) e para o download do WSDL. Respostas lidas
+        em modo stream são carregadas por inteiro ao serem gravadas.
+
+        Args:
+            gravador (Gravador): Onde as respostas ficam
+            **kwargs: Repassados ao HTTPAdapter (pool_maxsize, max_retries...)
+        """
+        super().__init__(**kwargs)
+        self.gravador = gravador
+
+    def _resposta(self, request, conteudo, status, headers):
+        headers = {nome: valor for nome, valor in headers.items() if nome.lower() not in _CABECALHOS_DESCARTADOS}
+        headers['Content-Length'] = str(len(conteudo))
+        raw = HTTPResponse(body=BytesIO(conteudo), headers=headers, status=status,
+                           preload_content=False, decode_content=False)
+        return self.build_response(request, raw)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        gravador = self.gravador
+        chave, operacao = chave_requisicao(request.method, request.url, request.body)
+        if gravador.modo == CACHE and not gravador.cacheavel(operacao):
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        if gravador.modo != GRAVAR:
+            gravada = gravador.buscar(chave)
+            if gravada is not None:
+                conteudo, status, tipo = gravada
+                return self._resposta(request, conteudo, status, {'Content-Type': tipo or 'text/xml; charset=utf-8'})
+            if gravador.modo == REPRODUZIR:
+                raise RespostaNaoGravada(f"Sem resposta gravada para {operacao} em {gravador.diretorio}")
+
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        try:
+            conteudo = response.content
+        finally:
+            response.close()
+        gravador.gravar(chave, operacao, conteudo, response.status_code, response.headers.get('Content-Type'))
+        return self._resposta(request, conteudo, response.status_code, response.headers)
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import threading
+
+# Limite superior usado nas buscas por range de IDs (long do serviço)
+MAIOR_ID_PACOTE = 2 ** 63 - 1
+
+
+class CheckpointMemoria:
+    """Guarda o último idPacote confirmado apenas em memória"""
+
+    def __init__(self, valor=None):
+        self._valor = valor
+
+    def ler(self):
+        """Retorna o último idPacote confirmado (None se não houver)"""
+        return self._valor
+
+    def salvar(self, id_pacote):
+        """Registra o último idPacote confirmado"""
+        self._valor = id_pacote
+
+
+class CheckpointArquivo:
+    """Guarda o último idPacote confirmado em um arquivo JSON"""
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo onde o checkpoint é gravado
+        """
+        self.caminho = caminho
+
+    def ler(self):
+        """Retorna o último idPacote confirmado (None se não houver)"""
+        try:
+            with open(self.caminho) as f:
+                return json.load(f).get('idPacote')
+        except FileNotFoundError:
+            return None
+
+    def salvar(self, id_pacote):
+        """Registra o último idPacote confirmado (escrita atômica)"""
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w') as f:
+            json.dump({'idPacote': id_pacote}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho)
+
+
+class IngestorPosicoes:
+    def __init__(self, api, checkpoint=None, quantidade=3000, motorista=False, com_placa=False,
+                 espera_minima=1, espera_maxima=60, stream=False, recuperar_por_range=False,
+                 deduplicador=None):
+        """
+        Consome continuamente a fila de posições da Sascar
+
+        Os pacotes são pedidos em sequência enquanto o servidor devolve lotes
+        cheios; com a fila vazia a espera dobra até espera_maxima. O maior
+        idPacote de cada lote é salvo no checkpoint depois que todos os seus
+        registros foram consumidos, e registros com idPacote já confirmado são
+        descartados.
+
+        Args:
+            api (SascarAPI): API da conta
+            checkpoint (CheckpointMemoria | CheckpointArquivo, optional): Onde
+                guardar o último idPacote confirmado (qualquer objeto com ler/salvar)
+            quantidade (int): Registros por pacote (default 3000)
+            motorista (bool): Se True, inclui informações do motorista
+            com_placa (bool): Se True, inclui a placa do veículo
+            espera_minima (float): Espera, em segundos, após um lote incompleto
+            espera_maxima (float): Espera máxima com a fila vazia
+            stream (bool): Se True, lê cada pacote de forma incremental
+            recuperar_por_range (bool): Se True, ao iniciar com checkpoint busca
+                por range de IDs os pacotes posteriores a ele antes de voltar à fila
+            deduplicador (Deduplicador, optional): Descarta os idPacote já
+                recebidos nesta execução (ex.: repetidos após timeout)
+        """
+        self.api = api
+        self.checkpoint = checkpoint or CheckpointMemoria()
+        self.quantidade = quantidade
+        self.motorista = motorista
+        self.com_placa = com_placa
+        self.espera_minima = espera_minima
+        self.espera_maxima = espera_maxima
+        self.stream = stream
+        self.recuperar_por_range = recuperar_por_range
+        self.deduplicador = deduplicador
+        self.ultimo_id = self.checkpoint.ler()
+        self._parar = threading.Event()
+
+    def parar(self):
+        """Encerra a iteração na próxima espera ou no fim do lote atual"""
+        self._parar.set()
+
+    def _confirmar(self, lote):
+        """Salva o maior idPacote do lote já consumido"""
+        ids = [registro.get('idPacote') for registro in lote if registro.get('idPacote') is not None]
+        if ids:
+            maior = max(ids)
+            if self.ultimo_id is None or maior > self.ultimo_id:
+                self.ultimo_id = maior
+                self.checkpoint.salvar(maior)
+
+    def _novos(self, lote):
+        """Descarta os registros já confirmados em execuções anteriores e os repetidos"""
+        if self.ultimo_id is not None:
+            lote = [r for r in lote if r.get('idPacote') is None or r['idPacote'] > self.ultimo_id]
+        if self.deduplicador is not None:
+            lote = self.deduplicador.filtrar(lote)
+        return lote
+
+    def _buscar_lote(self):
+        """Busca o próximo pacote da fila"""
+        lote = self.api.obterPacotePosicoes(
+            quantidade=self.quantidade,
+            motorista=self.motorista,
+            com_placa=self.com_placa,
+            stream=self.stream,
+        )
+        return list(lote)
+
+    def _recuperar(self):
+        """Busca por range de IDs os pacotes posteriores ao checkpoint"""
+        while not self._parar.is_set():
+            recebidos = self.api.obterPacotePosicaoMotoristaPorRangeJSON(
+                self.ultimo_id + 1,
+                MAIOR_ID_PACOTE,
+                quantidade=self.quantidade,
+                motorista=self.motorista,
+            )
+            lote = self._novos(recebidos)
+            if lote:
+                yield lote
+                self._confirmar(lote)
+            if not lote or len(recebidos) < self.quantidade:
+                return
+
+    def lotes(self):
+        """
+        Gera os pacotes de posições conforme chegam
+
+        Yields:
+            list: Registros novos de cada pacote
+        """
+        if self.recuperar_por_range and self.ultimo_id is not None:
+            yield from self._recuperar()
+
+        espera = self.espera_minima
+        while not self._parar.is_set():
+            recebidos = self._buscar_lote()
+            lote = self._novos(recebidos)
+            if lote:
+                yield lote
+                self._confirmar(lote)
+
+            if len(recebidos) >= self.quantidade:
+                espera = self.espera_minima
+                continue
+            if recebidos:
+                espera = self.espera_minima
+                self._parar.wait(espera)
+            else:
+                self._parar.wait(espera)
+                espera = min(espera * 2, self.espera_maxima)
+
+    async def _recuperar_async(self):
+        """Versão assíncrona de _recuperar()"""
+        while not self._parar.is_set():
+            recebidos = await self.api.obterPacotePosicaoMotoristaPorRangeJSON(
+                self.ultimo_id + 1,
+                MAIOR_ID_PACOTE,
+                quantidade=self.quantidade,
+                motorista=self.motorista,
+            )
+            lote = self._novos(recebidos)
+            if lote:
+                yield lote
+                self._confirmar(lote)
+            if not lote or len(recebidos) < self.quantidade:
+                return
+
+    async def lotes_async(self):
+        """
+        Versão assíncrona de lotes(), para uso com SascarAPIAsync
+
+        Yields:
+            list: Registros novos de cada pacote
+
+        Raises:
+            NotImplementedError: Se stream=True (a SascarAPIAsync não lê
+                pacotes de forma incremental)
+        """
+        if self.stream:
+            raise NotImplementedError(
+                "stream=True não é suportado em lotes_async(): a SascarAPIAsync não lê pacotes "
+                "de forma incremental; use lotes() com a SascarAPI síncrona"
+            )
+
+        if self.recuperar_por_range and self.ultimo_id is not None:
+            async for lote in self._recuperar_async():
+                yield lote
+
+        espera = self.espera_minima
+        while not self._parar.is_set():
+            recebidos = await self.api.obterPacotePosicoes(
+                quantidade=self.quantidade,
+                motorista=self.motorista,
+                com_placa=self.com_placa,
+            )
+            lote = self._novos(recebidos)
+            if lote:
+                yield lote
+                self._confirmar(lote)
+
+            if len(recebidos) >= self.quantidade:
+                espera = self.espera_minima
+                continue
+            if recebidos:
+                espera = self.espera_minima
+                await asyncio.sleep(espera)
+            else:
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, self.espera_maxima)
+
+    async def __aiter__(self):
+        """
+        Gera as posições uma a uma (SascarAPIAsync)
+
+        Yields:
+            dict: Registro de posição
+        """
+        async for lote in self.lotes_async():
+            for registro in lote:
+                yield registro
+
+    def __iter__(self):
+        """
+        Gera as posições uma a uma
+
+        Yields:
+            dict: Registro de posição
+        """
+        for lote in self.lotes():
+            yield from lote
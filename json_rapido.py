@@ -0,0 +1,336 @@
+import json
+import threading
+import weakref
+from datetime import datetime, timezone
+
+from zeep.xsd.types import builtins
+
+from streaming import esquema_do_retorno
+from tempo import para_datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Operação SOAP -> variante que devolve JSON
+OPERACOES_JSON = {
+    'obterVeiculos': 'obterVeiculosJson',
+    'obterPacotePosicaoPorRange': 'obterPacotePosicaoPorRangeJSON',
+    'obterPacotePosicaoMotoristaPorRange': 'obterPacotePosicaoMotoristaPorRangeJSON',
+}
+
+_TIPOS_DATA = (builtins.DateTime, builtins.Date)
+_TIPOS_TEXTO = (builtins.String,)
+
+# Normalizadores já montados: cliente -> {operação SOAP: NormalizadorJSON}
+_normalizadores = weakref.WeakKeyDictionary()
+_normalizadores_lock = threading.Lock()
+
+
+def carregar_json(conteudo):
+    """
+    Decodifica JSON com orjson quando instalado (json da biblioteca padrão caso contrário)
+
+    Args:
+        conteudo (str | bytes): Texto JSON
+
+    Returns:
+        Objeto decodificado (None para conteúdo vazio)
+    """
+    if not conteudo:
+        return None
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    return json.loads(conteudo)
+
+
+def _chave(nome):
+    """Nome do campo sem diferença de maiúsculas, '_' e '-' (idVeiculo == id_veiculo)"""
+    return nome.replace('_', '').replace('-', '').lower()
+
+
+def _converter_data(valor, tipo):
+    if isinstance(valor, str):
+        # 'AAAA-MM-DDTHH:MM:SS' com ou sem fuso (±HH:MM ou Z): fromisoformat dá o mesmo valor do zeep
+        tamanho = len(valor)
+        if (tamanho == 19 or tamanho == 25 or tamanho == 20 and valor[19] == 'Z') and valor[10] == 'T' \
+                and isinstance(tipo, builtins.DateTime):
+            try:
+                return datetime.fromisoformat(valor)
+            except ValueError:
+                pass
+    elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        # Epoch em milissegundos (serializadores Java) ou segundos
+        segundos = valor / 1000 if abs(valor) > 1e11 else valor
+        return datetime.fromtimestamp(segundos, timezone.utc)
+    try:
+        return tipo.pythonvalue(valor)
+    except (ValueError, TypeError):
+        pass
+    try:
+        return para_datetime(valor)
+    except ValueError:
+        return datetime.strptime(valor.strip(), '%d/%m/%Y %H:%M:%S' if ':' in valor else '%d/%m/%Y')
+
+
+def _inteiro(valor):
+    if type(valor) is int:
+        return valor
+    return None if valor == '' else int(valor)
+
+
+def _real(valor):
+    return None if valor == '' else float(valor)
+
+
+def _conversor(tipo):
+    """Função que leva um valor JSON ao mesmo tipo Python do caminho SOAP"""
+    if isinstance(tipo, _TIPOS_TEXTO):
+        return lambda valor: valor if isinstance(valor, str) else str(valor)
+    if isinstance(tipo, builtins.Integer):
+        return _inteiro
+    if isinstance(tipo, (builtins.Double, builtins.Float)):
+        return _real
+    if isinstance(tipo, _TIPOS_DATA):
+        return lambda valor: None if valor == '' else _converter_data(valor, tipo)
+    if isinstance(tipo, builtins.Boolean):
+        return lambda valor: valor if isinstance(valor, bool) else (None if valor == '' else tipo.pythonvalue(str(valor).lower()))
+
+    def converter(valor):
+        if valor == '':
+            return None
+        return tipo.pythonvalue(valor if isinstance(valor, str) else str(valor))
+    return converter
+
+
+def _coluna_generica(conversor):
+    """Aplica o conversor valor a valor, como NormalizadorJSON.registro"""
+    def converter(coluna):
+        return [
+            None if valor is None
+            else [conversor(v) for v in valor] if isinstance(valor, list)
+            else conversor(valor)
+            for valor in coluna
+        ]
+    return converter
+
+
+def _coluna_aninhada(normalizador):
+    """Objetos (ou listas de objetos) de um tipo complexo dentro do registro"""
+    registro = normalizador.registro
+
+    def converter(coluna):
+        return [
+            registro(valor) if isinstance(valor, dict)
+            else [registro(v) for v in valor] if isinstance(valor, list)
+            else valor
+            for valor in coluna
+        ]
+    return converter
+
+
+def _coluna_numerica(funcao, conversor):
+    """int/float sobre a coluna inteira; vazios, nulos e listas caem no caminho valor a valor"""
+    generica = _coluna_generica(conversor)
+
+    def converter(coluna):
+        try:
+            return list(map(funcao, coluna))
+        except (TypeError, ValueError):
+            return generica(coluna)
+    return converter
+
+
+def _coluna_texto(conversor):
+    generica = _coluna_generica(conversor)
+
+    def converter(coluna):
+        for valor in coluna:
+            if type(valor) is not str:
+                return generica(coluna)
+        return coluna
+    return converter
+
+
+def _coluna_unicos(conversor):
+    """Converte cada valor distinto uma única vez (datas se repetem muito num pacote)"""
+    generica = _coluna_generica(conversor)
+
+    def converter(coluna):
+        try:
+            unicos = dict.fromkeys(coluna)
+        except TypeError:
+            return generica(coluna)
+        for valor in unicos:
+            if valor is not None:
+                unicos[valor] = conversor(valor)
+        return [unicos[valor] for valor in coluna]
+    return converter
+
+
+def _conversor_coluna(tipo, conversor):
+    """Função que converte uma coluna inteira com o mesmo resultado de conversor valor a valor"""
+    if isinstance(conversor, NormalizadorJSON):
+        return _coluna_aninhada(conversor)
+    if conversor is _inteiro:
+        return _coluna_numerica(int, conversor)
+    if conversor is _real:
+        return _coluna_numerica(float, conversor)
+    if isinstance(tipo, _TIPOS_TEXTO):
+        return _coluna_texto(conversor)
+    if isinstance(tipo, _TIPOS_DATA + (builtins.Boolean,)):
+        return _coluna_unicos(conversor)
+    return _coluna_generica(conversor)
+
+
+def _registros(dados):
+    """Aceita lista, objeto único ou envelope {'return': [...]}"""
+    if dados is None:
+        return []
+    if isinstance(dados, dict):
+        listas = [valor for valor in dados.values() if isinstance(valor, list)]
+        if len(dados) == 1 and listas:
+            return listas[0]
+        return [dados]
+    return dados
+
+
+class NormalizadorJSON:
+    def __init__(self, esquema):
+        """
+        Converte registros das operações JSON para o formato do caminho SOAP
+
+        Os campos são casados com o esquema da operação SOAP equivalente sem
+        diferença de maiúsculas e separadores, e os valores (texto, epoch ou
+        'dd/mm/aaaa HH:MM:SS' nas datas) são convertidos para os mesmos tipos
+        que o zeep devolve. Campos sem correspondente são mantidos como vieram.
+
+        Args:
+            esquema (dict): Ver streaming.esquema_do_retorno
+        """
+        self.campos = {}
+        self._colunas = {}
+        for campo, tipo in esquema.items():
+            conversor = NormalizadorJSON(tipo) if isinstance(tipo, dict) else _conversor(tipo)
+            self.campos[_chave(campo)] = (campo, conversor)
+            self._colunas[campo] = _conversor_coluna(tipo, conversor)
+        self.nomes = list(esquema)
+        # Nome como veio no JSON -> (campo, conversor); os nomes se repetem em todos os registros
+        self._destinos = {}
+
+    def _destino(self, nome):
+        destino = self._destinos.get(nome)
+        if destino is None:
+            # Campo sem correspondente no esquema SOAP: mantido como veio
+            destino = self._destinos[nome] = self.campos.get(_chave(nome), (nome, None))
+        return destino
+
+    def registro(self, item):
+        """Normaliza um único objeto JSON"""
+        registro = dict.fromkeys(self.nomes)
+        destinos = self._destinos
+        for nome, valor in item.items():
+            destino = destinos.get(nome)
+            if destino is None:
+                destino = self._destino(nome)
+            campo, conversor = destino
+            if conversor is None:
+                registro[campo] = valor
+            elif valor is None:
+                continue
+            elif isinstance(conversor, NormalizadorJSON):
+                if isinstance(valor, dict):
+                    registro[campo] = conversor.registro(valor)
+                elif isinstance(valor, list):
+                    registro[campo] = [conversor.registro(v) for v in valor]
+                else:
+                    registro[campo] = valor
+            elif isinstance(valor, list):
+                registro[campo] = [conversor(v) for v in valor]
+            else:
+                registro[campo] = conversor(valor)
+        return registro
+
+    def __call__(self, dados):
+        """
+        Normaliza um lote; quando todos os objetos têm os mesmos nomes, cada
+        nome é resolvido uma única vez e os valores são convertidos coluna a
+        coluna (o resultado é o mesmo de registro() objeto a objeto)
+
+        Args:
+            dados (list | dict): JSON já decodificado
+
+        Returns:
+            list: Registros com os campos e tipos do caminho SOAP
+        """
+        itens = _registros(dados)
+        if not itens:
+            return []
+        # Colunas só quando todos os objetos têm os mesmos nomes; senão, objeto a objeto
+        nomes_json = list(itens[0]) if type(itens[0]) is dict else None
+        if (
+            nomes_json is None
+            or any(type(item) is not dict or len(item) != len(nomes_json) for item in itens)
+            or len(set().union(*itens)) != len(nomes_json)
+        ):
+            registro = self.registro
+            return [registro(item) for item in itens]
+
+        destinos = [self._destino(nome) for nome in nomes_json]
+        campos = [campo for campo, _ in destinos]
+        if len(set(campos)) != len(campos):
+            # Dois nomes do JSON para o mesmo campo: vale a ordem de cada objeto
+            registro = self.registro
+            return [registro(item) for item in itens]
+
+        colunas = dict.fromkeys(self.nomes)
+        for nome, (campo, conversor) in zip(nomes_json, destinos):
+            coluna = [item[nome] for item in itens]
+            colunas[campo] = coluna if conversor is None else self._colunas[campo](coluna)
+        vazia = [None] * len(itens)
+        nomes = list(colunas)
+        return [dict(zip(nomes, linha)) for linha in zip(*(vazia if c is None else c for c in colunas.values()))]
+
+
+def normalizador_para(client, operacao):
+    """
+    Retorna o normalizador (montado uma única vez) de uma operação SOAP
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Operação SOAP cujo formato de registro deve ser seguido
+    """
+    with _normalizadores_lock:
+        por_operacao = _normalizadores.setdefault(client, {})
+        normalizador = por_operacao.get(operacao)
+        if normalizador is None:
+            normalizador = por_operacao[operacao] = NormalizadorJSON(esquema_do_retorno(client, operacao))
+    return normalizador
+
+
+def ler_json(client, operacao, conteudo):
+    """
+    Decodifica a resposta de uma operação JSON e normaliza os registros
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Operação SOAP equivalente (ex.: 'obterVeiculos')
+        conteudo (str | bytes): Texto JSON devolvido pela variante JSON
+
+    Returns:
+        list: Registros no formato do caminho SOAP
+    """
+    return normalizador_para(client, operacao)(carregar_json(conteudo))
+
+
+def operacao_json(client, operacao):
+    """Variante JSON da operação, se existir no WSDL carregado (None caso contrário)"""
+    variante = OPERACOES_JSON.get(operacao)
+    if variante is None:
+        return None
+    try:
+        client.service._binding.get(variante)
+    except ValueError:
+        return None
+    return variante
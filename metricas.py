@@ -0,0 +1,343 @@
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from urllib3 import Retry
+from zeep.exceptions import Fault
+from zeep.transports import AsyncTransport, Transport
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Fases medidas:
+#   wsdl       carga e interpretação do WSDL ao construir o cliente
+#   http       envio da requisição até a resposta (no modo stream, até os cabeçalhos)
+#   parse      montagem do envelope e leitura do XML pelo zeep (total - http)
+#   conversao  conversão dos objetos do zeep em dicionários (process_response)
+#   total      chamada completa ao serviço
+FASES = ('wsdl', 'http', 'parse', 'conversao', 'total')
+
+CONTADORES = ('chamadas', 'faults', 'erros', 'retentativas', 'bytes_enviados', 'bytes_recebidos', 'registros')
+
+# Operação em execução no contexto atual (thread ou tarefa asyncio)
+_operacao = contextvars.ContextVar('sascar_operacao', default='')
+# Tempo de HTTP acumulado na chamada atual, usado para separar a fase parse
+_tempo_http = contextvars.ContextVar('sascar_tempo_http', default=None)
+
+
+def operacao_atual():
+    """Retorna a última operação chamada no contexto atual ('' se nenhuma)"""
+    return _operacao.get()
+
+
+class Histograma:
+    __slots__ = ('limites', 'contagens', 'soma', 'total')
+
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """Retorna pares (limite, contagem acumulada), terminando em +Inf"""
+        acumulado = 0
+        resultado = []
+        for limite, contagem in zip(self.limites + (float('inf'),), self.contagens):
+            acumulado += contagem
+            resultado.append((limite, acumulado))
+        return resultado
+
+
+class _Inativo:
+    """Contexto vazio usado quando as métricas estão desligadas"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+_INATIVO = _Inativo()
+
+
+class _Medicao:
+    """Mede a duração de uma fase (sync ou async)"""
+
+    __slots__ = ('metricas', 'fase', 'operacao', 'inicio')
+
+    def __init__(self, metricas, fase, operacao):
+        self.metricas = metricas
+        self.fase = fase
+        self.operacao = operacao
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.metricas.observar(self.fase, self.operacao, time.perf_counter() - self.inicio)
+        return False
+
+
+class _Chamada:
+    """Mede uma chamada ao serviço: total, parse, em andamento, faults e erros"""
+
+    __slots__ = ('metricas', 'operacao', 'inicio', 'token_http')
+
+    def __init__(self, metricas, operacao):
+        self.metricas = metricas
+        self.operacao = operacao
+
+    def __enter__(self):
+        _operacao.set(self.operacao)
+        self.token_http = _tempo_http.set([0.0])
+        self.metricas._em_andamento_somar(self.operacao, 1)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, rastreio):
+        total = time.perf_counter() - self.inicio
+        http = _tempo_http.get()[0]
+        _tempo_http.reset(self.token_http)
+        metricas = self.metricas
+        metricas._em_andamento_somar(self.operacao, -1)
+        metricas.incrementar('chamadas', self.operacao)
+        if erro is not None:
+            metricas.incrementar('faults' if isinstance(erro, Fault) else 'erros', self.operacao)
+        metricas.observar('total', self.operacao, total)
+        if http:
+            metricas.observar('parse', self.operacao, max(total - http, 0.0))
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, tipo, erro, rastreio):
+        return self.__exit__(tipo, erro, rastreio)
+
+
+class Metricas:
+    def __init__(self, ativo=False, limites=LIMITES_LATENCIA):
+        """
+        Métricas de desempenho das chamadas ao serviço
+
+        Desligadas (ativo=False), as medições viram contextos vazios e o custo
+        por chamada é uma verificação de atributo.
+
+        Args:
+            ativo (bool): Se True, começa coletando
+            limites (tuple): Limites dos buckets dos histogramas em segundos
+        """
+        self.ativo = ativo
+        self.limites = tuple(limites)
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._contadores = {}
+        self._em_andamento = {}
+        self._ganchos = []
+
+    def ativar(self):
+        self.ativo = True
+
+    def desativar(self):
+        self.ativo = False
+
+    def limpar(self):
+        """Zera os valores coletados (os ganchos continuam registrados)"""
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+            self._em_andamento.clear()
+
+    def registrar_gancho(self, gancho):
+        """
+        Registra uma função chamada a cada medição
+
+        Args:
+            gancho (callable): Recebe (tipo, nome, operacao, valor), onde tipo é
+                'latencia' (nome = fase, valor em segundos), 'contador' ou 'em_andamento'
+        """
+        self._ganchos.append(gancho)
+
+    def remover_gancho(self, gancho):
+        self._ganchos.remove(gancho)
+
+    def _notificar(self, tipo, nome, operacao, valor):
+        for gancho in self._ganchos:
+            try:
+                gancho(tipo, nome, operacao, valor)
+            except Exception:
+                # Um gancho com defeito não interrompe a coleta nem a chamada medida
+                logger.exception("Erro no gancho de métricas %r (%s %s)", gancho, tipo, nome)
+
+    def observar(self, fase, operacao, segundos):
+        """Registra a duração de uma fase"""
+        if not self.ativo:
+            return
+        with self._lock:
+            histograma = self._histogramas.get((fase, operacao))
+            if histograma is None:
+                histograma = self._histogramas[(fase, operacao)] = Histograma(self.limites)
+            histograma.observar(segundos)
+        if self._ganchos:
+            self._notificar('latencia', fase, operacao, segundos)
+
+    def incrementar(self, nome, operacao, valor=1):
+        """Soma valor ao contador"""
+        if not self.ativo:
+            return
+        with self._lock:
+            chave = (nome, operacao)
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+        if self._ganchos:
+            self._notificar('contador', nome, operacao, valor)
+
+    def _em_andamento_somar(self, operacao, valor):
+        with self._lock:
+            atual = self._em_andamento[operacao] = self._em_andamento.get(operacao, 0) + valor
+        if self._ganchos:
+            self._notificar('em_andamento', 'em_andamento', operacao, atual)
+
+    def medir(self, fase, operacao=None):
+        """
+        Contexto que mede a duração de uma fase
+
+        Args:
+            fase (str): Nome da fase (ver FASES)
+            operacao (str, optional): Operação (padrão: a do contexto atual)
+        """
+        if not self.ativo:
+            return _INATIVO
+        return _Medicao(self, fase, operacao_atual() if operacao is None else operacao)
+
+    def chamada(self, operacao):
+        """Contexto (sync ou async) que envolve uma chamada ao serviço"""
+        if not self.ativo:
+            return _INATIVO
+        return _Chamada(self, operacao)
+
+    def registrar_http(self, segundos, enviados, recebidos):
+        """Registra uma ida e volta HTTP da operação do contexto atual"""
+        if not self.ativo:
+            return
+        operacao = operacao_atual()
+        acumulado = _tempo_http.get()
+        if acumulado is not None:
+            acumulado[0] += segundos
+        self.observar('http', operacao, segundos)
+        self.incrementar('bytes_enviados', operacao, enviados)
+        if recebidos:
+            self.incrementar('bytes_recebidos', operacao, recebidos)
+
+    def snapshot(self):
+        """
+        Retorna uma cópia dos valores coletados
+
+        Returns:
+            dict: {'latencia': {fase: {operacao: {'contagem', 'soma', 'buckets'}}},
+                'contadores': {nome: {operacao: valor}}, 'em_andamento': {operacao: valor}}
+        """
+        with self._lock:
+            latencia = {}
+            for (fase, operacao), histograma in self._histogramas.items():
+                latencia.setdefault(fase, {})[operacao] = {
+                    'contagem': histograma.total,
+                    'soma': histograma.soma,
+                    'buckets': histograma.acumulados(),
+                }
+            contadores = {}
+            for (nome, operacao), valor in self._contadores.items():
+                contadores.setdefault(nome, {})[operacao] = valor
+            return {
+                'latencia': latencia,
+                'contadores': contadores,
+                'em_andamento': dict(self._em_andamento),
+            }
+
+    def prometheus(self, prefixo='sascar'):
+        """
+        Exporta os valores no formato texto 0.0.4 do Prometheus
+
+        Os contadores são expostos com o sufixo _total também no nome da
+        família (# HELP/# TYPE), como o formato exige.
+
+        Returns:
+            str: Texto pronto para um endpoint /metrics
+        """
+        dados = self.snapshot()
+        linhas = [
+            f"# HELP {prefixo}_latencia_segundos Latência das chamadas por fase",
+            f"# TYPE {prefixo}_latencia_segundos histogram",
+        ]
+        for fase, operacoes in sorted(dados['latencia'].items()):
+            for operacao, valores in sorted(operacoes.items()):
+                rotulos = f'fase="{fase}",operacao="{operacao}"'
+                for limite, acumulado in valores['buckets']:
+                    le = '+Inf' if limite == float('inf') else repr(float(limite))
+                    linhas.append(f'{prefixo}_latencia_segundos_bucket{{{rotulos},le="{le}"}} {acumulado}')
+                linhas.append(f"{prefixo}_latencia_segundos_sum{{{rotulos}}} {valores['soma']}")
+                linhas.append(f"{prefixo}_latencia_segundos_count{{{rotulos}}} {valores['contagem']}")
+        for nome, operacoes in sorted(dados['contadores'].items()):
+            familia = f"{prefixo}_{nome}" if nome.endswith('_total') else f"{prefixo}_{nome}_total"
+            linhas.append(f"# HELP {familia} Contador {nome} por operação")
+            linhas.append(f"# TYPE {familia} counter")
+            for operacao, valor in sorted(operacoes.items()):
+                linhas.append(f'{familia}{{operacao="{operacao}"}} {valor}')
+        linhas.append(f"# HELP {prefixo}_em_andamento Chamadas em andamento por operação")
+        linhas.append(f"# TYPE {prefixo}_em_andamento gauge")
+        for operacao, valor in sorted(dados['em_andamento'].items()):
+            linhas.append(f'{prefixo}_em_andamento{{operacao="{operacao}"}} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+
+# Métricas do processo, desligadas por padrão (METRICAS.ativar() para coletar)
+METRICAS = Metricas()
+
+
+class RetryInstrumentado(Retry):
+    """urllib3.Retry que conta as novas tentativas feitas pelo adaptador HTTP"""
+
+    def increment(self, *args, **kwargs):
+        METRICAS.incrementar('retentativas', operacao_atual())
+        return super().increment(*args, **kwargs)
+
+
+class TransporteInstrumentado(Transport):
+    """Transporte do zeep que mede o tempo e os bytes de cada POST"""
+
+    def post(self, address, message, headers):
+        if not METRICAS.ativo:
+            return super().post(address, message, headers)
+        inicio = time.perf_counter()
+        response = super().post(address, message, headers)
+        METRICAS.registrar_http(time.perf_counter() - inicio, len(message), len(response.content))
+        return response
+
+
+class TransporteAssincronoInstrumentado(AsyncTransport):
+    """Versão de TransporteInstrumentado para o AsyncTransport do zeep"""
+
+    async def post(self, address, message, headers):
+        if not METRICAS.ativo:
+            return await super().post(address, message, headers)
+        inicio = time.perf_counter()
+        response = await super().post(address, message, headers)
+        METRICAS.registrar_http(time.perf_counter() - inicio, len(message), len(response.content))
+        return response
@@ -0,0 +1,92 @@
+import threading
+
+from sascar import SascarAPI, CACHE_WSDL_TTL, WSDL_URL, criar_cliente_sascar
+from zeep.cache import SqliteCache
+
+
+class SascarPool:
+    def __init__(self, wsdl=None, tamanho_pool=20, max_concorrencia_conta=4,
+                 cache_wsdl=True, cache_path=None, cache_ttl=CACHE_WSDL_TTL, resiliencia=None,
+                 preferir_json=False, gravacao=None):
+        """
+        Pool compartilhado para várias contas Sascar no mesmo processo
+
+        O WSDL é interpretado uma única vez e todas as contas usam o mesmo
+        cliente SOAP e as mesmas conexões HTTPS keep-alive. As credenciais de
+        cada conta são enviadas a cada chamada.
+
+        Args:
+            wsdl (str, optional): URL ou caminho de uma cópia local fixada do WSDL
+            tamanho_pool (int): Máximo de conexões HTTPS mantidas abertas
+            max_concorrencia_conta (int): Máximo de chamadas simultâneas por conta
+                (None para não limitar)
+            cache_wsdl (bool): Se True, guarda em disco o WSDL e os XSDs importados
+            cache_path (str, optional): Arquivo SQLite do cache
+            cache_ttl (int, optional): Validade do cache em segundos
+            resiliencia (resiliencia.Resiliencia, optional): Limite de taxa, novas
+                tentativas e disjuntores compartilhados por todas as contas
+            preferir_json (bool): Se True, as contas usam as variantes JSON das operações
+            gravacao (gravacao.Gravador, optional): Grava ou reproduz as respostas
+                de todas as contas
+        """
+        self.wsdl_url = wsdl or WSDL_URL
+        self.tamanho_pool = tamanho_pool
+        self.max_concorrencia_conta = max_concorrencia_conta
+        self.resiliencia = resiliencia
+        self.preferir_json = preferir_json
+        cache = SqliteCache(path=cache_path, timeout=cache_ttl) if cache_wsdl else None
+        self.client = criar_cliente_sascar(self.wsdl_url, cache=cache, tamanho_pool=tamanho_pool,
+                                           gravacao=gravacao)
+        self._contas = {}
+        self._lock = threading.Lock()
+
+    def conta(self, usuario, senha):
+        """
+        Retorna a API de uma conta usando o cliente compartilhado
+
+        Args:
+            usuario (str): Nome de usuário da conta
+            senha (str): Senha da conta
+
+        Returns:
+            SascarAPI: API ligada às credenciais da conta
+
+        Se a senha mudou, ela é trocada na instância existente, que mantém o
+        mesmo limite de concorrência das chamadas ainda em andamento.
+        """
+        with self._lock:
+            api = self._contas.get(usuario)
+            if api is None:
+                limite = None
+                if self.max_concorrencia_conta:
+                    limite = threading.BoundedSemaphore(self.max_concorrencia_conta)
+                api = SascarAPI(usuario, senha, client=self.client, limite_concorrencia=limite,
+                                resiliencia=self.resiliencia, preferir_json=self.preferir_json)
+                self._contas[usuario] = api
+            elif api.password != senha:
+                api.password = senha
+            return api
+
+    def chamar(self, usuario, senha, metodo, *args, **kwargs):
+        """
+        Executa um método da SascarAPI com as credenciais informadas
+
+        Args:
+            usuario (str): Nome de usuário da conta
+            senha (str): Senha da conta
+            metodo (str): Nome do método da SascarAPI (ex.: 'obterPacotePosicoes')
+
+        Returns:
+            Retorno do método chamado
+        """
+        return getattr(self.conta(usuario, senha), metodo)(*args, **kwargs)
+
+    def remover_conta(self, usuario):
+        """Remove uma conta do pool"""
+        with self._lock:
+            self._contas.pop(usuario, None)
+
+    def contas(self):
+        """Lista os usuários registrados no pool"""
+        with self._lock:
+            return list(self._contas)
@@ -0,0 +1,423 @@
+import sys
+import threading
+import weakref
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from colunar import DATA, INTEIRO, REAL, tipo_coluna
+from streaming import esquema_do_retorno
+from tempo import FUSO_SERVICO, para_datetime
+
+# Campos conhecidos de cada tipo de registro com o dtype usado no lote (numpy);
+# 'O' guarda textos (internados, pois cidades, UFs e ruas se repetem muito).
+# Com o cliente em mãos, classe_do_retorno acrescenta os campos que o WSDL tiver a mais.
+CAMPOS_POSICAO = (
+    ('idPacote', 'i8'),
+    ('idVeiculo', 'i8'),
+    ('dataPosicao', 'M8[s]'),
+    ('dataPacote', 'M8[s]'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('direcao', 'i4'),
+    ('velocidade', 'i4'),
+    ('ignicao', 'i4'),
+    ('odometro', 'i8'),
+    ('horimetro', 'i8'),
+    ('tensao', 'f8'),
+    ('saida1', 'i4'),
+    ('saida2', 'i4'),
+    ('saida3', 'i4'),
+    ('saida4', 'i4'),
+    ('entrada1', 'i4'),
+    ('entrada2', 'i4'),
+    ('entrada3', 'i4'),
+    ('entrada4', 'i4'),
+    ('satelite', 'i4'),
+    ('memoria', 'i4'),
+    ('gps', 'i4'),
+    ('uf', 'O'),
+    ('cidade', 'O'),
+    ('rua', 'O'),
+    ('pontoReferencia', 'O'),
+)
+
+CAMPOS_MOTORISTA = (
+    ('idMotorista', 'i8'),
+    ('nomeMotorista', 'O'),
+    ('placa', 'O'),
+)
+
+CAMPOS_EVENTO_TELEMETRIA = (
+    ('idVeiculo', 'i8'),
+    ('idMotorista', 'i8'),
+    ('idEvento', 'i8'),
+    ('descricaoEvento', 'O'),
+    ('dataInicioEvento', 'M8[s]'),
+    ('dataFimEvento', 'M8[s]'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('velocidade', 'i4'),
+    ('odometro', 'i8'),
+    ('duracao', 'i8'),
+)
+
+CAMPOS_DELTA_TELEMETRIA = (
+    ('idVeiculo', 'i8'),
+    ('dataPosicao', 'M8[s]'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('velocidade', 'i4'),
+    ('rpm', 'i4'),
+    ('odometro', 'i8'),
+    ('consumo', 'f8'),
+)
+
+
+def _para_texto(valor):
+    if valor is None:
+        return None
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
+class Registro:
+    """
+    Registro de tamanho fixo (__slots__), sem o dicionário de cada instância
+
+    Aceita acesso por índice (registro['campo']) e get() para continuar
+    compatível com o código que usa os dicionários de process_response.
+    Campos que não fazem parte do tipo são descartados.
+    """
+
+    __slots__ = ()
+    CAMPOS = ()
+
+    def __init__(self, **valores):
+        for nome, tipo in self.CAMPOS:
+            valor = valores.get(nome)
+            if tipo == 'O':
+                valor = _para_texto(valor)
+            object.__setattr__(self, nome, valor)
+
+    @classmethod
+    def de_dict(cls, registro):
+        """Cria o registro a partir de um dicionário (process_response ou stream)"""
+        return cls(**registro)
+
+    @classmethod
+    def de_zeep(cls, objeto):
+        """Cria o registro a partir de um objeto do zeep"""
+        valores = object.__getattribute__(objeto, '__values__')
+        return cls(**valores)
+
+    def para_dict(self):
+        """Retorna o registro como dicionário"""
+        return {nome: getattr(self, nome) for nome, _ in self.CAMPOS}
+
+    def __getitem__(self, nome):
+        try:
+            return getattr(self, nome)
+        except AttributeError:
+            raise KeyError(nome)
+
+    def get(self, nome, padrao=None):
+        return getattr(self, nome, padrao)
+
+    def keys(self):
+        return [nome for nome, _ in self.CAMPOS]
+
+    def __eq__(self, outro):
+        if type(outro) is not type(self):
+            return NotImplemented
+        return all(getattr(self, nome) == getattr(outro, nome) for nome, _ in self.CAMPOS)
+
+    def __repr__(self):
+        campos = ', '.join(f"{nome}={getattr(self, nome)!r}" for nome, _ in self.CAMPOS[:3])
+        return f"{type(self).__name__}({campos}, ...)"
+
+    def __reduce__(self):
+        # As subclasses montadas a partir do WSDL não são importáveis pelo nome:
+        # o pickle guarda a classe base, os campos e os valores
+        classe = type(self)
+        valores = tuple(getattr(self, nome) for nome, _ in self.CAMPOS)
+        return _reconstruir, (classe.__dict__.get('_BASE', classe), self.CAMPOS, valores)
+
+
+class Posicao(Registro):
+    """Posição de obterPacotePosicoes / obterPacotePosicaoPorRange"""
+
+    CAMPOS = CAMPOS_POSICAO
+    __slots__ = tuple(nome for nome, _ in CAMPOS_POSICAO)
+
+
+class PosicaoMotorista(Posicao):
+    """Posição com motorista (e placa, em obterPacotePosicoesMotoristaComPlaca)"""
+
+    CAMPOS = CAMPOS_POSICAO + CAMPOS_MOTORISTA
+    __slots__ = tuple(nome for nome, _ in CAMPOS_MOTORISTA)
+
+
+class EventoTelemetria(Registro):
+    """Evento de obterEventoTelemetriaIntegracao e obterEventoTelemetriaIntegracaoDataChegada"""
+
+    CAMPOS = CAMPOS_EVENTO_TELEMETRIA
+    __slots__ = tuple(nome for nome, _ in CAMPOS_EVENTO_TELEMETRIA)
+
+
+class DeltaTelemetria(Registro):
+    """Registro de obterDeltaTelemetriaIntegracao"""
+
+    CAMPOS = CAMPOS_DELTA_TELEMETRIA
+    __slots__ = tuple(nome for nome, _ in CAMPOS_DELTA_TELEMETRIA)
+
+
+# Formatos aceitos por SascarAPI: lista de registros ou LoteRegistros
+FORMATOS_REGISTRO = ('registros', 'lote')
+
+# Tipo de registro devolvido por cada operação do serviço
+CLASSES_POR_OPERACAO = {
+    'obterPacotePosicoes': Posicao,
+    'obterPacotePosicaoPorRange': Posicao,
+    'obterPacotePosicoesMotorista': PosicaoMotorista,
+    'obterPacotePosicoesMotoristaComPlaca': PosicaoMotorista,
+    'obterPacotePosicaoMotoristaPorRange': PosicaoMotorista,
+    'obterEventoTelemetriaIntegracao': EventoTelemetria,
+    'obterEventoTelemetriaIntegracaoDataChegada': EventoTelemetria,
+    'obterDeltaTelemetriaIntegracao': DeltaTelemetria,
+}
+
+
+# dtype dos campos que só o WSDL conhece, pelo tipo da coluna (colunar.tipo_coluna)
+DTYPES_POR_TIPO = {INTEIRO: 'i8', REAL: 'f8', DATA: 'M8[s]'}
+
+# Classes derivadas do WSDL, por cliente e operação
+_classes_wsdl = weakref.WeakKeyDictionary()
+_classes_wsdl_lock = threading.Lock()
+
+
+def _classe_do_wsdl(client, operacao, base):
+    """Subclasse de base com os campos na ordem do WSDL, mais os de base que o WSDL não tem"""
+    conhecidos = dict(base.CAMPOS)
+    campos = []
+    for nome, tipo in esquema_do_retorno(client, operacao).items():
+        if nome in conhecidos:
+            campos.append((nome, conhecidos.pop(nome)))
+        elif isinstance(tipo, dict):
+            campos.append((nome, 'O'))
+        else:
+            campos.append((nome, DTYPES_POR_TIPO.get(tipo_coluna(tipo), 'O')))
+    campos.extend(conhecidos.items())
+    return _subclasse(base, tuple(campos))
+
+
+# (classe base, campos) -> subclasse; a mesma combinação dá sempre a mesma classe
+_subclasses = {}
+_subclasses_lock = threading.Lock()
+
+
+def _subclasse(base, campos):
+    """Subclasse de base com os campos informados (a própria base se forem os mesmos)"""
+    if campos == tuple(base.CAMPOS):
+        return base
+    with _subclasses_lock:
+        classe = _subclasses.get((base, campos))
+        if classe is None:
+            novos = tuple(nome for nome, _ in campos if nome not in dict(base.CAMPOS))
+            classe = _subclasses[(base, campos)] = type(base.__name__, (base,), {
+                'CAMPOS': campos, '__slots__': novos, '_BASE': base, '__module__': __name__,
+            })
+    return classe
+
+
+def _reconstruir(base, campos, valores):
+    """Recria um registro serializado por Registro.__reduce__"""
+    registro = object.__new__(_subclasse(base, tuple(campos)))
+    for (nome, _), valor in zip(campos, valores):
+        object.__setattr__(registro, nome, valor)
+    return registro
+
+
+def classe_do_retorno(operacao, client=None):
+    """
+    Retorna o tipo de registro de uma operação
+
+    Args:
+        operacao (str): Nome da operação no WSDL
+        client (zeep.Client, optional): Se informado, o tipo inclui os campos
+            que o WSDL carregado tiver além dos conhecidos (ver CAMPOS_*)
+
+    Returns:
+        type: Subclasse de Registro
+    """
+    try:
+        base = CLASSES_POR_OPERACAO[operacao]
+    except KeyError:
+        raise ValueError(f"Operação sem tipo de registro compacto: {operacao}")
+    if client is None:
+        return base
+    with _classes_wsdl_lock:
+        classes = _classes_wsdl.setdefault(client, {})
+        classe = classes.get(operacao)
+        if classe is None:
+            classe = classes[operacao] = _classe_do_wsdl(client, operacao, base)
+    return classe
+
+
+def _nulo(tipo):
+    """Valor que representa ausência no dtype (NaN, NaT ou o menor inteiro)"""
+    if tipo.kind == 'f':
+        return np.nan
+    if tipo.kind == 'M':
+        return np.datetime64('NaT')
+    if tipo.kind == 'i':
+        return np.iinfo(tipo).min
+    return None
+
+
+def _para_datetime64(valor):
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            # Horário do serviço, como em tempo.py (datetime64 não guarda fuso)
+            valor = para_datetime(valor, FUSO_SERVICO)
+        return np.datetime64(valor, 's')
+    return np.datetime64(str(valor)[:19].replace(' ', 'T'), 's')
+
+
+class LoteRegistros:
+    def __init__(self, classe, capacidade=1024):
+        """
+        Lote de registros em um array estruturado do NumPy (uma linha por registro)
+
+        Números e datas ocupam o tamanho fixo do dtype; valores ausentes são
+        guardados como NaN, NaT ou o menor inteiro do dtype e voltam como None.
+        Datas com fuso horário são guardadas no horário do serviço (FUSO_SERVICO).
+
+        Args:
+            classe (type): Subclasse de Registro que define os campos
+            capacidade (int): Linhas reservadas inicialmente (o array dobra quando enche)
+        """
+        self.classe = classe
+        self.dtype = np.dtype([(nome, tipo) for nome, tipo in classe.CAMPOS])
+        self._nulos = {nome: _nulo(self.dtype[nome]) for nome in self.dtype.names}
+        self._dados = np.empty(max(capacidade, 1), dtype=self.dtype)
+        self._total = 0
+
+    @classmethod
+    def de_registros(cls, classe, registros):
+        """Cria o lote a partir de dicionários, objetos do zeep ou registros"""
+        lote = cls(classe, capacidade=len(registros) if hasattr(registros, '__len__') else 1024)
+        lote.estender(registros)
+        return lote
+
+    def _linha(self, registro):
+        if isinstance(registro, (Registro, dict)):
+            obter = registro.get
+        else:
+            obter = object.__getattribute__(registro, '__values__').get
+        linha = []
+        for nome in self.dtype.names:
+            valor = obter(nome)
+            if valor is None:
+                valor = self._nulos[nome]
+            elif self.dtype[nome].kind == 'M':
+                valor = _para_datetime64(valor)
+            elif self.dtype[nome].kind == 'O':
+                valor = _para_texto(valor)
+            linha.append(valor)
+        return tuple(linha)
+
+    def _reservar(self, quantidade):
+        necessario = self._total + quantidade
+        if necessario > len(self._dados):
+            novo = np.empty(max(necessario, len(self._dados) * 2), dtype=self.dtype)
+            novo[:self._total] = self._dados[:self._total]
+            self._dados = novo
+
+    def adicionar(self, registro):
+        """Acrescenta um registro (dicionário, objeto do zeep ou Registro)"""
+        self._reservar(1)
+        self._dados[self._total] = self._linha(registro)
+        self._total += 1
+
+    def estender(self, registros):
+        """Acrescenta vários registros (aceita geradores sem materializá-los)"""
+        if hasattr(registros, '__len__'):
+            self._reservar(len(registros))
+        for registro in registros:
+            if self._total == len(self._dados):
+                self._reservar(1)
+            self._dados[self._total] = self._linha(registro)
+            self._total += 1
+
+    @property
+    def array(self):
+        """numpy.ndarray: Visão das linhas preenchidas (sem cópia)"""
+        return self._dados[:self._total]
+
+    def coluna(self, nome):
+        """Retorna a coluna do campo como numpy.ndarray (sem cópia)"""
+        return self.array[nome]
+
+    @property
+    def nbytes(self):
+        """int: Bytes ocupados pelas linhas preenchidas (sem contar os textos)"""
+        return self.array.nbytes
+
+    def __len__(self):
+        return self._total
+
+    def _valor(self, nome, valor):
+        tipo = self.dtype[nome]
+        if tipo.kind == 'M':
+            return None if np.isnat(valor) else valor.astype(datetime)
+        if tipo.kind == 'f':
+            return None if np.isnan(valor) else float(valor)
+        if tipo.kind == 'i':
+            return None if valor == self._nulos[nome] else int(valor)
+        return valor
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += self._total
+        if not 0 <= indice < self._total:
+            raise IndexError(indice)
+        linha = self._dados[indice]
+        return self.classe(**{nome: self._valor(nome, linha[nome]) for nome in self.dtype.names})
+
+    def __iter__(self):
+        for indice in range(self._total):
+            yield self[indice]
+
+    def para_dataframe(self):
+        """
+        Returns:
+            pandas.DataFrame: Uma coluna por campo (ausentes como NaN/NaT/<NA>)
+        """
+        colunas = {}
+        for nome in self.dtype.names:
+            coluna = self.coluna(nome)
+            if self.dtype[nome].kind == 'i':
+                nulos = coluna == self._nulos[nome]
+                if nulos.any():
+                    coluna = pd.arrays.IntegerArray(coluna.astype('i8'), nulos)
+            colunas[nome] = coluna
+        return pd.DataFrame(colunas)
+
+
+def converter_registros(itens, classe):
+    """
+    Converte a resposta (objetos do zeep ou dicionários) em registros compactos
+
+    Args:
+        itens (list): Itens da resposta
+        classe (type): Subclasse de Registro
+
+    Returns:
+        list: Lista de registros
+    """
+    if not itens:
+        return []
+    if isinstance(itens[0], dict):
+        return [classe(**item) for item in itens]
+    return [classe.de_zeep(item) for item in itens]
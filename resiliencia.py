@@ -0,0 +1,281 @@
+import asyncio
+import random
+import threading
+import time
+
+from zeep.exceptions import Fault
+
+from excecoes import (CircuitoAberto, ErroConexao, ErroLimiteRequisicoes, ErroSascar, ErroTempoEsgotado,
+                      classificar, converter_erro)
+from metricas import METRICAS
+
+
+class BaldeTokens:
+    def __init__(self, taxa, capacidade=None, taxa_minima=None, incremento=None):
+        """
+        Limitador de taxa (token bucket) compartilhável entre threads e corrotinas
+
+        A taxa é adaptativa: cai pela metade a cada recusa por excesso de
+        requisições (penalizar) e volta a subir aos poucos a cada sucesso
+        (recompensar), até a taxa configurada.
+
+        Args:
+            taxa (float): Requisições por segundo
+            capacidade (float, optional): Rajada máxima (padrão: taxa)
+            taxa_minima (float, optional): Menor taxa após penalizações (padrão: taxa / 16)
+            incremento (float, optional): Aumento da taxa por sucesso (padrão: taxa / 100)
+        """
+        self.taxa_maxima = float(taxa)
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or taxa)
+        self.taxa_minima = float(taxa_minima or taxa / 16)
+        self.incremento = float(incremento or taxa / 100)
+        self._tokens = self.capacidade
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self, tokens):
+        """Reserva os tokens e retorna quanto tempo esperar até poder usá-los"""
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.taxa
+
+    def adquirir(self, tokens=1):
+        """Bloqueia a thread até haver tokens disponíveis"""
+        espera = self._reservar(tokens)
+        if espera:
+            time.sleep(espera)
+
+    async def adquirir_async(self, tokens=1):
+        """Versão para corrotinas: aguarda sem bloquear o event loop"""
+        espera = self._reservar(tokens)
+        if espera:
+            await asyncio.sleep(espera)
+
+    def penalizar(self):
+        """Reduz a taxa pela metade (o serviço indicou excesso de requisições)"""
+        with self._lock:
+            self.taxa = max(self.taxa_minima, self.taxa / 2)
+
+    def recompensar(self):
+        """Recupera a taxa aos poucos após uma chamada bem-sucedida"""
+        if self.taxa < self.taxa_maxima:
+            with self._lock:
+                self.taxa = min(self.taxa_maxima, self.taxa + self.incremento)
+
+
+class Disjuntor:
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio_aberto'
+
+    def __init__(self, limite_falhas=5, tempo_abertura=30):
+        """
+        Disjuntor (circuit breaker) de um endpoint
+
+        Após limite_falhas falhas seguidas o disjuntor abre e recusa as
+        chamadas por tempo_abertura segundos; depois deixa passar uma chamada
+        de teste, que fecha o disjuntor se der certo ou o reabre se falhar.
+
+        Args:
+            limite_falhas (int): Falhas seguidas para abrir
+            tempo_abertura (float): Segundos aberto antes da chamada de teste
+        """
+        self.limite_falhas = limite_falhas
+        self.tempo_abertura = tempo_abertura
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def permitir(self, nome=''):
+        """Levanta CircuitoAberto se a chamada não deve ser feita agora"""
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return
+            restante = self._aberto_em + self.tempo_abertura - time.monotonic()
+            if self.estado == self.ABERTO and restante <= 0:
+                self.estado = self.MEIO_ABERTO
+                self._teste_em_andamento = False
+            if self.estado == self.MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return
+        raise CircuitoAberto(f"Disjuntor aberto para {nome or 'o serviço'}; nova tentativa em {max(restante, 0):.1f}s")
+
+    def sucesso(self):
+        with self._lock:
+            self.estado = self.FECHADO
+            self.falhas = 0
+            self._teste_em_andamento = False
+
+    def liberar(self):
+        """Encerra a chamada de teste sem mudar o estado (erro que não conta como falha)"""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.estado == self.MEIO_ABERTO or self.falhas >= self.limite_falhas:
+                self.estado = self.ABERTO
+                self._aberto_em = time.monotonic()
+                self._teste_em_andamento = False
+
+
+class PoliticaRetentativa:
+    def __init__(self, tentativas=4, espera_base=0.5, espera_maxima=30):
+        """
+        Novas tentativas com backoff exponencial e jitter completo
+
+        Só são repetidos os erros marcados como retentáveis (excesso de
+        requisições, tempo esgotado e falhas de conexão).
+
+        Args:
+            tentativas (int): Total de tentativas, incluindo a primeira
+            espera_base (float): Espera base em segundos
+            espera_maxima (float): Teto da espera em segundos
+        """
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+    def espera(self, tentativa):
+        """Espera aleatória entre 0 e base * 2^tentativa (limitada ao teto)"""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+
+    def deve_repetir(self, classe, tentativa):
+        return classe.retentavel and tentativa + 1 < self.tentativas
+
+
+class Resiliencia:
+    def __init__(self, taxa=None, capacidade=None, politica=None, limite_falhas=5, tempo_abertura=30):
+        """
+        Limite de taxa, novas tentativas e disjuntor por operação, compartilháveis
+        entre contas, threads e corrotinas
+
+        Os Faults que sobram após as tentativas são levantados sem alteração
+        (os métodos da SascarAPI os convertem em erros tipados); erros de rede
+        e de tempo são levantados como ErroConexao / ErroTempoEsgotado.
+
+        Args:
+            taxa (float, optional): Requisições por segundo (None desliga o limite)
+            capacidade (float, optional): Rajada máxima do limite de taxa
+            politica (PoliticaRetentativa, optional): Política de novas tentativas
+            limite_falhas (int): Falhas seguidas que abrem o disjuntor de uma operação
+            tempo_abertura (float): Segundos que o disjuntor fica aberto
+        """
+        self.balde = BaldeTokens(taxa, capacidade) if taxa else None
+        self.politica = politica or PoliticaRetentativa()
+        self.limite_falhas = limite_falhas
+        self.tempo_abertura = tempo_abertura
+        self._disjuntores = {}
+        self._lock = threading.Lock()
+
+    def disjuntor(self, operacao):
+        """Retorna o disjuntor da operação"""
+        with self._lock:
+            disjuntor = self._disjuntores.get(operacao)
+            if disjuntor is None:
+                disjuntor = self._disjuntores[operacao] = Disjuntor(self.limite_falhas, self.tempo_abertura)
+            return disjuntor
+
+    def _registrar_erro(self, operacao, disjuntor, erro, tentativa):
+        """Atualiza disjuntor e taxa; retorna a espera antes de repetir ou None"""
+        classe = classificar(erro)
+        if classe is ErroLimiteRequisicoes and self.balde is not None:
+            self.balde.penalizar()
+        if classe.conta_falha:
+            disjuntor.falha()
+        else:
+            disjuntor.liberar()
+        if not self.politica.deve_repetir(classe, tentativa):
+            return None
+        METRICAS.incrementar('retentativas', operacao)
+        return self.politica.espera(tentativa)
+
+    def _sucesso(self, disjuntor):
+        disjuntor.sucesso()
+        if self.balde is not None:
+            self.balde.recompensar()
+
+    def _final(self, erro):
+        """Erro levantado quando as tentativas acabam (só erros de rede são convertidos)"""
+        if isinstance(erro, (Fault, ErroSascar)) or classificar(erro) not in (ErroTempoEsgotado, ErroConexao):
+            return erro
+        return converter_erro(erro)
+
+    def executar(self, operacao, funcao):
+        """
+        Executa funcao() respeitando taxa, disjuntor e novas tentativas
+
+        Args:
+            operacao (str): Nome da operação (um disjuntor por operação)
+            funcao (callable): Chamada ao serviço
+
+        Returns:
+            Resultado de funcao()
+        """
+        disjuntor = self.disjuntor(operacao)
+        tentativa = 0
+        while True:
+            disjuntor.permitir(operacao)
+            if self.balde is not None:
+                self.balde.adquirir()
+            try:
+                resultado = funcao()
+            except (KeyboardInterrupt, SystemExit, GeneratorExit, asyncio.CancelledError):
+                disjuntor.liberar()  # interrompida: não é sucesso nem falha
+                raise
+            except Exception as e:
+                espera = self._registrar_erro(operacao, disjuntor, e, tentativa)
+                if espera is None:
+                    erro = self._final(e)
+                    if erro is e:
+                        raise
+                    raise erro from e
+                time.sleep(espera)
+                tentativa += 1
+                continue
+            self._sucesso(disjuntor)
+            return resultado
+
+    async def executar_async(self, operacao, funcao):
+        """
+        Versão assíncrona de executar
+
+        Args:
+            operacao (str): Nome da operação
+            funcao (callable): Função que retorna uma nova corrotina a cada tentativa
+
+        Returns:
+            Resultado da corrotina
+        """
+        disjuntor = self.disjuntor(operacao)
+        tentativa = 0
+        while True:
+            disjuntor.permitir(operacao)
+            if self.balde is not None:
+                await self.balde.adquirir_async()
+            try:
+                resultado = await funcao()
+            except (KeyboardInterrupt, SystemExit, GeneratorExit, asyncio.CancelledError):
+                disjuntor.liberar()  # interrompida: não é sucesso nem falha
+                raise
+            except Exception as e:
+                espera = self._registrar_erro(operacao, disjuntor, e, tentativa)
+                if espera is None:
+                    erro = self._final(e)
+                    if erro is e:
+                        raise
+                    raise erro from e
+                await asyncio.sleep(espera)
+                tentativa += 1
+                continue
+            self._sucesso(disjuntor)
+            return resultado
@@ -1,72 +1,326 @@
 from datetime import datetime
 import pandas as pd
 from zeep import Client, Settings
-from zeep.transports import Transport
+from zeep.cache import SqliteCache
 from zeep.exceptions import Fault
-import json
+from contextlib import nullcontext
+from conversor import converter_lista
+from streaming import abrir_resposta, esquema_do_retorno, iterar_registros, registros_da_resposta, tipos_do_retorno
+from colunar import FORMATOS, ler_colunas
+from registros import FORMATOS_REGISTRO, LoteRegistros, classe_do_retorno
+from exportacao import exportar
+from metricas import METRICAS, RetryInstrumentado, TransporteInstrumentado, operacao_atual
+from excecoes import converter_erro
+from tempo import formatar_data, periodo
+from json_rapido import OPERACOES_JSON, ler_json, operacao_json
+from gravacao import AdaptadorGravacao
 from requests import Session
 from requests.adapters import HTTPAdapter
 import ssl
+import threading
 import urllib3
 
 # Configurações de segurança para HTTPS
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+WSDL_URL = 'https://sasintegra.sascar.com.br/SasIntegra/SasIntegraWSService?wsdl'
+
+# Tempo padrão (em segundos) de validade do WSDL/XSD guardados em disco
+CACHE_WSDL_TTL = 24 * 60 * 60
+
+# Clientes já construídos neste processo, indexados pela configuração do WSDL
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def limpar_clientes_cache():
+    """Descarta os clientes SOAP reaproveitados dentro do processo"""
+    with _clientes_lock:
+        _clientes.clear()
+
+
+def criar_settings_sascar():
+    """Retorna as configurações do zeep usadas pelos clientes Sascar"""
+    return Settings(
+        strict=False,
+        xml_huge_tree=True,
+        extra_http_headers={
+            'Content-Type': 'text/xml; charset=utf-8',
+            'User-Agent': 'SascarIntegracaoAPI/1.0'
+        }
+    )
+
+
+def criar_cliente_sascar(wsdl_url=WSDL_URL, cache=None, tamanho_pool=10, gravacao=None):
+    """
+    Configura e retorna o cliente SOAP para a API Sascar com conexão segura
+    
+    Args:
+        wsdl_url (str): URL ou caminho local do WSDL
+        cache (zeep.cache.Base, optional): Cache do WSDL e dos XSDs importados
+        tamanho_pool (int): Máximo de conexões HTTPS mantidas abertas
+        gravacao (gravacao.Gravador, optional): Grava as respostas em disco ou
+            as reproduz sem acessar a rede
+        
+    Returns:
+        zeep.Client: Cliente configurado
+    """
+    try:
+        # Configuração do contexto SSL para TLSv1.2
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = True
+        ssl_context.verify_mode = ssl.CERT_REQUIRED
+        ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+        
+        # Configuração da sessão com autenticação e SSL
+        session = Session()
+        session.verify = True  # Validação do certificado do servidor
+        
+        # Adaptador de transporte com suporte a retry
+        opcoes_adapter = dict(
+            pool_connections=tamanho_pool,
+            pool_maxsize=tamanho_pool,
+            max_retries=RetryInstrumentado(
+                total=3,
+                backoff_factor=0.1,
+                status_forcelist=[500, 502, 503, 504]
+            )
+        )
+        if gravacao is not None:
+            adapter = AdaptadorGravacao(gravacao, **opcoes_adapter)
+            session.mount('http://', adapter)
+        else:
+            adapter = HTTPAdapter(**opcoes_adapter)
+        session.mount('https://', adapter)
+        
+        settings = criar_settings_sascar()
+        
+        transport = TransporteInstrumentado(
+            cache=cache,
+            session=session,
+            timeout=30,
+            operation_timeout=30
+        )
+        
+        with METRICAS.medir('wsdl', ''):
+            return Client(wsdl_url, settings=settings, transport=transport)
+    except Exception as e:
+        raise converter_erro(e, "Erro ao configurar cliente SOAP seguro") from e
+
+
 class SascarAPI:
-    def __init__(self, SASCAR_USERNAME, SASCAR_PASSWORD):
+    def __init__(self, SASCAR_USERNAME, SASCAR_PASSWORD, wsdl=None, cache_wsdl=True,
+                 cache_path=None, cache_ttl=CACHE_WSDL_TTL, reutilizar_cliente=True,
+                 client=None, limite_concorrencia=None, resiliencia=None, preferir_json=False,
+                 gravacao=None):
         """
         Inicializa a conexão com o Web Service Sascar
         
         Args:
             username (str): Nome de usuário para autenticação
             password (str): Senha para autenticação
+            wsdl (str, optional): URL ou caminho de uma cópia local fixada do WSDL
+            cache_wsdl (bool, optional): Se True, guarda em disco o WSDL e os XSDs importados
+            cache_path (str, optional): Arquivo SQLite do cache (padrão: diretório de cache do zeep)
+            cache_ttl (int, optional): Validade do cache em segundos (None nunca expira)
+            reutilizar_cliente (bool, optional): Se True, reaproveita o cliente já
+                construído no processo para a mesma configuração
+            client (zeep.Client, optional): Cliente já configurado e compartilhado
+                (ex.: por um SascarPool); as credenciais seguem em cada chamada
+            limite_concorrencia (threading.Semaphore, optional): Limita as chamadas
+                simultâneas desta conta
+            resiliencia (resiliencia.Resiliencia, optional): Limite de taxa, novas
+                tentativas e disjuntor (pode ser compartilhado entre contas)
+            preferir_json (bool, optional): Se True, usa as variantes JSON das
+                operações que as têm (veículos e posições por range); o retorno
+                segue o mesmo formato de registro do SOAP
+            gravacao (gravacao.Gravador, optional): Grava as respostas brutas em
+                disco ou as reproduz sem acessar a rede (ver gravacao.py)
         """
         if not SASCAR_USERNAME or not SASCAR_PASSWORD:
             raise Exception('ERROR', 'username or password not defined')
 
-        self.wsdl_url = 'https://sasintegra.sascar.com.br/SasIntegra/SasIntegraWSService?wsdl'
+        self.wsdl_url = wsdl or WSDL_URL
+        self.cache_wsdl = cache_wsdl
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
         self.username = SASCAR_USERNAME
         self.password = SASCAR_PASSWORD
-        self.client = self.configurar_cliente_sascar()
+        self.limite_concorrencia = limite_concorrencia
+        self.resiliencia = resiliencia
+        self.preferir_json = preferir_json
+        self.gravacao = gravacao
+        self.client = client or self.obter_cliente(reutilizar_cliente)
+
+    def obter_cliente(self, reutilizar=True):
+        """
+        Retorna o cliente SOAP, reaproveitando o já interpretado no processo
+        
+        Args:
+            reutilizar (bool): Se False, sempre constrói um novo cliente
+            
+        Returns:
+            zeep.Client: Cliente configurado
+        """
+        if not reutilizar:
+            return self.configurar_cliente_sascar()
+
+        chave = (type(self), self.wsdl_url, self.cache_wsdl, self.cache_path, self.cache_ttl, self.gravacao)
+        with _clientes_lock:
+            client = _clientes.get(chave)
+            if client is None:
+                client = self.configurar_cliente_sascar()
+                _clientes[chave] = client
+        return client
+
+    def configurar_cache(self):
+        """Retorna o cache em disco usado para o WSDL e os XSDs importados"""
+        if not self.cache_wsdl:
+            return None
+        return SqliteCache(path=self.cache_path, timeout=self.cache_ttl)
     
     def configurar_cliente_sascar(self):
         """Configura e retorna o cliente SOAP para a API Sascar com conexão segura"""
-        try:
-            # Configuração do contexto SSL para TLSv1.2
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = True
-            ssl_context.verify_mode = ssl.CERT_REQUIRED
-            ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
-            
-            # Configuração da sessão com autenticação e SSL
-            session = Session()
-            session.verify = True  # Validação do certificado do servidor
-            
-            # Adaptador de transporte com suporte a retry
-            adapter = HTTPAdapter(
-                max_retries=urllib3.Retry(
-                    total=3,
-                    backoff_factor=0.1,
-                    status_forcelist=[500, 502, 503, 504]
-                )
-            )
-            session.mount('https://', adapter)
+        return criar_cliente_sascar(self.wsdl_url, cache=self.configurar_cache(), gravacao=self.gravacao)
+
+    def _chamar(self, operacao, autenticar=True, **params):
+        """
+        Executa uma operação do serviço com as credenciais desta conta
+        
+        Args:
+            operacao (str): Nome da operação no WSDL
+            autenticar (bool): Se True, envia usuario e senha junto aos parâmetros
+            **params: Parâmetros da operação
             
-            settings = Settings(
-                strict=False,
-                xml_huge_tree=True,
-                extra_http_headers={
-                    'Content-Type': 'text/xml; charset=utf-8',
-                    'User-Agent': 'SascarIntegracaoAPI/1.0'
-                }
-            )
+        Returns:
+            Resposta da operação
+        """
+        if autenticar:
+            params = self.com_credenciais(params)
+        metodo = getattr(self.client.service, operacao)
+
+        def tentativa():
+            with METRICAS.chamada(operacao):
+                return metodo(**params)
+
+        return self.executar_protegido(operacao, tentativa)
+
+    def com_credenciais(self, params):
+        """
+        Parâmetros de uma operação acrescidos do usuario e senha desta conta
+
+        Args:
+            params (dict): Parâmetros da operação
+
+        Returns:
+            dict: Novo dicionário com usuario, senha e os parâmetros
+        """
+        return dict(usuario=self.username, senha=self.password, **params)
+
+    def executar_protegido(self, operacao, funcao):
+        """
+        Executa funcao() ocupando uma vaga no limite de concorrência da conta
+        e sob a resiliência configurada (limite de taxa, disjuntor e novas
+        tentativas)
+
+        Args:
+            operacao (str): Nome da operação (chave da resiliência e das métricas)
+            funcao (callable): Chamada sem argumentos que faz a requisição
+
+        Returns:
+            O retorno de funcao()
+        """
+        with self._vaga():
+            return self._executar(operacao, funcao)
+
+    def _vaga(self):
+        """Vaga no limite de chamadas simultâneas da conta (contexto nulo sem limite)"""
+        if self.limite_concorrencia is None:
+            return nullcontext()
+        return self.limite_concorrencia
+
+    def _executar(self, operacao, funcao):
+        """Executa funcao() com o limite de taxa, o disjuntor e as novas tentativas da conta"""
+        if self.resiliencia is None:
+            return funcao()
+        return self.resiliencia.executar(operacao, funcao)
+    
+    def _stream(self, operacao, mensagem_erro, **params):
+        """
+        Executa uma operação lendo a resposta SOAP de forma incremental
+        
+        Args:
+            operacao (str): Nome da operação no WSDL
+            mensagem_erro (str): Prefixo da mensagem em caso de Fault
+            **params: Parâmetros da operação
             
-            transport = Transport(session=session, timeout=30, operation_timeout=30)
+        Yields:
+            dict: Registro da resposta
+        """
+        params = self.com_credenciais(params)
+        try:
+            # A vaga fica ocupada enquanto a resposta é lida; só a abertura é repetida
+            with self._vaga(), METRICAS.chamada(operacao):
+                response = self._executar(operacao, lambda: abrir_resposta(self.client, operacao, params))
+                yield from registros_da_resposta(self.client, operacao, response)
+        except Fault as e:
+            raise converter_erro(e, mensagem_erro) from e
+
+    def _colunar(self, operacao, formato, mensagem_erro, **params):
+        """
+        Executa uma operação preenchendo colunas tipadas ou registros
+        compactos durante a leitura
+        
+        Args:
+            operacao (str): Nome da operação no WSDL
+            formato (str): 'dataframe', 'arrow', 'registros' (lista de
+                registros com __slots__) ou 'lote' (registros.LoteRegistros)
+            mensagem_erro (str): Prefixo da mensagem em caso de Fault (None
+                propaga o Fault sem alteração)
+            **params: Parâmetros da operação
             
-            return Client(self.wsdl_url, settings=settings, transport=transport)
-        except Exception as e:
-            raise Exception(f"Erro ao configurar cliente SOAP seguro: {str(e)}")
-    
+        Returns:
+            pandas.DataFrame | pyarrow.Table | list | LoteRegistros: Registros no formato pedido
+        """
+        if formato not in FORMATOS + FORMATOS_REGISTRO:
+            raise ValueError(f"Formato inválido: {formato}")
+        params = self.com_credenciais(params)
+        try:
+            return self.executar_protegido(operacao, lambda: self._ler_formato(operacao, formato, params))
+        except Fault as e:
+            if mensagem_erro is None:
+                raise
+            raise converter_erro(e, mensagem_erro) from e
+
+    def _ler_formato(self, operacao, formato, params):
+        """Faz a requisição de _colunar e lê a resposta no formato pedido"""
+        with METRICAS.chamada(operacao), abrir_resposta(self.client, operacao, params) as response:
+            if formato in FORMATOS:
+                resultado = ler_colunas(response.raw, esquema_do_retorno(self.client, operacao), formato)
+            else:
+                classe = classe_do_retorno(operacao, self.client)
+                registros = iterar_registros(response.raw, tipos_do_retorno(self.client, operacao))
+                if formato == 'lote':
+                    resultado = LoteRegistros.de_registros(classe, registros)
+                else:
+                    resultado = [classe(**registro) for registro in registros]
+            METRICAS.incrementar('bytes_recebidos', operacao, response.raw.tell())
+            METRICAS.incrementar('registros', operacao, len(resultado))
+            return resultado
+
+    def _usar_json(self, operacao):
+        """True se preferir_json está ligado e a operação tem variante JSON"""
+        return self.preferir_json and operacao_json(self.client, operacao) is not None
+
+    def _ler_json(self, operacao, response):
+        """Decodifica a resposta da variante JSON no formato de registro da operação SOAP"""
+        if not METRICAS.ativo:
+            return ler_json(self.client, operacao, response)
+        with METRICAS.medir('conversao'):
+            registros = ler_json(self.client, operacao, response)
+        METRICAS.incrementar('registros', operacao_atual(), len(registros))
+        return registros
+
     def zeep_to_dict(self, zeep_obj):
         """
         Converte um objeto Zeep para dicionário Python
@@ -94,7 +348,7 @@ class SascarAPI:
                         continue
                     
                     if isinstance(value, datetime):
-                        result[key] = value.strftime('%Y-%m-%d %H:%M:%S')
+                        result[key] = formatar_data(value)
                     elif hasattr(value, '__values__') or hasattr(value, '__dict__'):
                         result[key] = self.zeep_to_dict(value)
                     elif isinstance(value, list):
@@ -115,7 +369,7 @@ class SascarAPI:
                         try:
                             attr_value = getattr(zeep_obj, attr_name)
                             if isinstance(attr_value, datetime):
-                                result[attr_name] = attr_value.strftime('%Y-%m-%d %H:%M:%S')
+                                result[attr_name] = formatar_data(attr_value)
                             elif hasattr(attr_value, '__values__') or hasattr(attr_value, '__dict__'):
                                 result[attr_name] = self.zeep_to_dict(attr_value)
                             elif isinstance(attr_value, list):
@@ -147,14 +401,14 @@ class SascarAPI:
         if not response:
             return []
         
-        processed_data = []
-        for item in response:
-            if hasattr(item, '__dict__'):
-                processed_data.append(self.zeep_to_dict(item))
-            else:
-                processed_data.append(item)
-        
-        return processed_data
+        # Conversores gerados uma vez por tipo do esquema; zeep_to_dict fica
+        # apenas para objetos que não são valores do zeep
+        if not METRICAS.ativo:
+            return converter_lista(response, alternativo=self.zeep_to_dict)
+        with METRICAS.medir('conversao'):
+            registros = converter_lista(response, alternativo=self.zeep_to_dict)
+        METRICAS.incrementar('registros', operacao_atual(), len(registros))
+        return registros
      
     def atualizar_senha(self, senha_atual, nova_senha):
         """
@@ -168,14 +422,16 @@ class SascarAPI:
             str: Mensagem de confirmação
         """
         try:
-            response = self.client.service.atualizarSenha(
+            response = self._chamar(
+                'atualizarSenha',
+                autenticar=False,
                 usuario=self.username,
                 senhaAtual=senha_atual,
                 novaSenha=nova_senha
             )
             return response
         except Fault as e:
-            raise Exception(f"Erro ao atualizar senha: {str(e)}")
+            raise converter_erro(e, "Erro ao atualizar senha") from e
     
     def obter_grupo_atuadores(self):
         """
@@ -185,13 +441,10 @@ class SascarAPI:
             list: Lista de dicionários com informações dos atuadores
         """
         try:
-            response = self.client.service.obterGrupoAtuadores(
-                usuario=self.username,
-                senha=self.password
-            )
+            response = self._chamar('obterGrupoAtuadores')
             return self.process_response(response)
         except Fault as e:
-            raise Exception(f"Erro ao obter grupo de atuadores: {str(e)}")
+            raise converter_erro(e, "Erro ao obter grupo de atuadores") from e
     
     def obterClientes(self, quantidade=1, id_cliente=0):
         """
@@ -205,15 +458,14 @@ class SascarAPI:
             list: Lista de dicionários com informações dos clientes
         """
         try:
-            response = self.client.service.obterClientes(
-                usuario=self.username,
-                senha=self.password,
+            response = self._chamar(
+                'obterClientes',
                 quantidade=quantidade,
                 idCliente=id_cliente
             )
             return self.process_response(response)
         except Fault as e:
-            raise Exception(f"Erro ao obter clientes: {str(e)}")
+            raise converter_erro(e, "Erro ao obter clientes") from e
     
     def debug_zeep_object(self, obj, max_depth=2, current_depth=0):
         """
@@ -252,32 +504,28 @@ class SascarAPI:
         Obtém informações sobre os veículos
         
         Args:
-            json_format (bool): Se True, usa o método que retorna JSON
+            json_format (bool): Se True, usa o método que retorna JSON (padrão
+                quando preferir_json está ligado); os registros são normalizados
+                para o formato do SOAP
             debug (bool): Se True, mostra informações de debug
             
         Returns:
             list: Lista de dicionários com informações dos veículos
         """
         try:
-            if json_format:
-                response = self.client.service.obterVeiculosJson(
-                    usuario=self.username,
-                    senha=self.password,
+            if json_format or self._usar_json('obterVeiculos'):
+                response = self._chamar(
+                    'obterVeiculosJson',
                     quantidade=0
                 )
-                # O retorno já vem em JSON, então podemos converter diretamente
-                return json.loads(response) if response else []
+                return self._ler_json('obterVeiculos', response)
             else:
-                response = self.client.service.obterVeiculos(
-                    usuario=self.username,
-                    senha=self.password,
+                response = self._chamar(
+                    'obterVeiculos',
                     quantidade=0,
                 )
-                # Verificar se há dados
-                if response:
-                    print(f"Total de veículos encontrados: {len(response)}")
-                
                 if debug and response:
+                    print(f"Total de veículos encontrados: {len(response)}")
                     print(f"Tipo da resposta: {type(response)}")
                     print(f"Quantidade de itens: {len(response) if hasattr(response, '__len__') else 'N/A'}")
                     if len(response) > 0:
@@ -286,10 +534,10 @@ class SascarAPI:
                 
                 return self.process_response(response)
         except Fault as e:
-            raise Exception(f"Erro ao obter veículos: {str(e)}")
+            raise converter_erro(e, "Erro ao obter veículos") from e
 
 
-    def obterPacotePosicoes(self, quantidade=3000, motorista=False, com_placa=False):
+    def obterPacotePosicoes(self, quantidade=3000, motorista=False, com_placa=False, stream=False, formato=None):
         """
         Obtém pacotes de posições dos veículos
         
@@ -297,36 +545,35 @@ class SascarAPI:
             quantidade (int): Quantidade máxima de registros (default 3000)
             motorista (bool): Se True, inclui informações do motorista
             com_placa (bool): Se True, inclui a placa do veículo
+            stream (bool): Se True, lê a resposta de forma incremental e
+                retorna um gerador de dicionários
+            formato (str, optional): 'dataframe' ou 'arrow' para receber as
+                posições já em colunas tipadas; 'registros' ou 'lote' para
+                registros compactos (ver registros.py)
             
         Returns:
             list: Lista de dicionários com informações dos pacotes de posição
         """
-        try:
-            if motorista:
-                if com_placa:
-                    response = self.client.service.obterPacotePosicoesMotoristaComPlaca(
-                        usuario=self.username,
-                        senha=self.password,
-                        quantidade=quantidade
-                    )
-                else:
-                    response = self.client.service.obterPacotePosicoesMotorista(
-                        usuario=self.username,
-                        senha=self.password,
-                        quantidade=quantidade
-                    )
+        if motorista:
+            if com_placa:
+                operacao = 'obterPacotePosicoesMotoristaComPlaca'
             else:
-                response = self.client.service.obterPacotePosicoes(
-                    usuario=self.username,
-                    senha=self.password,
-                    quantidade=quantidade
-                )
-            
+                operacao = 'obterPacotePosicoesMotorista'
+        else:
+            operacao = 'obterPacotePosicoes'
+
+        if formato:
+            return self._colunar(operacao, formato, "Erro ao obter pacotes de posições", quantidade=quantidade)
+        if stream:
+            return self._stream(operacao, "Erro ao obter pacotes de posições", quantidade=quantidade)
+
+        try:
+            response = self._chamar(operacao, quantidade=quantidade)
             return self.process_response(response)
         except Fault as e:
-            raise Exception(f"Erro ao obter pacotes de posições: {str(e)}")
+            raise converter_erro(e, "Erro ao obter pacotes de posições") from e
     
-    def obterPacotePosicaoMotoristaPorRangeJSON(self, id_inicio, id_final, quantidade=3000, motorista=False, json_format=False):
+    def obterPacotePosicaoMotoristaPorRangeJSON(self, id_inicio, id_final, quantidade=3000, motorista=False, json_format=False, stream=False, formato=None):
         """
         Obtém pacotes de posições por range de IDs
         
@@ -335,53 +582,39 @@ class SascarAPI:
             id_final (int): ID do último pacote
             quantidade (int): Quantidade máxima de registros (default 3000)
             motorista (bool): Se True, inclui informações do motorista
-            json_format (bool): Se True, usa o método que retorna JSON
+            json_format (bool): Se True, usa o método que retorna JSON (padrão
+                quando preferir_json está ligado); os registros são normalizados
+                para o formato do SOAP
+            stream (bool): Se True, lê a resposta SOAP de forma incremental e
+                retorna um gerador de dicionários (não se aplica a json_format)
+            formato (str, optional): 'dataframe' ou 'arrow' para receber as
+                posições já em colunas tipadas; 'registros' ou 'lote' para
+                registros compactos (ver registros.py) (não se aplica a json_format)
             
         Returns:
             list: Lista de dicionários com informações dos pacotes de posição
         """
+        if motorista:
+            operacao = 'obterPacotePosicaoMotoristaPorRange'
+        else:
+            operacao = 'obterPacotePosicaoPorRange'
+        params = dict(idInicio=id_inicio, idFinal=id_final, quantidade=quantidade)
+
+        if not json_format:
+            if formato:
+                return self._colunar(operacao, formato, "Erro ao obter pacotes de posições por range", **params)
+            if stream:
+                return self._stream(operacao, "Erro ao obter pacotes de posições por range", **params)
+            json_format = self._usar_json(operacao)
+
         try:
             if json_format:
-                if motorista:
-                    response = self.client.service.obterPacotePosicaoMotoristaPorRangeJSON(
-                        usuario=self.username,
-                        senha=self.password,
-                        idInicio=id_inicio,
-                        idFinal=id_final,
-                        quantidade=quantidade
-                    )
-                else:
-                    response = self.client.service.obterPacotePosicaoPorRangeJSON(
-                        usuario=self.username,
-                        senha=self.password,
-                        idInicio=id_inicio,
-                        idFinal=id_final,
-                        quantidade=quantidade
-                    )
-                
-                # O retorno já vem em JSON, então podemos converter diretamente
-                return json.loads(response) if response else []
-            else:
-                if motorista:
-                    response = self.client.service.obterPacotePosicaoMotoristaPorRange(
-                        usuario=self.username,
-                        senha=self.password,
-                        idInicio=id_inicio,
-                        idFinal=id_final,
-                        quantidade=quantidade
-                    )
-                else:
-                    response = self.client.service.obterPacotePosicaoPorRange(
-                        usuario=self.username,
-                        senha=self.password,
-                        idInicio=id_inicio,
-                        idFinal=id_final,
-                        quantidade=quantidade
-                    )
-                
-                return self.process_response(response)
+                response = self._chamar(OPERACOES_JSON[operacao], **params)
+                return self._ler_json(operacao, response)
+            response = self._chamar(operacao, **params)
+            return self.process_response(response)
         except Fault as e:
-            raise Exception(f"Erro ao obter pacotes de posições por range: {str(e)}")
+            raise converter_erro(e, "Erro ao obter pacotes de posições por range") from e
 
     
     def obterStatusComando(self, ticket=None, ticket_sascar=False):
@@ -397,24 +630,22 @@ class SascarAPI:
         """
         try:
             if ticket_sascar:
-                response = self.client.service.obterStatusComandoTicketSascar(
-                    usuario=self.username,
-                    senha=self.password,
+                response = self._chamar(
+                    'obterStatusComandoTicketSascar',
                     ticket=ticket
                 )
             else:
-                response = self.client.service.obterStatusComando(
-                    usuario=self.username,
-                    senha=self.password,
+                response = self._chamar(
+                    'obterStatusComando',
                     ticket=ticket
                 )
             
             return self.process_response(response)
         except Fault as e:
-            raise Exception(f"Erro ao obter status do comando: {str(e)}")
+            raise converter_erro(e, "Erro ao obter status do comando") from e
     
     
-    def obterEventoTelemetriaIntegracao(self, idVeiculo, dataInicio, dataFinal):
+    def obterEventoTelemetriaIntegracao(self, idVeiculo, dataInicio, dataFinal, formato=None):
         """
         Obtém eventos de telemetria para um veículo em um intervalo específico
         
@@ -422,6 +653,9 @@ class SascarAPI:
             idVeiculo (int): Número do ticket do comando
             dataInicio (str): Data de início no formato 'YYYY-MM-DD HH:MM:SS'
             dataFinal (str): Data final no formato 'YYYY-MM-DD HH:MM:SS'
+            formato (str, optional): 'dataframe' ou 'arrow' para receber os
+                eventos já em colunas tipadas; 'registros' ou 'lote' para
+                registros compactos (ver registros.py)
             
         Returns:
             list: Lista de dicionários com eventos telemetria
@@ -431,14 +665,20 @@ class SascarAPI:
                 raise ValueError('Parametros pendentes')
             
             # Garante que as datas estejam no formato correto para a API
-            if isinstance(dataInicio, datetime):
-                dataInicio = dataInicio.strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(dataFinal, datetime):
-                dataFinal = dataFinal.strftime('%Y-%m-%d %H:%M:%S')
+            dataInicio, dataFinal = periodo(dataInicio, dataFinal)
             
-            resultado = self.client.service.obterEventoTelemetriaIntegracao(
-                usuario=self.username,
-                senha=self.password,
+            if formato:
+                return self._colunar(
+                    'obterEventoTelemetriaIntegracao',
+                    formato,
+                    None,
+                    idVeiculo=idVeiculo,
+                    dataInicio=dataInicio,
+                    dataFinal=dataFinal,
+                )
+            
+            resultado = self._chamar(
+                'obterEventoTelemetriaIntegracao',
                 idVeiculo=idVeiculo,
                 dataInicio=dataInicio,
                 dataFinal=dataFinal,
@@ -446,10 +686,10 @@ class SascarAPI:
             
             return resultado or []
         except Exception as e:
-            raise Exception(f"Erro ao obter eventos de telemetria: {str(e)}")
+            raise converter_erro(e, "Erro ao obter eventos de telemetria") from e
         
     
-    def obterEventoTelemetriaIntegracaoDataChegada(self, idVeiculo, dataInicio=None, dataFinal=None,idEventoList=None):
+    def obterEventoTelemetriaIntegracaoDataChegada(self, idVeiculo, dataInicio=None, dataFinal=None,idEventoList=None, formato=None):
         """
         Obtém eventos de telemetria
         
@@ -458,6 +698,9 @@ class SascarAPI:
             idEventoList (int): Número do ID do evento
             data_inicio (str, optional): Data de início no formato 'YYYY-MM-DD HH:MM:SS'
             data_final (str, optional): Data final no formato 'YYYY-MM-DD HH:MM:SS'
+            formato (str, optional): 'dataframe' ou 'arrow' para receber os
+                eventos já em colunas tipadas; 'registros' ou 'lote' para
+                registros compactos (ver registros.py)
             
         Returns:
             list: Lista de dicionários com eventos de telemetria data chegada
@@ -467,14 +710,9 @@ class SascarAPI:
                 raise ValueError('Parametros pendentes')
             
             # Garante que as datas estejam no formato correto para a API
-            if isinstance(dataInicio, datetime):
-                dataInicio = dataInicio.strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(dataFinal, datetime):
-                dataFinal = dataFinal.strftime('%Y-%m-%d %H:%M:%S')
+            dataInicio, dataFinal = periodo(dataInicio, dataFinal)
             
-            response = self.client.service.obterEventoTelemetriaIntegracaoDataChegada(
-                usuario=self.username,
-                senha=self.password,
+            params = dict(
                 idVeiculo=idVeiculo,
                 dataInicio=dataInicio,
                 dataFinal=dataFinal,
@@ -482,11 +720,15 @@ class SascarAPI:
                 dataChegadaFinal=dataFinal,
                 idEventoList=idEventoList,
             )
+            if formato:
+                return self._colunar('obterEventoTelemetriaIntegracaoDataChegada', formato, None, **params)
+            
+            response = self._chamar('obterEventoTelemetriaIntegracaoDataChegada', **params)
             return self.process_response(response)
         except Exception as e:
-            raise Exception(f"Erro ao obter eventos de telemetria: {str(e)}")
+            raise converter_erro(e, "Erro ao obter eventos de telemetria") from e
     
-    def obterDeltaTelemetriaIntegracao(self, idVeiculo, dataInicio, dataFinal):
+    def obterDeltaTelemetriaIntegracao(self, idVeiculo, dataInicio, dataFinal, stream=False, formato=None):
         """
         Obtém todos os Delta Telemetria disponíveis
         
@@ -494,21 +736,44 @@ class SascarAPI:
             idVeiculo (int): Número do ID do veiculo
             data_inicio (str, optional): Data de início no formato 'YYYY-MM-DD HH:MM:SS'
             data_final (str, optional): Data final no formato 'YYYY-MM-DD HH:MM:SS'
+            stream (bool): Se True, lê a resposta de forma incremental e
+                retorna um gerador de dicionários
+            formato (str, optional): 'dataframe' ou 'arrow' para receber os
+                registros já em colunas tipadas; 'registros' ou 'lote' para
+                registros compactos (ver registros.py)
             
         Returns:
             list: Lista de dicionários com eventos de telemetria integração
         """
+        dataInicio, dataFinal = periodo(dataInicio, dataFinal)
+        if formato:
+            return self._colunar(
+                'obterDeltaTelemetriaIntegracao',
+                formato,
+                "Erro ao obter Delta Telemetria Integracao",
+                dataInicio=dataInicio,
+                dataFinal=dataFinal,
+                idVeiculo=idVeiculo,
+            )
+        if stream:
+            return self._stream(
+                'obterDeltaTelemetriaIntegracao',
+                "Erro ao obter Delta Telemetria Integracao",
+                dataInicio=dataInicio,
+                dataFinal=dataFinal,
+                idVeiculo=idVeiculo,
+            )
+
         try:
-            resultado = self.client.service.obterDeltaTelemetriaIntegracao(
-                usuario=self.username,
-                senha=self.password,
+            resultado = self._chamar(
+                'obterDeltaTelemetriaIntegracao',
                 dataInicio=dataInicio,
                 dataFinal=dataFinal,
                 idVeiculo=idVeiculo,
             )
             return self.process_response(resultado)
         except Exception as e:
-            raise Exception(f"Erro ao obter Delta Telemetria Integracao: {str(e)}")
+            raise converter_erro(e, "Erro ao obter Delta Telemetria Integracao") from e
     
     # Em desenvolvimento
     def to_excel_multisheet(self, data_dict, nome_arquivo):
@@ -522,9 +787,12 @@ class SascarAPI:
         Exporta dados em múltiplos formatos
         
         Args:
-            data (str): dados que serão exportados
+            data (list | iterable): dados que serão exportados; csv, json, jsonl,
+                parquet e xlsx aceitam geradores (ex.: stream=True) e gravam em lotes
             nome_arquivo (str, optional): Nome do arquivo que será exportado, nome padrão 'file'
-            formato (str, 'excel'|'csv'|'json', optional): formato de exportação do arquivo
+            formato (str, 'excel'|'csv'|'json'|'jsonl'|'parquet'|'xlsx', optional): formato de
+                exportação do arquivo; parquet grava um diretório particionado por
+                idVeiculo e data e xlsx usa memória constante (ver exportacao.py)
         """
         if formato == 'excel':
             """Exporta os dados para um arquivo Excel"""
@@ -532,17 +800,12 @@ class SascarAPI:
             return pd.DataFrame(data).to_excel(nome_arquivo+".xlsx", index=False, sheet_name=nome_arquivo)
         elif formato == 'csv':
             """Exporta os dados para um arquivo csv"""
-            return pd.DataFrame(data).to_csv(nome_arquivo+".csv", index=False)
-        elif formato == 'json':
-            """Exporta os dados para um arquivo json"""
-            with open(nome_arquivo+".json", 'w') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            return True
+            return exportar(data, nome_arquivo+".csv", 'csv')
+        elif formato in ('json', 'jsonl', 'xlsx'):
+            return exportar(data, nome_arquivo+"."+formato, formato)
+        elif formato == 'parquet':
+            return exportar(data, nome_arquivo, 'parquet')
     
     def formatar_data(self, data_zeep):
-        """Formata datas do objeto Zeep para string"""
-        if data_zeep is None:
-            return ''
-        if isinstance(data_zeep, datetime):
-            return data_zeep.strftime('%Y-%m-%d %H:%M:%S')
-        return str(data_zeep)
\ No newline at end of file
+        """Formata datas do objeto Zeep para string (para listas use tempo.formatar_datas)"""
+        return formatar_data(data_zeep)
\ No newline at end of file
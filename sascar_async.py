@@ -0,0 +1,348 @@
+import asyncio
+import ssl
+
+import httpx
+from zeep import AsyncClient
+from zeep.exceptions import Fault
+
+from excecoes import converter_erro
+from json_rapido import OPERACOES_JSON
+from metricas import METRICAS, TransporteAssincronoInstrumentado
+from sascar import CACHE_WSDL_TTL, SascarAPI, criar_settings_sascar
+from tempo import periodo
+
+
+def criar_http_client(max_conexoes=100, timeout=30):
+    """
+    Cria o cliente HTTP assíncrono compartilhado entre as chamadas
+
+    Args:
+        max_conexoes (int): Máximo de conexões HTTPS abertas
+        timeout (int): Tempo limite das operações em segundos
+
+    Returns:
+        httpx.AsyncClient: Cliente HTTP com TLS 1.2 ou superior
+    """
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = True
+    ssl_context.verify_mode = ssl.CERT_REQUIRED
+    ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+
+    return httpx.AsyncClient(
+        verify=ssl_context,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=max_conexoes, max_keepalive_connections=max_conexoes),
+    )
+
+
+class SascarAPIAsync(SascarAPI):
+    def __init__(self, SASCAR_USERNAME, SASCAR_PASSWORD, wsdl=None, cache_wsdl=True,
+                 cache_path=None, cache_ttl=CACHE_WSDL_TTL, reutilizar_cliente=False,
+                 client=None, limite_concorrencia=None, http_client=None, max_conexoes=100,
+                 resiliencia=None, preferir_json=False):
+        """
+        Versão asyncio da SascarAPI, com os mesmos métodos e formatos de retorno
+
+        As operações são corrotinas executadas pelo transporte assíncrono do
+        zeep sobre um único httpx.AsyncClient, então várias chamadas podem ser
+        combinadas com asyncio.gather no mesmo pool de conexões.
+
+        Args:
+            username (str): Nome de usuário para autenticação
+            password (str): Senha para autenticação
+            wsdl (str, optional): URL ou caminho de uma cópia local fixada do WSDL
+            cache_wsdl (bool, optional): Se True, guarda em disco o WSDL e os XSDs importados
+            cache_path (str, optional): Arquivo SQLite do cache
+            cache_ttl (int, optional): Validade do cache em segundos
+            reutilizar_cliente (bool, optional): Se True, reaproveita o cliente já
+                construído no processo (use apenas com um único event loop)
+            client (zeep.AsyncClient, optional): Cliente já configurado e compartilhado
+            limite_concorrencia (asyncio.Semaphore, optional): Limita as chamadas
+                simultâneas desta conta
+            http_client (httpx.AsyncClient, optional): Cliente HTTP compartilhado
+            max_conexoes (int, optional): Máximo de conexões do cliente HTTP criado
+            resiliencia (resiliencia.Resiliencia, optional): Limite de taxa, novas
+                tentativas e disjuntor (pode ser compartilhado entre contas)
+            preferir_json (bool, optional): Se True, usa as variantes JSON (ver SascarAPI)
+        """
+        self.http_client = http_client
+        self.max_conexoes = max_conexoes
+        # Transporte (e cliente HTTP) criados por esta instância: só ela os fecha
+        self._transporte_proprio = None
+        self._http_proprio = False
+        super().__init__(
+            SASCAR_USERNAME, SASCAR_PASSWORD, wsdl=wsdl, cache_wsdl=cache_wsdl,
+            cache_path=cache_path, cache_ttl=cache_ttl, reutilizar_cliente=reutilizar_cliente,
+            client=client, limite_concorrencia=limite_concorrencia, resiliencia=resiliencia,
+            preferir_json=preferir_json,
+        )
+
+    def configurar_cliente_sascar(self):
+        """Configura e retorna o cliente SOAP assíncrono para a API Sascar"""
+        try:
+            if self.http_client is None:
+                self.http_client = criar_http_client(self.max_conexoes)
+                self._http_proprio = True
+            transport = TransporteAssincronoInstrumentado(
+                client=self.http_client,
+                cache=self.configurar_cache(),
+                timeout=30,
+            )
+            self._transporte_proprio = transport
+            with METRICAS.medir('wsdl', ''):
+                return AsyncClient(self.wsdl_url, settings=criar_settings_sascar(), transport=transport)
+        except Exception as e:
+            raise converter_erro(e, "Erro ao configurar cliente SOAP seguro") from e
+
+    def conta(self, usuario, senha, limite_concorrencia=None):
+        """
+        Retorna a API assíncrona de outra conta usando o mesmo cliente e pool HTTP
+
+        Args:
+            usuario (str): Nome de usuário da conta
+            senha (str): Senha da conta
+            limite_concorrencia (asyncio.Semaphore, optional): Limite da conta
+
+        Returns:
+            SascarAPIAsync: API ligada às credenciais da conta
+        """
+        return SascarAPIAsync(
+            usuario, senha, wsdl=self.wsdl_url, client=self.client,
+            http_client=self.http_client, limite_concorrencia=limite_concorrencia,
+            resiliencia=self.resiliencia, preferir_json=self.preferir_json,
+        )
+
+    async def aclose(self):
+        """
+        Fecha as conexões abertas por esta instância
+
+        O cliente HTTP recebido de fora (ex.: o compartilhado pelas contas de
+        conta()) continua aberto; quem o criou é quem o fecha.
+        """
+        if self._transporte_proprio is not None:
+            self._transporte_proprio.wsdl_client.close()
+            self._transporte_proprio = None
+        if self._http_proprio:
+            self._http_proprio = False
+            await self.http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def _chamar(self, operacao, autenticar=True, **params):
+        """
+        Executa uma operação do serviço com as credenciais desta conta
+
+        Args:
+            operacao (str): Nome da operação no WSDL
+            autenticar (bool): Se True, envia usuario e senha junto aos parâmetros
+            **params: Parâmetros da operação
+
+        Returns:
+            Resposta da operação
+        """
+        if autenticar:
+            params = self.com_credenciais(params)
+        metodo = getattr(self.client.service, operacao)
+
+        async def tentativa():
+            async with METRICAS.chamada(operacao):
+                return await metodo(**params)
+
+        if self.resiliencia is not None:
+            executar = lambda: self.resiliencia.executar_async(operacao, tentativa)
+        else:
+            executar = tentativa
+        if self.limite_concorrencia is None:
+            return await executar()
+        async with self.limite_concorrencia:
+            return await executar()
+
+    def _nao_suportado(self, recurso):
+        return NotImplementedError(
+            f"{recurso} não é suportado pela SascarAPIAsync: o transporte assíncrono do zeep não tem a "
+            f"requests.Session usada na leitura incremental; use a SascarAPI síncrona"
+        )
+
+    def _stream(self, operacao, mensagem_erro, **params):
+        raise self._nao_suportado("stream=True")
+
+    def _colunar(self, operacao, formato, mensagem_erro, **params):
+        raise self._nao_suportado(f"formato={formato!r}")
+
+    def executar_protegido(self, operacao, funcao):
+        raise self._nao_suportado("executar_protegido")
+
+    async def atualizar_senha(self, senha_atual, nova_senha):
+        """Versão assíncrona de SascarAPI.atualizar_senha"""
+        try:
+            return await self._chamar(
+                'atualizarSenha',
+                autenticar=False,
+                usuario=self.username,
+                senhaAtual=senha_atual,
+                novaSenha=nova_senha
+            )
+        except Fault as e:
+            raise converter_erro(e, "Erro ao atualizar senha") from e
+
+    async def obter_grupo_atuadores(self):
+        """Versão assíncrona de SascarAPI.obter_grupo_atuadores"""
+        try:
+            response = await self._chamar('obterGrupoAtuadores')
+            return self.process_response(response)
+        except Fault as e:
+            raise converter_erro(e, "Erro ao obter grupo de atuadores") from e
+
+    async def obterClientes(self, quantidade=1, id_cliente=0):
+        """Versão assíncrona de SascarAPI.obterClientes"""
+        try:
+            response = await self._chamar(
+                'obterClientes',
+                quantidade=quantidade,
+                idCliente=id_cliente
+            )
+            return self.process_response(response)
+        except Fault as e:
+            raise converter_erro(e, "Erro ao obter clientes") from e
+
+    async def obterVeiculos(self, json_format=False, debug=False):
+        """Versão assíncrona de SascarAPI.obterVeiculos"""
+        try:
+            if json_format or self._usar_json('obterVeiculos'):
+                response = await self._chamar('obterVeiculosJson', quantidade=0)
+                return self._ler_json('obterVeiculos', response)
+
+            response = await self._chamar('obterVeiculos', quantidade=0)
+            if debug and response:
+                print(f"Total de veículos encontrados: {len(response)}")
+                self.debug_zeep_object(response[0])
+            return self.process_response(response)
+        except Fault as e:
+            raise converter_erro(e, "Erro ao obter veículos") from e
+
+    async def obterPacotePosicoes(self, quantidade=3000, motorista=False, com_placa=False):
+        """Versão assíncrona de SascarAPI.obterPacotePosicoes"""
+        if motorista:
+            if com_placa:
+                operacao = 'obterPacotePosicoesMotoristaComPlaca'
+            else:
+                operacao = 'obterPacotePosicoesMotorista'
+        else:
+            operacao = 'obterPacotePosicoes'
+
+        try:
+            response = await self._chamar(operacao, quantidade=quantidade)
+            return self.process_response(response)
+        except Fault as e:
+            raise converter_erro(e, "Erro ao obter pacotes de posições") from e
+
+    async def obterPacotePosicaoMotoristaPorRangeJSON(self, id_inicio, id_final, quantidade=3000,
+                                                      motorista=False, json_format=False):
+        """Versão assíncrona de SascarAPI.obterPacotePosicaoMotoristaPorRangeJSON"""
+        if motorista:
+            operacao = 'obterPacotePosicaoMotoristaPorRange'
+        else:
+            operacao = 'obterPacotePosicaoPorRange'
+        json_format = json_format or self._usar_json(operacao)
+
+        try:
+            response = await self._chamar(
+                OPERACOES_JSON[operacao] if json_format else operacao,
+                idInicio=id_inicio,
+                idFinal=id_final,
+                quantidade=quantidade
+            )
+            if json_format:
+                return self._ler_json(operacao, response)
+            return self.process_response(response)
+        except Fault as e:
+            raise converter_erro(e, "Erro ao obter pacotes de posições por range") from e
+
+    async def obterStatusComando(self, ticket=None, ticket_sascar=False):
+        """Versão assíncrona de SascarAPI.obterStatusComando"""
+        operacao = 'obterStatusComandoTicketSascar' if ticket_sascar else 'obterStatusComando'
+        try:
+            response = await self._chamar(operacao, ticket=ticket)
+            return self.process_response(response)
+        except Fault as e:
+            raise converter_erro(e, "Erro ao obter status do comando") from e
+
+    async def obterEventoTelemetriaIntegracao(self, idVeiculo, dataInicio, dataFinal):
+        """Versão assíncrona de SascarAPI.obterEventoTelemetriaIntegracao"""
+        try:
+            if not all([idVeiculo, dataInicio, dataFinal]):
+                raise ValueError('Parametros pendentes')
+
+            dataInicio, dataFinal = periodo(dataInicio, dataFinal)
+
+            resultado = await self._chamar(
+                'obterEventoTelemetriaIntegracao',
+                idVeiculo=idVeiculo,
+                dataInicio=dataInicio,
+                dataFinal=dataFinal,
+            )
+            return resultado or []
+        except Exception as e:
+            raise converter_erro(e, "Erro ao obter eventos de telemetria") from e
+
+    async def obterEventoTelemetriaIntegracaoDataChegada(self, idVeiculo, dataInicio=None, dataFinal=None,
+                                                         idEventoList=None):
+        """Versão assíncrona de SascarAPI.obterEventoTelemetriaIntegracaoDataChegada"""
+        try:
+            if not all([idVeiculo, dataInicio, dataFinal]):
+                raise ValueError('Parametros pendentes')
+
+            dataInicio, dataFinal = periodo(dataInicio, dataFinal)
+
+            response = await self._chamar(
+                'obterEventoTelemetriaIntegracaoDataChegada',
+                idVeiculo=idVeiculo,
+                dataInicio=dataInicio,
+                dataFinal=dataFinal,
+                dataChegadaInicio=dataInicio,
+                dataChegadaFinal=dataFinal,
+                idEventoList=idEventoList,
+            )
+            return self.process_response(response)
+        except Exception as e:
+            raise converter_erro(e, "Erro ao obter eventos de telemetria") from e
+
+    async def obterDeltaTelemetriaIntegracao(self, idVeiculo, dataInicio, dataFinal):
+        """Versão assíncrona de SascarAPI.obterDeltaTelemetriaIntegracao"""
+        try:
+            dataInicio, dataFinal = periodo(dataInicio, dataFinal)
+            resultado = await self._chamar(
+                'obterDeltaTelemetriaIntegracao',
+                dataInicio=dataInicio,
+                dataFinal=dataFinal,
+                idVeiculo=idVeiculo,
+            )
+            return self.process_response(resultado)
+        except Exception as e:
+            raise converter_erro(e, "Erro ao obter Delta Telemetria Integracao") from e
+
+    async def gather(self, *chamadas, limite=None):
+        """
+        Executa várias corrotinas desta API em paralelo
+
+        Args:
+            *chamadas: Corrotinas (ex.: api.obterStatusComando(1))
+            limite (int, optional): Máximo de chamadas simultâneas
+
+        Returns:
+            list: Resultados na mesma ordem das chamadas
+        """
+        if limite is None:
+            return await asyncio.gather(*chamadas)
+
+        semaforo = asyncio.Semaphore(limite)
+
+        async def limitada(chamada):
+            async with semaforo:
+                return await chamada
+
+        return await asyncio.gather(*(limitada(chamada) for chamada in chamadas))
@@ -0,0 +1,254 @@
+import time
+import weakref
+from io import BytesIO
+
+from lxml import etree
+from zeep.exceptions import Fault
+from zeep.wsdl.utils import etree_to_string
+from zeep.xsd import ComplexType
+
+from metricas import METRICAS
+
+XSI_NIL = '{http://www.w3.org/2001/XMLSchema-instance}nil'
+
+# Esquemas de retorno já resolvidos, por cliente (referência fraca: um cliente
+# descartado leva junto os seus esquemas) e operação
+_esquemas_retorno = weakref.WeakKeyDictionary()
+_tipos_retorno = weakref.WeakKeyDictionary()
+
+
+def _esquema_do_complexo(xsd_type):
+    """
+    Monta o mapa campo -> tipo XSD de um tipo complexo do esquema
+
+    Args:
+        xsd_type (zeep.xsd.ComplexType): Tipo do esquema
+
+    Returns:
+        dict: Tipo de cada campo simples ou mapa aninhado dos complexos
+    """
+    esquema = {}
+    for nome, elemento in xsd_type.elements:
+        tipo = getattr(elemento, 'type', None)
+        if isinstance(tipo, ComplexType):
+            esquema[nome] = _esquema_do_complexo(tipo)
+        elif tipo is not None and hasattr(tipo, 'pythonvalue'):
+            esquema[nome] = tipo
+    return esquema
+
+
+def _conversores(esquema):
+    """Troca os tipos XSD do esquema pelos seus conversores pythonvalue"""
+    return {
+        nome: _conversores(tipo) if isinstance(tipo, dict) else tipo.pythonvalue
+        for nome, tipo in esquema.items()
+    }
+
+
+def esquema_do_retorno(client, operacao):
+    """
+    Resolve, a partir do WSDL, o tipo XSD de cada campo retornado por uma operação
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Nome da operação
+
+    Returns:
+        dict: Tipo de cada campo do elemento 'return'
+    """
+    esquemas = _esquemas_retorno.setdefault(client, {})
+    esquema = esquemas.get(operacao)
+    if esquema is None:
+        esquema = {}
+        corpo = client.service._binding.get(operacao).output.body
+        for nome, elemento in corpo.type.elements:
+            if nome == 'return' and isinstance(elemento.type, ComplexType):
+                esquema = _esquema_do_complexo(elemento.type)
+        esquemas[operacao] = esquema
+    return esquema
+
+
+def tipos_do_retorno(client, operacao):
+    """
+    Resolve, a partir do WSDL, os conversores dos campos retornados por uma operação
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Nome da operação
+
+    Returns:
+        dict: Conversor de cada campo do elemento 'return'
+    """
+    por_operacao = _tipos_retorno.setdefault(client, {})
+    tipos = por_operacao.get(operacao)
+    if tipos is None:
+        tipos = por_operacao[operacao] = _conversores(esquema_do_retorno(client, operacao))
+    return tipos
+
+
+def _levantar_fault(elem):
+    """Converte um elemento soap:Fault em zeep.exceptions.Fault"""
+    valores = {etree.QName(filho).localname: filho.text for filho in elem}
+    raise Fault(message=valores.get('faultstring'), code=valores.get('faultcode'))
+
+
+def _elemento_para_dict(elem, tipos):
+    """
+    Achata um elemento XML em dicionário convertendo os valores pelo esquema
+
+    Args:
+        elem (lxml.etree._Element): Elemento do registro
+        tipos (dict): Conversores dos campos
+
+    Returns:
+        dict: Registro
+    """
+    registro = {}
+    for filho in elem:
+        if not isinstance(filho.tag, str):
+            continue
+        nome = filho.tag.rpartition('}')[2]
+        tipo = tipos.get(nome)
+        if len(filho):
+            valor = _elemento_para_dict(filho, tipo if isinstance(tipo, dict) else {})
+        elif filho.get(XSI_NIL) in ('true', '1'):
+            valor = None
+        else:
+            valor = filho.text
+            if valor is not None and tipo is not None and not isinstance(tipo, dict):
+                valor = tipo(valor)
+        if nome in registro:
+            anterior = registro[nome]
+            if isinstance(anterior, list):
+                anterior.append(valor)
+            else:
+                registro[nome] = [anterior, valor]
+        else:
+            registro[nome] = valor
+    return registro
+
+
+def iterar_elementos(fonte, tag='return'):
+    """
+    Lê a resposta SOAP de forma incremental e gera o elemento de cada registro
+
+    O elemento só é válido até a próxima iteração: ele e os irmãos já
+    processados são descartados em seguida.
+
+    Args:
+        fonte (bytes | file): Resposta SOAP em bytes ou objeto de arquivo
+        tag (str): Nome local do elemento de cada registro
+
+    Yields:
+        lxml.etree._Element: Elemento do registro
+    """
+    if isinstance(fonte, (bytes, bytearray)):
+        fonte = BytesIO(fonte)
+
+    contexto = etree.iterparse(
+        fonte,
+        events=('end',),
+        tag=('{*}' + tag, '{*}Fault'),
+        huge_tree=True,
+        remove_blank_text=True,
+    )
+    for _, elem in contexto:
+        if elem.tag.rpartition('}')[2] == 'Fault':
+            _levantar_fault(elem)
+        yield elem
+        # Libera o elemento e os irmãos já processados
+        elem.clear()
+        pai = elem.getparent()
+        if pai is not None:
+            while elem.getprevious() is not None:
+                del pai[0]
+    del contexto
+
+
+def iterar_registros(fonte, tipos=None, tag='return'):
+    """
+    Lê a resposta SOAP de forma incremental e gera um dicionário por registro
+
+    Cada elemento é descartado logo após ser convertido, então o consumo de
+    memória depende do tamanho do registro e não do pacote.
+
+    Args:
+        fonte (bytes | file): Resposta SOAP em bytes ou objeto de arquivo
+        tipos (dict, optional): Conversores dos campos (ver tipos_do_retorno)
+        tag (str): Nome local do elemento de cada registro
+
+    Yields:
+        dict: Registro
+    """
+    tipos = tipos or {}
+    for elem in iterar_elementos(fonte, tag):
+        yield _elemento_para_dict(elem, tipos)
+
+
+def abrir_resposta(client, operacao, params):
+    """
+    Envia a requisição SOAP sem passar pelo parser do zeep
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Nome da operação
+        params (dict): Parâmetros da operação
+
+    Returns:
+        requests.Response: Resposta em modo stream (corpo ainda não lido)
+    """
+    servico = client.service
+    envelope, headers = servico._binding._create(operacao, (), params, client=client)
+    transport = client.transport
+    corpo = etree_to_string(envelope)
+    inicio = time.perf_counter()
+    response = transport.session.post(
+        servico._binding_options['address'],
+        data=corpo,
+        headers=headers,
+        timeout=transport.operation_timeout,
+        stream=True,
+    )
+    METRICAS.registrar_http(time.perf_counter() - inicio, len(corpo), 0)
+    tipo_conteudo = response.headers.get('Content-Type', '')
+    if response.status_code >= 400 and 'xml' not in tipo_conteudo:
+        response.close()
+        response.raise_for_status()
+    response.raw.decode_content = True
+    return response
+
+
+def iterar_resposta(client, operacao, params):
+    """
+    Executa uma operação e gera os registros à medida que chegam
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Nome da operação
+        params (dict): Parâmetros da operação
+
+    Yields:
+        dict: Registro
+    """
+    yield from registros_da_resposta(client, operacao, abrir_resposta(client, operacao, params))
+
+
+def registros_da_resposta(client, operacao, response):
+    """
+    Gera os registros de uma resposta aberta por abrir_resposta (e a fecha no fim)
+
+    Args:
+        client (zeep.Client): Cliente com o WSDL carregado
+        operacao (str): Nome da operação
+        response (requests.Response): Resposta em modo stream
+
+    Yields:
+        dict: Registro
+    """
+    with response:
+        total = 0
+        for registro in iterar_registros(response.raw, tipos_do_retorno(client, operacao)):
+            total += 1
+            yield registro
+        METRICAS.incrementar('bytes_recebidos', operacao, response.raw.tell())
+        METRICAS.incrementar('registros', operacao, total)
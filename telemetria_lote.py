@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from excecoes import classificar
+from resiliencia import PoliticaRetentativa
+from tempo import FUSO_SERVICO, formatar_data, para_datetime
+
+# Métodos da SascarAPI aceitos pelo lote
+OPERACOES = {
+    'evento': 'obterEventoTelemetriaIntegracao',
+    'data_chegada': 'obterEventoTelemetriaIntegracaoDataChegada',
+    'delta': 'obterDeltaTelemetriaIntegracao',
+}
+
+
+def dividir_janela(inicio, fim):
+    """
+    Divide uma janela de tempo ao meio (limites inclusivos, resolução de segundos)
+
+    Args:
+        inicio (datetime): Início da janela
+        fim (datetime): Fim da janela
+
+    Returns:
+        tuple: As duas metades ((inicio, meio), (meio + 1s, fim))
+    """
+    meio = inicio + (fim - inicio) / 2
+    meio = meio.replace(microsecond=0)
+    return (inicio, meio), (meio + timedelta(seconds=1), fim)
+
+
+def obter_telemetria_frota(api, veiculos, data_inicio, data_final, operacao='evento', max_workers=8,
+                           limite_registros=1000, janela_minima=timedelta(minutes=1), tentativas=3):
+    """
+    Obtém telemetria de vários veículos em paralelo
+
+    Cada veículo é consultado na janela inteira; se a resposta atingir
+    limite_registros (o teto do servidor) a janela é dividida ao meio e as
+    metades são consultadas novamente, até janela_minima.
+
+    Args:
+        api (SascarAPI): API da conta
+        veiculos (list): IDs dos veículos
+        data_inicio (datetime | str): Início do período (com fuso, vai para o
+            horário local do serviço)
+        data_final (datetime | str): Fim do período
+        operacao (str): 'evento', 'data_chegada' ou 'delta'
+        max_workers (int): Chamadas simultâneas ao serviço
+        limite_registros (int): Quantidade de registros que indica resposta truncada
+        janela_minima (timedelta): Menor janela consultada
+        tentativas (int): Tentativas por janela antes de registrar o erro (só erros
+            retentáveis, com backoff; com api.resiliencia as novas tentativas ficam
+            a cargo dela)
+
+    Returns:
+        tuple: (resultados, erros) — dicionários por idVeiculo com a lista de
+            registros em ordem de janela e com a exceção dos veículos que falharam
+    """
+    if operacao not in OPERACOES:
+        raise ValueError(f"Operação inválida: {operacao}")
+    metodo = getattr(api, OPERACOES[operacao])
+    inicio = para_datetime(data_inicio, FUSO_SERVICO)
+    fim = para_datetime(data_final, FUSO_SERVICO)
+
+    partes = {veiculo: [] for veiculo in veiculos}
+    erros = {}
+    politica = PoliticaRetentativa(1 if getattr(api, 'resiliencia', None) is not None else tentativas)
+
+    def consultar(veiculo, janela_inicio, janela_fim):
+        tentativa = 0
+        while True:
+            try:
+                return list(metodo(
+                    veiculo,
+                    formatar_data(janela_inicio),
+                    formatar_data(janela_fim),
+                ) or [])
+            except Exception as e:
+                if not politica.deve_repetir(classificar(e), tentativa):
+                    raise
+                time.sleep(politica.espera(tentativa))
+                tentativa += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {
+            executor.submit(consultar, veiculo, inicio, fim): (veiculo, inicio, fim)
+            for veiculo in veiculos
+        }
+        while futuros:
+            concluidos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                veiculo, janela_inicio, janela_fim = futuros.pop(futuro)
+                if veiculo in erros:
+                    continue
+                try:
+                    registros = futuro.result()
+                except Exception as e:
+                    erros[veiculo] = e
+                    continue
+
+                if len(registros) >= limite_registros and janela_fim - janela_inicio > janela_minima:
+                    for metade_inicio, metade_fim in dividir_janela(janela_inicio, janela_fim):
+                        novo = executor.submit(consultar, veiculo, metade_inicio, metade_fim)
+                        futuros[novo] = (veiculo, metade_inicio, metade_fim)
+                else:
+                    partes[veiculo].append((janela_inicio, registros))
+
+    resultados = {}
+    for veiculo, janelas in partes.items():
+        if veiculo in erros:
+            continue
+        janelas.sort(key=lambda parte: parte[0])
+        resultados[veiculo] = [registro for _, registros in janelas for registro in registros]
+    return resultados, erros
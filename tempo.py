@@ -0,0 +1,317 @@
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+# Fuso em que o serviço interpreta dataInicio/dataFinal (horário local, sem offset)
+FUSO_SERVICO = 'America/Sao_Paulo'
+
+# Apelidos aceitos além das frequências do pandas ('h', '6h', 'D', '15min', ...)
+FREQUENCIAS = {'hora': 'h', 'dia': 'D'}
+
+UM_SEGUNDO = np.timedelta64(1, 's')
+
+
+def obter_fuso(fuso):
+    """Aceita nome IANA ('America/Sao_Paulo') ou tzinfo"""
+    if fuso is None or isinstance(fuso, tzinfo):
+        return fuso
+    return ZoneInfo(fuso)
+
+
+def para_datetime(data, fuso=None):
+    """
+    Converte um valor em datetime
+
+    Args:
+        data (datetime | date | str | pandas.Timestamp | numpy.datetime64): Data;
+            texto no formato 'YYYY-MM-DD HH:MM:SS' ou ISO 8601
+        fuso (str | tzinfo, optional): Se informado, datas com fuso horário são
+            convertidas para o horário local dele e devolvidas sem tzinfo
+
+    Returns:
+        datetime: Data
+    """
+    if isinstance(data, pd.Timestamp):
+        data = data.to_pydatetime()
+    elif isinstance(data, np.datetime64):
+        data = pd.Timestamp(data).to_pydatetime()
+    elif isinstance(data, str):
+        data = datetime.fromisoformat(data.strip())
+    elif isinstance(data, date) and not isinstance(data, datetime):
+        data = datetime.combine(data, time())
+    elif not isinstance(data, datetime):
+        raise ValueError(f"Data inválida: {data!r}")
+    if fuso is not None and data.tzinfo is not None:
+        data = data.astimezone(obter_fuso(fuso)).replace(tzinfo=None)
+    return data
+
+
+def formatar_data(data, fuso=None, manter_fuso=False):
+    """
+    Formata um valor no padrão do serviço ('YYYY-MM-DD HH:MM:SS')
+
+    None vira '', texto é devolvido como está e date vira 'YYYY-MM-DD'.
+    Com manter_fuso, datas com fuso horário ganham o deslocamento no fim
+    ('2025-05-20 10:00:00-03:00'), como em arquivos exportados.
+    Para muitos valores use formatar_datas.
+    """
+    if data is None:
+        return ''
+    if isinstance(data, str):
+        return data
+    if isinstance(data, date) and not isinstance(data, datetime):
+        return data.isoformat()
+    if isinstance(data, (datetime, pd.Timestamp, np.datetime64)):
+        data = para_datetime(data, None if manter_fuso else fuso)
+        texto = data.strftime(FORMATO_DATA)
+        if manter_fuso and data.tzinfo is not None:
+            texto += sufixo_fuso(data.utcoffset())
+        return texto
+    return str(data)
+
+
+def sufixo_fuso(deslocamento):
+    """timedelta do fuso -> '+HH:MM' / '-HH:MM' (como em isoformat)"""
+    if deslocamento is None:
+        return ''
+    minutos = int(deslocamento.total_seconds()) // 60
+    sinal = '-' if minutos < 0 else '+'
+    horas, minutos = divmod(abs(minutos), 60)
+    return f'{sinal}{horas:02d}:{minutos:02d}'
+
+
+def periodo(inicio, fim, fuso=FUSO_SERVICO):
+    """
+    Prepara dataInicio/dataFinal para o serviço
+
+    Texto é enviado como está; datas com fuso horário são convertidas para o
+    horário do serviço e datas sem fuso são consideradas já nesse horário.
+
+    Returns:
+        tuple: (inicio, fim) como texto 'YYYY-MM-DD HH:MM:SS'
+    """
+    return (
+        inicio if inicio is None or isinstance(inicio, str) else formatar_data(inicio, fuso),
+        fim if fim is None or isinstance(fim, str) else formatar_data(fim, fuso),
+    )
+
+
+def _relogio(indice, fuso):
+    """Tira o fuso de um DatetimeIndex mantendo o horário local (do fuso pedido, se houver)"""
+    if indice.tz is None:
+        return indice
+    if fuso is not None:
+        indice = indice.tz_convert(obter_fuso(fuso))
+    return indice.tz_localize(None)
+
+
+def _datetimes_com_fuso(valores, fuso):
+    """Datetimes com tzinfo -> datetime64[s], sem criar um Timestamp por valor"""
+    epocas = np.fromiter((valor.timestamp() for valor in valores), dtype='f8', count=len(valores))
+    utc = np.floor(epocas).astype('i8').astype('datetime64[s]')
+    if fuso is not None:
+        return _relogio(pd.DatetimeIndex(utc).tz_localize('UTC'), fuso).values.astype('datetime64[s]')
+    fusos = {valor.tzinfo for valor in valores}
+    deslocamento = next(iter(fusos)).utcoffset(None) if len(fusos) == 1 else None
+    if deslocamento is not None:
+        # Fuso fixo (ex.: -03:00 vindo do serviço): um único deslocamento para o lote todo
+        return utc + np.timedelta64(int(deslocamento.total_seconds()), 's')
+    deslocamentos = np.fromiter(
+        (valor.utcoffset().total_seconds() for valor in valores), dtype='f8', count=len(valores)
+    )
+    return utc + deslocamentos.astype('i8').astype('timedelta64[s]')
+
+
+def _textos(valores, fuso):
+    """Textos ISO 8601 / 'YYYY-MM-DD HH:MM:SS' -> datetime64[s]"""
+    if fuso is None:
+        # Mantém o horário escrito, ignorando o offset (mesmo resultado de strftime)
+        return np.array([valor[:19] for valor in valores], dtype='datetime64[s]')
+    indice = pd.DatetimeIndex(pd.to_datetime(valores, format='ISO8601', utc=True))
+    return _relogio(indice, fuso).values.astype('datetime64[s]')
+
+
+def para_datetime64(valores, fuso=None):
+    """
+    Converte um lote de datas em numpy.datetime64[s] de uma só vez
+
+    Args:
+        valores (iterable | numpy.ndarray | pandas.Series): datetime, texto,
+            pandas.Timestamp ou None (NaT)
+        fuso (str | tzinfo, optional): Se informado, datas com fuso horário vão
+            para o horário local dele; sem fuso mantêm o horário em que foram
+            escritas, como strftime faria
+
+    Returns:
+        numpy.ndarray: Datas datetime64[s] sem fuso
+    """
+    if isinstance(valores, (pd.Series, pd.Index)) and valores.dtype.kind == 'M' or \
+            isinstance(valores, np.ndarray) and valores.dtype.kind == 'M':
+        return _relogio(pd.DatetimeIndex(valores), fuso).values.astype('datetime64[s]')
+
+    valores = list(valores)
+    resultado = np.full(len(valores), np.datetime64('NaT'), dtype='datetime64[s]')
+    grupos = {'com_fuso': ([], []), 'sem_fuso': ([], []), 'texto': ([], []), 'outros': ([], [])}
+    for indice, valor in enumerate(valores):
+        if valor is None:
+            continue
+        if isinstance(valor, datetime) and not isinstance(valor, pd.Timestamp):
+            grupo = grupos['com_fuso' if valor.tzinfo is not None else 'sem_fuso']
+        elif isinstance(valor, str):
+            if not valor:
+                continue
+            grupo = grupos['texto']
+        else:
+            grupo = grupos['outros']
+        grupo[0].append(indice)
+        grupo[1].append(valor)
+
+    indices, datas = grupos['com_fuso']
+    if datas:
+        resultado[indices] = _datetimes_com_fuso(datas, fuso)
+    indices, datas = grupos['sem_fuso']
+    if datas:
+        resultado[indices] = np.array(datas, dtype='datetime64[s]')
+    indices, datas = grupos['texto']
+    if datas:
+        resultado[indices] = _textos(datas, fuso)
+    indices, datas = grupos['outros']
+    if datas:
+        resultado[indices] = np.array([para_datetime(data, fuso).replace(tzinfo=None) for data in datas],
+                                      dtype='datetime64[s]')
+    return resultado
+
+
+def formatar_datas(valores, fuso=None, manter_fuso=False):
+    """
+    Formata um lote de datas no padrão do serviço ('YYYY-MM-DD HH:MM:SS')
+
+    Args:
+        valores (iterable | numpy.ndarray | pandas.Series): Datas (ver para_datetime64)
+        fuso (str | tzinfo, optional): Fuso de destino das datas com fuso horário
+        manter_fuso (bool): Se True, mantém o horário escrito e acrescenta o
+            deslocamento das datas com fuso ('...-03:00'); fuso é ignorado
+
+    Returns:
+        list: Textos ('' nos nulos)
+    """
+    sufixos = None
+    if manter_fuso:
+        if not isinstance(valores, (list, np.ndarray, pd.Series, pd.Index)):
+            valores = list(valores)
+        if isinstance(valores, list):
+            sufixos = _sufixos(valores)
+        fuso = None
+    datas = para_datetime64(valores, fuso)
+    textos = np.char.replace(np.datetime_as_string(datas, unit='s'), 'T', ' ')
+    textos[np.isnat(datas)] = ''
+    textos = textos.tolist()
+    if sufixos is not None:
+        textos = [texto + sufixo if texto else texto for texto, sufixo in zip(textos, sufixos)]
+    return textos
+
+
+def _sufixos(valores):
+    """Deslocamento de cada datetime com fuso ('' nos demais); None se não houver nenhum"""
+    fusos = {valor.tzinfo for valor in valores if isinstance(valor, datetime)}
+    fusos.discard(None)
+    if not fusos:
+        return None
+    deslocamento = next(iter(fusos)).utcoffset(None) if len(fusos) == 1 else None
+    if deslocamento is not None:
+        # Fuso fixo: um único sufixo para o lote todo
+        sufixo = sufixo_fuso(deslocamento)
+        return [sufixo if isinstance(valor, datetime) and valor.tzinfo is not None else '' for valor in valores]
+    return [sufixo_fuso(valor.utcoffset()) if isinstance(valor, datetime) else '' for valor in valores]
+
+
+def campos_data(registros, amostra=100):
+    """Campos com datetime nos primeiros registros (dicionários)"""
+    campos = []
+    for registro in registros[:amostra]:
+        for campo, valor in registro.items():
+            if isinstance(valor, datetime) and campo not in campos:
+                campos.append(campo)
+    return campos
+
+
+def formatar_campos(registros, campos=None, fuso=None):
+    """
+    Formata em lote, coluna a coluna, os campos de data de uma lista de dicionários
+
+    Os registros são alterados; valores None continuam None.
+
+    Args:
+        registros (list): Dicionários
+        campos (list, optional): Campos a formatar (padrão: os que têm datetime)
+        fuso (str | tzinfo, optional): Fuso de destino das datas com fuso horário
+
+    Returns:
+        list: Os mesmos registros
+    """
+    if campos is None:
+        campos = campos_data(registros)
+    for campo in campos:
+        textos = formatar_datas([registro.get(campo) for registro in registros], fuso)
+        for registro, texto in zip(registros, textos):
+            if texto:
+                registro[campo] = texto
+    return registros
+
+
+def janelas(inicio, fim, frequencia='h', fuso=FUSO_SERVICO):
+    """
+    Divide um período em janelas alinhadas ao relógio do fuso
+
+    As janelas começam em horas cheias, à meia-noite etc. (conforme a
+    frequência); a primeira e a última são cortadas em inicio e fim. Os
+    limites são inclusivos com resolução de segundos, como o serviço espera.
+
+    Args:
+        inicio (datetime | str): Início do período (com fuso é convertido para o fuso)
+        fim (datetime | str): Fim do período
+        frequencia (str | timedelta): 'hora', 'dia' ou frequência fixa do pandas ('6h', 'D', '15min')
+        fuso (str | tzinfo): Fuso do relógio usado no alinhamento
+
+    Returns:
+        tuple: (inícios, fins) em numpy.datetime64[s], no horário local do fuso
+    """
+    inicio = np.datetime64(para_datetime(inicio, fuso).replace(tzinfo=None), 's')
+    fim = np.datetime64(para_datetime(fim, fuso).replace(tzinfo=None), 's')
+    if fim < inicio:
+        vazio = np.array([], dtype='datetime64[s]')
+        return vazio, vazio
+    passo = to_offset(FREQUENCIAS.get(frequencia, frequencia))
+    primeiro = pd.Timestamp(inicio).floor(passo)
+    limites = pd.date_range(primeiro, pd.Timestamp(fim), freq=passo).values.astype('datetime64[s]')
+    inicios = np.maximum(limites, inicio)
+    fins = np.empty_like(limites)
+    fins[:-1] = limites[1:] - UM_SEGUNDO
+    fins[-1] = fim
+    return inicios, np.minimum(fins, fim)
+
+
+def janelas_frota(veiculos, inicio, fim, frequencia='h', fuso=FUSO_SERVICO):
+    """
+    Monta as consultas de telemetria de vários veículos em janelas alinhadas
+
+    Args:
+        veiculos (list): IDs dos veículos
+        inicio, fim, frequencia, fuso: Ver janelas
+
+    Returns:
+        pandas.DataFrame: Colunas idVeiculo, dataInicio e dataFinal (texto no
+            padrão do serviço), uma linha por veículo e janela
+    """
+    inicios, fins = janelas(inicio, fim, frequencia, fuso)
+    veiculos = np.asarray(list(veiculos))
+    return pd.DataFrame({
+        'idVeiculo': np.repeat(veiculos, len(inicios)),
+        'dataInicio': np.tile(formatar_datas(inicios), len(veiculos)),
+        'dataFinal': np.tile(formatar_datas(fins), len(veiculos)),
+    })